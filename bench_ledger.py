@@ -0,0 +1,297 @@
+"""Backend benchmarks for Rainbow Ledger.
+
+    python bench_ledger.py --transactions 1000,100000,1000000
+    python bench_ledger.py --transactions 100000 --out bench_output.txt --compare old_bench.txt
+
+For every size a synthetic ledger (N transactions, M invoices, K employees
+spread over several months) is generated once under <work>/ledger-*/data,
+copied to a scratch folder and the real backend functions are timed against
+the copy. Nothing touches the app's own data/ folder and no window is opened.
+Each measurement is printed as one JSON object per line (and appended to
+--out); --compare prints the median ratio against an earlier run.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import ledger_core as core
+
+INCOME_CATEGORIES = ["Sales", "Services", "Other Income"]
+EXPENSE_CATEGORIES = [c for c in core.DEFAULT_CATEGORIES if c not in INCOME_CATEGORIES]
+
+# ---------- Synthetic ledger ----------
+def _split(total, parts):
+    base, extra = divmod(total, parts)
+    return [base + (i < extra) for i in range(parts)]
+
+def _month_days(key, n, rng):
+    start = pd.Period(key, "M")
+    days = rng.integers(0, start.days_in_month, n)
+    return pd.Timestamp(start.start_time) + pd.to_timedelta(np.sort(days), unit="D")
+
+def _transactions(key, n, customers, vendors, rng):
+    income = rng.random(n) < 0.3
+    idx = pd.Series(np.arange(n)).astype(str)
+    return pd.DataFrame({
+        "Date": _month_days(key, n, rng),
+        "Type": np.where(income, "income", "expense"),
+        "Category": np.where(income, rng.choice(INCOME_CATEGORIES, n), rng.choice(EXPENSE_CATEGORIES, n)),
+        "Description": ("Synthetic " + key + " #" + idx).to_numpy(),
+        "CustomerOrVendor": np.where(income, rng.choice(customers, n), rng.choice(vendors, n)),
+        "Amount": rng.lognormal(4.0, 1.2, n).round(2),
+        "PaymentMethod": rng.choice(["Bank", "Card", "Cash", "Check"], n),
+        "Reference": "",
+        "LinkedDoc": "",
+    })
+
+def _invoices(key, n, customers, rng):
+    date = _month_days(key, n, rng)
+    qty = rng.integers(1, 10, n).astype(float)
+    rate = rng.uniform(20, 400, n).round(2)
+    return pd.DataFrame({
+        "InvoiceID": [f"INV{i:04d}" for i in range(1, n + 1)],
+        "Date": date,
+        "DueDate": date + pd.Timedelta(days=14),
+        "CustomerName": rng.choice(customers, n),
+        "Item": rng.choice(["Consulting", "Support", "Widget", "License"], n),
+        "Qty": qty,
+        "Rate": rate,
+        "Amount": (qty * rate).round(2),
+        "Status": rng.choice(["Paid", "Unpaid"], n),
+        "Notes": "",
+    })
+
+def _employees(k, rng):
+    hourly = np.arange(k) % 2 == 0
+    return pd.DataFrame({
+        "EmployeeName": [f"Employee {i:04d}" for i in range(k)],
+        "Type": np.where(hourly, "hourly", "salary"),
+        "HourlyRate": np.where(hourly, rng.uniform(15, 60, k).round(2), 0.0),
+        "Salary": np.where(hourly, 0.0, rng.uniform(40000, 120000, k).round(-2)),
+        "TaxRate": rng.uniform(0.1, 0.3, k).round(2),
+        "Notes": "",
+    })
+
+def _payslips(key, emp):
+    gross = np.where(emp["Type"] == "hourly", emp["HourlyRate"] * 80.0, emp["Salary"] / 26.0).round(2)
+    tax = (gross * emp["TaxRate"]).round(2)
+    return pd.DataFrame({
+        "PayslipID": [f"PAY{i:04d}" for i in range(1, len(emp) + 1)],
+        "Date": pd.Timestamp(pd.Period(key, "M").end_time.normalize()),
+        "EmployeeName": emp["EmployeeName"].to_numpy(),
+        "Hours": np.where(emp["Type"] == "hourly", 80.0, 0.0),
+        "Gross": gross, "Tax": tax, "Net": (gross - tax).round(2), "Notes": "",
+    })
+
+def month_keys_ending_now(months):
+    cur = pd.Period(core.month_key(), "M")
+    return [str(cur - i) for i in reversed(range(months))]
+
+def generate_ledger(data_root, transactions, invoices, employees, months, seed=0):
+    """Write one workbook per month (the last is the current month) under
+    data_root. Earlier months also get their month summary, as if closed."""
+    rng = np.random.default_rng(seed)
+    core.DATA_ROOT = data_root
+    customers = [f"Customer {i:03d}" for i in range(100)]
+    vendors = [f"Vendor {i:03d}" for i in range(50)]
+    emp = _employees(employees, rng)
+    masters = {
+        "Customers": pd.DataFrame({"CustomerName": customers, "Email": "", "Phone": "", "BillingAddress": "", "Notes": ""}),
+        "Vendors": pd.DataFrame({"VendorName": vendors, "Email": "", "Phone": "", "Address": "", "Notes": ""}),
+        "Employees": emp,
+    }
+    keys = month_keys_ending_now(months)
+    for key, n_tx, n_inv in zip(keys, _split(transactions, months), _split(invoices, months)):
+        path = core.excel_path_for(key)
+        core.create_workbook(path, "Benchmark Co")
+        frames = dict(masters)
+        frames["Transactions"] = _transactions(key, n_tx, customers, vendors, rng)
+        frames["Invoices"] = _invoices(key, n_inv, customers, rng)
+        frames["Payslips"] = _payslips(key, emp)
+        core.set_excel_path(path)
+        with core.SheetTransaction() as uow:
+            for sheet, df in frames.items():
+                uow.write(df, sheet)
+        core.sync_workbook()
+        if key != keys[-1]:
+            core.write_month_summary(key, core.transaction_aggregates())
+    core.set_excel_path(None)
+    core.reset_caches()
+    return keys
+
+def bank_csv(path, n, rng):
+    # half the rows repeat ledger rows (exercises the duplicate check), half are new
+    tx = core.read_sheet("Transactions")
+    dup = tx.sample(n=min(n // 2, len(tx)), random_state=int(rng.integers(1 << 31)))
+    new = n - len(dup)
+    amount = np.where(dup["Type"] == "income", dup["Amount"], -dup["Amount"])
+    pd.concat([
+        pd.DataFrame({"Date": dup["Date"].dt.strftime("%Y-%m-%d"), "Amount": amount,
+                      "Description": dup["Description"], "Party": dup["CustomerOrVendor"]}),
+        pd.DataFrame({"Date": _month_days(core.month_key(), new, rng).strftime("%Y-%m-%d"),
+                      "Amount": rng.normal(0, 200, new).round(2), "Description": "Bank import",
+                      "Party": rng.choice(["Vendor 001", "Customer 002", ""], new)}),
+    ], ignore_index=True).to_csv(path, index=False)
+
+BANK_MAPPING = {"Date": "Date", "Amount": "Amount", "Description": "Description", "Party": "Party"}
+
+# ---------- Timing ----------
+def measure(name, fn, repeat=1, setup=None):
+    times, out = [], None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        out = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    t = np.array(times)
+    return {"bench": name, "repeat": repeat, "min_ms": round(t.min(), 3),
+            "median_ms": round(float(np.median(t)), 3), "max_ms": round(t.max(), 3)}, out
+
+def run_benchmarks(work, spec, repeat):
+    """Yield one result dict per benchmark, run against a copy of the
+    generated ledger for `spec`."""
+    rng = np.random.default_rng(spec["seed"] + 1)
+    core.DATA_ROOT = os.path.join(work, "data")
+    cur = core.month_key()
+    path = core.excel_path_for(cur)
+    prev = month_keys_ending_now(spec["months"])[0]
+    core.set_excel_path(path)
+    hourly = core.read_sheet("Employees").query("Type == 'hourly'")["EmployeeName"].iloc[0]
+
+    def cold():
+        core.reset_caches()
+
+    def reports_cold():
+        # only the reports are cold: reload the sheet and month summaries first
+        core.reset_caches()
+        core.history_aggregates()
+
+    def drop_sidecar():
+        cold()
+        shutil.rmtree(core.sidecar_dir_for(path), ignore_errors=True)
+
+    yield measure("read_sheet_xlsx", lambda: core.read_sheet("Transactions"), 1, drop_sidecar)
+    yield measure("read_sheet_cold", lambda: core.read_sheet("Transactions"), repeat, cold)
+    yield measure("read_sheet_cached", lambda: core.read_sheet("Transactions"), repeat)
+    tx = core.read_sheet("Transactions")
+    yield measure("format_table_rows", lambda: core.format_rows(core.TX_TABLE_COLUMNS, tx), repeat)
+
+    csv_path = os.path.join(work, "bank.csv")
+    bank_csv(csv_path, len(tx), rng)
+    raw = pd.read_csv(csv_path)
+    yield measure("normalize_bank_rows", lambda: core.normalize_bank_rows(raw, BANK_MAPPING), repeat)
+
+    yield measure("add_transaction", lambda: core.add_transaction(f"{cur}-15", "expense", "Supplies", 12.5, "Bench", "Vendor 001"),
+                  repeat * 5)
+    yield measure("create_invoice", lambda: core.create_invoice(f"{cur}-15", f"{cur}-28", "Customer 001", "Widget", 2, 10.0),
+                  repeat * 5)
+    yield measure("run_payroll", lambda: core.run_payroll(f"{cur}-15", hourly, 8.0), repeat * 5)
+    yield measure("run_payroll_batch", lambda: core.run_payroll_batch(f"{cur}-15", {hourly: 8.0}), repeat)
+    yield measure("compute_reports_cold", core.compute_reports, repeat, reports_cold)
+    yield measure("build_reports", core.build_reports, repeat, reports_cold)
+
+    scratch = os.path.join(work, "new_month.xlsx")
+    yield measure("create_new_month_from_previous",
+                  lambda: core.create_new_month_from_previous(core.excel_path_for(prev), scratch), repeat)
+    core.set_excel_path(path)
+
+    res, (added, skipped) = measure("import_bank_csv", lambda: core.import_bank_csv(csv_path, BANK_MAPPING), 1)
+    res.update(added=added, skipped=len(skipped))
+    yield res, None
+    yield measure("sync_workbook", core.sync_workbook, 1)
+    core.set_excel_path(None)
+
+# ---------- Runner ----------
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+def _ledger(work_root, spec):
+    # generated once per spec and reused; benchmarks run on a copy
+    name = "ledger-{transactions}-{invoices}-{employees}-{months}-{seed}".format(**spec)
+    src = os.path.join(work_root, name)
+    manifest = os.path.join(src, "spec.json")
+    want = dict(spec, month=core.month_key())
+    if os.path.exists(manifest):
+        with open(manifest, encoding="utf-8") as f:
+            if json.load(f) == want:
+                return src
+    shutil.rmtree(src, ignore_errors=True)
+    t0 = time.perf_counter()
+    generate_ledger(os.path.join(src, "data"), spec["transactions"], spec["invoices"], spec["employees"],
+                    spec["months"], spec["seed"])
+    print(f"generated {name} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump(want, f)
+    return src
+
+def compare(results, baseline_path):
+    base = {}
+    with open(baseline_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                r = json.loads(line)
+                base[(r["bench"], r["transactions"])] = r
+    print(f"{'bench':32} {'rows':>9} {'old ms':>11} {'new ms':>11} {'ratio':>7}", file=sys.stderr)
+    for r in results:
+        old = base.get((r["bench"], r["transactions"]))
+        if old and old["median_ms"]:
+            print(f"{r['bench']:32} {r['transactions']:>9} {old['median_ms']:>11.1f} {r['median_ms']:>11.1f} "
+                  f"{r['median_ms'] / old['median_ms']:>6.2f}x", file=sys.stderr)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="bench_ledger.py", description="Time the ledger backend on synthetic data.")
+    ap.add_argument("--transactions", default="1000,100000",
+                    help="comma-separated ledger sizes (transactions across all months)")
+    ap.add_argument("--invoices", type=int, help="invoices across all months (default: transactions / 20)")
+    ap.add_argument("--employees", type=int, default=25)
+    ap.add_argument("--months", type=int, default=3)
+    ap.add_argument("--repeat", type=int, default=3, help="runs per benchmark (single writes run 5x this)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--work", help="folder for generated ledgers, kept between runs (default: system temp)")
+    ap.add_argument("--backend", choices=["excel", "sqlite"], default=core.STORAGE_BACKEND)
+    ap.add_argument("--out", help="append results to this file (JSON lines)")
+    ap.add_argument("--compare", metavar="FILE", help="print median ratios against an earlier --out file")
+    args = ap.parse_args(argv)
+
+    core.STORAGE_BACKEND = args.backend
+    work_root = args.work or os.path.join(tempfile.gettempdir(), "rainbow_ledger_bench")
+    meta = {"rev": _git_rev(), "python": platform.python_version(), "pandas": pd.__version__,
+            "backend": args.backend, "at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    results = []
+    for n in [int(x) for x in args.transactions.split(",") if x.strip()]:
+        spec = {"transactions": n, "invoices": args.invoices if args.invoices is not None else max(n // 20, 1),
+                "employees": args.employees, "months": args.months, "seed": args.seed}
+        src = _ledger(work_root, spec)
+        work = tempfile.mkdtemp(prefix="run-", dir=work_root)
+        try:
+            shutil.copytree(os.path.join(src, "data"), os.path.join(work, "data"))
+            for res, _ in run_benchmarks(work, spec, args.repeat):
+                res = {**res, **spec, **meta}
+                results.append(res)
+                print(json.dumps(res), flush=True)
+                if args.out:
+                    with open(args.out, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(res) + "\n")
+        finally:
+            core.set_excel_path(None)
+            shutil.rmtree(work, ignore_errors=True)
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,34 +2,42 @@
 # rainbow_ledger.py
 # Local Python + Excel finance app with a Tkinter GUI and monthly rollover.
 # Now includes: Smart Help panel, Command Palette, shortcuts, CSV import/export QoL.
+# The storage/report backend lives in ledger_core.py and is imported after the
+# window is up, so the banner paints before pandas/openpyxl finish loading.
 # Requirements: pip install pandas openpyxl
 
+import time
+_STARTED = time.perf_counter()  # time-to-first-paint / time-to-interactive are measured from here
+
 import os
 import sys
 import shutil
-import csv
 import random
+import itertools
+import threading
+import queue
+import multiprocessing
 from datetime import datetime, timedelta
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
-
 APP_TITLE = "Rainbow Ledger — Local Excel Finance"
-APP_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_ROOT = os.path.join(APP_DIR, "data")
 
-EXCEL_FILENAME = "company_finance.xlsx"
-EXCEL_PATH = None  # set at runtime by bootstrap_month_rotation()
+# I/O results are polled every IO_POLL_BUSY_MS while jobs are queued; the
+# poll is parked when nothing is queued and a submit wakes it again.
+IO_POLL_BUSY_MS = 40
+
+# Banner animation: frames per second, and low-power mode (no animation at
+# all) for thin clients; both can also be changed from the Command Palette.
+BANNER_FPS = float(os.environ.get("RAINBOW_LEDGER_BANNER_FPS", "8"))
+LOW_POWER_MODE = os.environ.get("RAINBOW_LEDGER_LOW_POWER", "") not in ("", "0")
 
 # ---------- Smart Help KB ----------
 HELP_CONTENT = [
     {
         "topic": "Dashboard",
         "q": "What is the Dashboard",
-        "a": "The Dashboard shows YTD Income, YTD Expenses, YTD Net, and a P&L by Month preview. Use Refresh to update after you add invoices, transactions, or payroll."
+        "a": "The Dashboard shows YTD Income, YTD Expenses, YTD Net, and Trailing 12M Net across all months in data/, plus a P&L by Month preview with last year's net for comparison. Closed months are read from their saved summaries, so this stays fast. Use Refresh to update after you add invoices, transactions, or payroll."
     },
     {
         "topic": "Transactions",
@@ -39,13 +47,18 @@ HELP_CONTENT = [
     {
         "topic": "Transactions",
         "q": "Import bank CSV",
-        "a": "Click Import Bank CSV. Map your CSV columns to Date, Amount, Description, Type, Category, Party, and Method. The app will add rows to the Transactions sheet."
+        "a": "Click Import Bank CSV. Map your CSV columns to Date, Amount, Description, Type, Category, Party, and Method. The app will add rows to the Transactions sheet in batches, with a progress bar; you can keep using the app, and Cancel stops after the current batch (rows already added are kept). Rows already in the ledger (same date, amount, description and party, in any month) are skipped and listed at the end, where you can still import them."
     },
     {
         "topic": "Invoices",
         "q": "Create an invoice",
         "a": "Go to Invoices. Set Date and Due Date. Pick Customer, Item, Qty, Rate, and optional Notes. Click Create Invoice. It creates an invoice row and a Sales income transaction."
     },
+    {
+        "topic": "Invoices",
+        "q": "Create many invoices from CSV",
+        "a": "Click Import Invoices CSV. The file needs Customer, Item, Qty, and Rate columns, and may have Date, Due Date, and Notes. Due Date defaults to 14 days after Date. Every row becomes an invoice plus a Sales income transaction, saved in one step."
+    },
     {
         "topic": "Invoices",
         "q": "Mark an invoice paid",
@@ -61,10 +74,15 @@ HELP_CONTENT = [
         "q": "Run payroll",
         "a": "Pick an Employee, enter Hours (ignored for salary), set Date, and click Run. It creates a Payslip and two expense transactions: Wages and Taxes and Licenses."
     },
+    {
+        "topic": "Payroll",
+        "q": "Run payroll for everyone",
+        "a": "Set Date and click Run All Employees. Pick a CSV with EmployeeName and Hours columns for hourly staff, or choose No to pay salaried staff only. All payslips and their Wages and Taxes transactions are saved in one step."
+    },
     {
         "topic": "Reports",
         "q": "Build reports",
-        "a": "In Reports, click Build or Refresh. The app writes P&L by Month, YTD Summary, and Category Totals into the Reports sheet. Use Export Reports (CSV) on the Dashboard to share."
+        "a": "In Reports, click Build or Refresh. The app writes P&L by Month, YTD Summary, Category Totals, Trailing 12 Months, and Year over Year into the Reports sheet. Use Export Reports (CSV) on the Dashboard to share."
     },
     {
         "topic": "Settings",
@@ -81,11 +99,31 @@ HELP_CONTENT = [
         "q": "Print invoice or save as PDF",
         "a": "Open Workbook from the top bar. In Excel, use File > Print or Save As > PDF. You can format the Invoices sheet or create a print-friendly sheet for styling."
     },
+    {
+        "topic": "Excel",
+        "q": "When is the workbook saved",
+        "a": "Edits are saved instantly to a journal file next to the workbook, then written into the .xlsx a few seconds later, when you switch or close a month, open or back up the workbook, and on exit. If the app stops unexpectedly, the journal is replayed on the next start. Loading and saving run in the background, so the window stays responsive; a Working… indicator shows at the top right while they do."
+    },
     {
         "topic": "Rollover",
         "q": "Monthly rollover",
         "a": "Files are stored in data/YYYY-MM. On a new month, the app finalizes last month (builds reports and saves a FINAL copy) then starts a clean workbook that carries over master data."
     },
+    {
+        "topic": "Rollover",
+        "q": "Rebuild all closed months",
+        "a": "After fixing categories or old data, press Ctrl+K and run Month: Rebuild All Closed Months. Every month before this one gets fresh Reports and a new FINAL copy, several months at a time. From a terminal: python finance_app_gui.py --rebuild-months [--only YYYY-MM] [--workers N], or python -m ledger_cli rebuild-months."
+    },
+    {
+        "topic": "Performance",
+        "q": "Why is something slow",
+        "a": "Press Ctrl+K and run Performance: Show Timings. It lists how long reads, saves, report builds, table refreshes and import steps took (median, 90th and 99th percentile, slowest) and the slowest recent calls. Every call is also logged to data/perf.log. Anything over the warning threshold (1000 ms unless RAINBOW_LEDGER_SLOW_MS is set; change it in the panel) pops up a notice."
+    },
+    {
+        "topic": "Performance",
+        "q": "Low-power mode",
+        "a": "On slow or shared machines, press Ctrl+K and run View: Toggle Low-Power Mode to stop the banner animation and confetti. Set RAINBOW_LEDGER_LOW_POWER=1 to start in low-power mode, or RAINBOW_LEDGER_BANNER_FPS to change the animation speed (default 8 frames per second). The banner never animates while the window is minimized."
+    },
     {
         "topic": "Keyboard",
         "q": "Keyboard shortcuts",
@@ -93,439 +131,211 @@ HELP_CONTENT = [
     },
 ]
 
-# -------------------------------
-# Backend helpers (Excel + pandas)
-# -------------------------------
-
-DEFAULT_CATEGORIES = [
-    # Expenses (simplified Schedule C-ish)
-    "Advertising","Car and Truck Expenses","Contract Labor","Depreciation","Employee Benefit Programs",
-    "Insurance (Other)","Interest (Mortgage)","Interest (Other)","Legal and Professional Services",
-    "Office Expenses","Rent or Lease (Vehicles)","Rent or Lease (Other)","Repairs and Maintenance",
-    "Supplies","Taxes and Licenses","Travel","Meals (50%)","Utilities","Wages","Other Expenses",
-    # Income
-    "Sales","Services","Other Income"
-]
-
-def set_excel_path(path):
-    global EXCEL_PATH
-    EXCEL_PATH = path
-
-def month_key(dt=None):
-    return (dt or datetime.today()).strftime("%Y-%m")
-
-def month_dir(key=None):
-    k = key or month_key()
-    d = os.path.join(DATA_ROOT, k)
-    os.makedirs(d, exist_ok=True)
-    return d
-
-def excel_path_for(key=None):
-    return os.path.join(month_dir(key), EXCEL_FILENAME)
-
-def _autosize(ws):
-    for col in ws.columns:
-        max_len = 10
-        letter = get_column_letter(col[0].column)
-        for cell in col:
-            v = cell.value
-            if v is not None:
-                max_len = max(max_len, len(str(v)))
-        ws.column_dimensions[letter].width = max_len + 2
-
-def create_workbook(path, company_name="My Company"):
-    wb = Workbook()
-
-    ws = wb.active
-    ws.title = "Settings"
-    ws.append(["Key","Value"])
-    ws.append(["CompanyName", company_name])
-    ws.append(["BaseCurrency","USD"])
-    _autosize(ws)
-
-    ws = wb.create_sheet("ChartOfAccounts")
-    ws.append(["Category","Type"])
-    for c in DEFAULT_CATEGORIES:
-        t = "income" if c in ["Sales","Services","Other Income"] else "expense"
-        ws.append([c, t])
-    _autosize(ws)
-
-    ws = wb.create_sheet("Customers")
-    ws.append(["CustomerName","Email","Phone","BillingAddress","Notes"])
-    _autosize(ws)
-
-    ws = wb.create_sheet("Vendors")
-    ws.append(["VendorName","Email","Phone","Address","Notes"])
-    _autosize(ws)
-
-    ws = wb.create_sheet("Employees")
-    ws.append(["EmployeeName","Type","HourlyRate","Salary","TaxRate","Notes"])
-    _autosize(ws)
-
-    ws = wb.create_sheet("Transactions")
-    ws.append(["Date","Type","Category","Description","CustomerOrVendor","Amount","PaymentMethod","Reference","LinkedDoc"])
-    _autosize(ws)
-
-    ws = wb.create_sheet("Invoices")
-    ws.append(["InvoiceID","Date","DueDate","CustomerName","Item","Qty","Rate","Amount","Status","Notes"])
-    _autosize(ws)
-
-    ws = wb.create_sheet("Payslips")
-    ws.append(["PayslipID","Date","EmployeeName","Hours","Gross","Tax","Net","Notes"])
-    _autosize(ws)
-
-    ws = wb.create_sheet("Reports")
-    ws.append(["ReportName","AsOf","Notes"])
-    _autosize(ws)
-
-    wb.save(path)
-
-def find_last_workbook():
-    if not os.path.isdir(DATA_ROOT):
-        return None
-    keys = [k for k in os.listdir(DATA_ROOT) if os.path.isdir(os.path.join(DATA_ROOT, k))]
-    keys = sorted([k for k in keys if len(k) == 7 and k[4] == "-"])  # YYYY-MM
-    for k in reversed(keys):
-        p = os.path.join(DATA_ROOT, k, EXCEL_FILENAME)
-        if os.path.exists(p):
-            return k, p
-    return None
-
-def get_default_columns_for_sheet(sheet):
-    defaults = {
-        "Settings": ["Key","Value"],
-        "ChartOfAccounts": ["Category","Type"],
-        "Customers": ["CustomerName","Email","Phone","BillingAddress","Notes"],
-        "Vendors": ["VendorName","Email","Phone","Address","Notes"],
-        "Employees": ["EmployeeName","Type","HourlyRate","Salary","TaxRate","Notes"],
-    }
-    return defaults.get(sheet, [])
-
-def create_new_month_from_previous(prev_path, current_path):
-    masters = ["Settings","ChartOfAccounts","Customers","Vendors","Employees"]
-    tx_sheets = {
-        "Transactions": ["Date","Type","Category","Description","CustomerOrVendor","Amount","PaymentMethod","Reference","LinkedDoc"],
-        "Invoices":     ["InvoiceID","Date","DueDate","CustomerName","Item","Qty","Rate","Amount","Status","Notes"],
-        "Payslips":     ["PayslipID","Date","EmployeeName","Hours","Gross","Tax","Net","Notes"],
-        "Reports":      ["ReportName","AsOf","Notes"],
-    }
-    with pd.ExcelWriter(current_path, engine="openpyxl") as xw:
-        for s in masters:
-            try:
-                df = pd.read_excel(prev_path, sheet_name=s)
-                if df is None or df.empty:
-                    df = pd.DataFrame(columns=get_default_columns_for_sheet(s))
-            except Exception:
-                df = pd.DataFrame(columns=get_default_columns_for_sheet(s))
-            df.to_excel(xw, sheet_name=s, index=False)
-        for s, cols in tx_sheets.items():
-            pd.DataFrame(columns=cols).to_excel(xw, sheet_name=s, index=False)
-
-def archive_prev_month(prev_key, prev_path):
-    set_excel_path(prev_path)
-    try:
-        build_reports()
-    except Exception:
-        pass
-    final_path = os.path.join(DATA_ROOT, prev_key, f"company_finance_FINAL_{prev_key}.xlsx")
-    try:
-        shutil.copy2(prev_path, final_path)
-    except Exception:
-        pass
-
-def bootstrap_month_rotation(force_close=None, switch_to=None):
-    os.makedirs(DATA_ROOT, exist_ok=True)
-    if switch_to:
-        # switch to existing month key if exists (or create if not)
-        path = excel_path_for(switch_to)
-        if not os.path.exists(path):
-            last = find_last_workbook()
-            if last:
-                _, last_path = last
-                create_new_month_from_previous(last_path, path)
-            else:
-                create_workbook(path, "My Company")
-        set_excel_path(path)
-        return
-
-    cur_key = month_key()
-    cur_path = excel_path_for(cur_key)
-    last = find_last_workbook()
-
-    if force_close and last:
-        last_key, last_path = last
-        archive_prev_month(last_key, last_path)
-
-    if last:
-        last_key, last_path = last
-        if last_key != cur_key:
-            archive_prev_month(last_key, last_path)
-            if not os.path.exists(cur_path):
-                create_new_month_from_previous(last_path, cur_path)
-
-    if not os.path.exists(cur_path):
-        create_workbook(cur_path, "My Company")
-
-    set_excel_path(cur_path)
-
-def ensure_workbook():
-    if not os.path.exists(EXCEL_PATH):
-        company = simpledialog.askstring("Welcome", "Enter your Company Name:", initialvalue="My Company")
-        if not company:
-            company = "My Company"
-        create_workbook(EXCEL_PATH, company_name=company)
+# ---------- Backend loading ----------
+# ledger_core (pandas, openpyxl) is most of the cold start. The app imports it
+# on a background thread behind a splash; everything below reaches the backend
+# through `core` and only runs once it is loaded.
+core = None
+pd = None
 
-def read_sheet(sheet):
-    return pd.read_excel(EXCEL_PATH, sheet_name=sheet)
+def load_backend():
+    global core, pd
+    if core is None:
+        import pandas
+        import ledger_core
+        core, pd = ledger_core, pandas
+    return core
 
-def write_sheet(df, sheet):
-    with pd.ExcelWriter(EXCEL_PATH, engine="openpyxl", mode="a", if_sheet_exists="replace") as xw:
-        df.to_excel(xw, sheet_name=sheet, index=False)
-
-def get_company_name():
-    try:
-        s = read_sheet("Settings")
-        row = s.loc[s["Key"]=="CompanyName"]
-        if not row.empty:
-            return str(row.iloc[0]["Value"])
-        return "My Company"
-    except Exception:
-        return "My Company"
-
-def set_company_name(new_name):
-    s = read_sheet("Settings")
-    if (s["Key"]=="CompanyName").any():
-        s.loc[s["Key"]=="CompanyName", "Value"] = new_name
-    else:
-        s = pd.concat([s, pd.DataFrame([{"Key":"CompanyName","Value":new_name}])], ignore_index=True)
-    write_sheet(s, "Settings")
-
-def get_categories_df():
-    try:
-        return read_sheet("ChartOfAccounts")
-    except Exception:
-        create_workbook(EXCEL_PATH, get_company_name())
-        return read_sheet("ChartOfAccounts")
-
-def get_categories(kind=None):
-    df = get_categories_df()
-    if kind in ("income","expense"):
-        return sorted(df[df["Type"]==kind]["Category"].astype(str).tolist())
-    return sorted(df["Category"].astype(str).tolist())
-
-def add_category(name, ctype):
-    df = get_categories_df()
-    if ((df["Category"] == name) & (df["Type"] == ctype)).any():
-        return
-    df = pd.concat([df, pd.DataFrame([{"Category":name, "Type":ctype}])], ignore_index=True)
-    write_sheet(df, "ChartOfAccounts")
-
-def remove_category(name):
-    df = get_categories_df()
-    df = df[df["Category"] != name]
-    write_sheet(df, "ChartOfAccounts")
-
-def next_id(df, col, prefix):
-    if df.empty:
-        return f"{prefix}0001"
-    s = (
-        df[col].dropna().astype(str)
-        .str.replace(prefix,"", regex=False)
-        .str.extract(r"(\d+)")
-        .dropna()
-    )
-    if s.empty:
-        return f"{prefix}0001"
-    n = int(s.max()[0]) + 1
-    return f"{prefix}{n:04d}"
-
-def add_customer(name, email="", phone="", billing="", notes=""):
-    df = read_sheet("Customers")
-    new = pd.DataFrame([{"CustomerName":name,"Email":email,"Phone":phone,"BillingAddress":billing,"Notes":notes}])
-    df = pd.concat([df, new], ignore_index=True)
-    write_sheet(df, "Customers")
-
-def get_customers():
-    try:
-        return read_sheet("Customers")["CustomerName"].dropna().astype(str).tolist()
-    except Exception:
-        return []
-
-def add_employee(name, etype="hourly", hourly_rate=0.0, salary=0.0, taxrate=0.1, notes=""):
-    df = read_sheet("Employees")
-    new = pd.DataFrame([{"EmployeeName":name,"Type":etype,"HourlyRate":hourly_rate,"Salary":salary,"TaxRate":taxrate,"Notes":notes}])
-    df = pd.concat([df, new], ignore_index=True)
-    write_sheet(df, "Employees")
-
-def get_employees():
-    try:
-        return read_sheet("Employees")["EmployeeName"].dropna().astype(str).tolist()
-    except Exception:
-        return []
-
-def add_transaction(date, ttype, category, amount, description="", party="", paymethod="", reference="", linked=""):
-    df = read_sheet("Transactions")
-    new = pd.DataFrame([{
-        "Date": pd.to_datetime(date),
-        "Type": ttype,
-        "Category": category,
-        "Description": description,
-        "CustomerOrVendor": party,
-        "Amount": float(amount),
-        "PaymentMethod": paymethod,
-        "Reference": reference,
-        "LinkedDoc": linked
-    }])
-    df = pd.concat([df, new], ignore_index=True)
-    write_sheet(df, "Transactions")
-
-def create_invoice(date, due_date, customer, item, qty, rate, notes=""):
-    inv_df = read_sheet("Invoices")
-    inv_id = next_id(inv_df, "InvoiceID", "INV")
-    amount = float(qty) * float(rate)
-
-    new_inv = pd.DataFrame([{
-        "InvoiceID":inv_id,"Date":pd.to_datetime(date),"DueDate":pd.to_datetime(due_date),
-        "CustomerName":customer,"Item":item,"Qty":float(qty),"Rate":float(rate),
-        "Amount":amount,"Status":"Unpaid","Notes":notes
-    }])
-    inv_df = pd.concat([inv_df, new_inv], ignore_index=True)
-    write_sheet(inv_df, "Invoices")
-
-    add_transaction(date, "income", "Sales", amount, f"Invoice {inv_id}: {item} x{qty}", customer, "Invoice", inv_id, inv_id)
-    return inv_id, amount
-
-def mark_invoice_paid(invoice_id, date, method="Bank"):
-    inv_df = read_sheet("Invoices")
-    if not (inv_df["InvoiceID"] == invoice_id).any():
-        raise ValueError("Invoice not found")
-    inv_df.loc[inv_df["InvoiceID"] == invoice_id, "Status"] = "Paid"
-    write_sheet(inv_df, "Invoices")
-    add_transaction(date, "income", "Other Income", 0.0, f"Payment received for {invoice_id}", "", method, invoice_id, invoice_id)
-
-def run_payroll(date, employee, hours=0.0):
-    emp_df = read_sheet("Employees")
-    row = emp_df[emp_df["EmployeeName"]==employee]
-    if row.empty:
-        raise ValueError("Employee not found")
-    r = row.iloc[0]
-    etype = str(r["Type"]).strip().lower()
-    taxrate = float(r["TaxRate"] or 0.1)
-    if etype == "hourly":
-        gross = float(hours) * float(r["HourlyRate"] or 0.0)
-    else:
-        gross = float(r["Salary"] or 0.0) / 26.0
-    tax = round(gross * taxrate, 2)
-    net = round(gross - tax, 2)
-
-    ps_df = read_sheet("Payslips")
-    ps_id = next_id(ps_df, "PayslipID", "PAY")
-    new_ps = pd.DataFrame([{
-        "PayslipID":ps_id,"Date":pd.to_datetime(date),"EmployeeName":employee,"Hours":float(hours),
-        "Gross":gross,"Tax":tax,"Net":net,"Notes":""
-    }])
-    ps_df = pd.concat([ps_df, new_ps], ignore_index=True)
-    write_sheet(ps_df, "Payslips")
-
-    add_transaction(date, "expense", "Wages", gross, f"Payroll gross {ps_id}", employee, "Bank", ps_id, ps_id)
-    add_transaction(date, "expense", "Taxes and Licenses", tax, f"Payroll tax {ps_id}", employee, "Bank", ps_id, ps_id)
-    return ps_id, gross, tax, net
-
-def build_reports():
-    tx = read_sheet("Transactions")
-    if tx.empty:
-        rep = pd.DataFrame([{"ReportName":"No data yet","AsOf":pd.Timestamp.today(),"Notes":""}])
-        write_sheet(rep, "Reports")
-        return rep
-
-    tx["Date"] = pd.to_datetime(tx["Date"])
-    tx["YearMonth"] = tx["Date"].dt.to_period("M").astype(str)
-
-    income = tx[tx["Type"]=="income"].groupby("YearMonth")["Amount"].sum().rename("Income")
-    exp = tx[tx["Type"]=="expense"].groupby("YearMonth")["Amount"].sum().rename("Expenses")
-    pnl = pd.concat([income, exp], axis=1).fillna(0.0)
-    pnl["NetProfit"] = pnl["Income"] - pnl["Expenses"]
-    pnl = pnl.reset_index().rename(columns={"YearMonth":"Period"})
-
-    ytd_income = tx[tx["Type"]=="income"]["Amount"].sum()
-    ytd_exp = tx[tx["Type"]=="expense"]["Amount"].sum()
-    ytd = pd.DataFrame([
-        {"Metric":"YTD Income","Amount":ytd_income},
-        {"Metric":"YTD Expenses","Amount":ytd_exp},
-        {"Metric":"YTD Net","Amount":ytd_income - ytd_exp}
-    ])
-
-    cat_totals = (tx.groupby(["Type","Category"])["Amount"]
-                  .sum().reset_index()
-                  .sort_values(["Type","Amount"], ascending=[True, False]))
-
-    with pd.ExcelWriter(EXCEL_PATH, engine="openpyxl", mode="a", if_sheet_exists="replace") as xw:
-        pd.DataFrame([{"ReportName":"P&L by Month","AsOf":pd.Timestamp.today(),"Notes":""}]).to_excel(
-            xw, "Reports", index=False, startrow=0
-        )
-        pnl.to_excel(xw, "Reports", index=False, startrow=2)
-
-        start2 = 2 + pnl.shape[0] + 2
-        pd.DataFrame([{"ReportName":"YTD Summary","AsOf":pd.Timestamp.today(),"Notes":""}]).to_excel(
-            xw, "Reports", index=False, startrow=start2
-        )
-        ytd.to_excel(xw, "Reports", index=False, startrow=start2+2)
-
-        start3 = start2 + 2 + ytd.shape[0] + 2
-        pd.DataFrame([{"ReportName":"Category Totals","AsOf":pd.Timestamp.today(),"Notes":""}]).to_excel(
-            xw, "Reports", index=False, startrow=start3
-        )
-        cat_totals.to_excel(xw, "Reports", index=False, startrow=start3+2)
-
-    return pnl
+def ask_company_name():
+    return simpledialog.askstring("Welcome", "Enter your Company Name:", initialvalue="My Company")
 
 # -------------------------------
 # GUI (Tkinter)
 # -------------------------------
 
+class Animator:
+    """One Tk timer for every periodic UI job in the app.
+
+    subscribe(fn, interval_ms, widget) calls fn() every interval_ms while
+    `widget` is viewable; fn returning False ends the subscription. A job
+    whose widget is hidden (another tab, minimized window) is parked until
+    something is mapped again, and one whose widget was destroyed is dropped;
+    park(handle) does the same on request until wake(handle).
+    Only the earliest due job has an after() pending, and nothing does while
+    every job is parked, so an idle window does not wake the event loop.
+    """
+    def __init__(self, root):
+        self.root = root
+        self._subs = {}  # handle -> [fn, interval ms, widget, due ms or None while parked]
+        self._ids = itertools.count(1)
+        self._job = None
+        self._due = None
+        root.bind_all("<Map>", lambda e: self.wake(), add="+")
+
+    @classmethod
+    def of(cls, widget):
+        root = widget._root()
+        if root.__dict__.get("_animator") is None:
+            root._animator = cls(root)
+        return root._animator
+
+    @property
+    def active(self):
+        # jobs that will run (parked ones excluded)
+        return sum(1 for sub in self._subs.values() if sub[3] is not None)
+
+    @property
+    def parked(self):
+        return len(self._subs) - self.active
+
+    def subscribe(self, fn, interval_ms, widget=None):
+        handle = next(self._ids)
+        self._subs[handle] = [fn, interval_ms, widget, self._now() + interval_ms]
+        self._schedule()
+        return handle
+
+    def later(self, delay_ms, fn):
+        def once():
+            fn()
+            return False
+        return self.subscribe(once, delay_ms)
+
+    def unsubscribe(self, handle):
+        if self._subs.pop(handle, None) is not None:
+            self._schedule()
+
+    def park(self, handle):
+        sub = self._subs.get(handle)
+        if sub is not None and sub[3] is not None:
+            sub[3] = None
+            self._schedule()
+
+    def wake(self, handle=None):
+        # run parked jobs (or `handle`) at the next tick
+        now, changed = self._now(), False
+        for h, sub in self._subs.items():
+            if (handle is None and sub[3] is None) or h == handle:
+                sub[3], changed = now, True
+        if changed:
+            self._schedule()
+
+    def _now(self):
+        return time.monotonic() * 1000
+
+    def _schedule(self):
+        due = min((sub[3] for sub in self._subs.values() if sub[3] is not None), default=None)
+        if due == self._due and (due is None or self._job is not None):
+            return
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        self._due = due
+        if due is not None:
+            self._job = self.root.after(max(int(due - self._now()), 0), self._run)
+
+    def _run(self):
+        self._job = self._due = None
+        now = self._now()
+        for handle, sub in list(self._subs.items()):
+            fn, interval, widget, due = sub
+            if due is None or due > now + 1:
+                continue
+            try:
+                if widget is not None and not widget.winfo_exists():
+                    self._subs.pop(handle, None)
+                    continue
+                if widget is not None and not widget.winfo_viewable():
+                    sub[3] = None
+                    continue
+                sub[3] = now + interval
+                keep = fn()
+            except Exception:
+                keep = False
+                self.root.report_callback_exception(*sys.exc_info())
+            if keep is False:
+                self._subs.pop(handle, None)
+        self._schedule()
+
 class FancyButton(ttk.Button):
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
         self._base_style = kwargs.get("style", "Accent.TButton")
-        self._pulse = False
+        self._pulse = None  # Animator handle while pulsing
         self.bind("<Enter>", self._on)
         self.bind("<Leave>", self._off)
-        self.after(600, self._pulse_tick)
 
     def _on(self, e): self.configure(style="Hover.TButton")
     def _off(self, e): self.configure(style=self._base_style)
-    def enable_pulse(self, on=True): self._pulse = on
+    def enable_pulse(self, on=True):
+        anim = Animator.of(self)
+        if on and self._pulse is None:
+            self._pulse = anim.subscribe(self._pulse_tick, 600, widget=self)
+        elif not on and self._pulse is not None:
+            anim.unsubscribe(self._pulse)
+            self._pulse = None
     def _pulse_tick(self):
-        if self._pulse:
-            cur = self.cget("padding")
-            self.configure(padding=(8 if cur == "10" else 10))
-        self.after(600, self._pulse_tick)
+        cur = self.cget("padding")
+        self.configure(padding=(8 if cur == "10" else 10))
 
 class GradientBanner(tk.Canvas):
-    def __init__(self, master, width=900, height=84, **kwargs):
+    """Rainbow title strip. The bands and title are created once and only
+    moved on <Configure>; band i is tagged band{i % colours}, so a frame of
+    the animation is one itemconfig per colour. Animation runs at `fps` on
+    the app's Animator (parked while hidden) and stops in low-power mode."""
+    STEPS = 40
+
+    def __init__(self, master, width=900, height=84, fps=BANNER_FPS, **kwargs):
         super().__init__(master, width=width, height=height, highlightthickness=0, **kwargs)
         self.cols = ["#ff6b6b","#feca57","#48dbfb","#1dd1a1","#5f27cd"]
         self.offset = 0
+        self.fps = fps
+        self.low_power = LOW_POWER_MODE
+        self._job = None
+        self._size = None
+        for i in range(self.STEPS):
+            self.create_rectangle(0, 0, 0, 0, outline="", tags=("grad", f"band{i % len(self.cols)}"))
+        self.create_text(0, 0, text=APP_TITLE, fill="white", font=("Segoe UI", 20, "bold"), tags="title")
+        self._recolor()
+        self.bind("<Configure>", lambda e: self._layout(e.width, e.height))
         self.animate()
 
+    def _layout(self, w, h):
+        if (w, h) == self._size:
+            return
+        self._size = (w, h)
+        for i, item in enumerate(self.find_withtag("grad")):
+            self.coords(item, int(i / self.STEPS * w), 0, int((i + 1) / self.STEPS * w), h)
+        self.coords("title", w // 2, h // 2)
+
+    def _recolor(self):
+        n = len(self.cols)
+        for band in range(n):
+            self.itemconfigure(f"band{band}", fill=self.cols[(band + self.offset) % n])
+
     def draw_gradient(self):
-        w = self.winfo_width()
-        h = self.winfo_height()
-        self.delete("grad")
-        steps = 40
-        for i in range(steps):
-            c = self.cols[(i + self.offset) % len(self.cols)]
-            x0 = int((i/steps)*w)
-            x1 = int(((i+1)/steps)*w)
-            self.create_rectangle(x0, 0, x1, h, fill=c, outline="", tags="grad")
-        self.delete("title")
-        self.create_text(w//2, h//2, text=APP_TITLE, fill="white",
-                         font=("Segoe UI", 20, "bold"), tags="title")
+        self._size = None
+        self._layout(self.winfo_width(), self.winfo_height())
+        self._recolor()
+
+    def set_low_power(self, on):
+        self.low_power = on
+        if on:
+            self.stop()
+        else:
+            self.animate()
 
     def animate(self):
-        self.draw_gradient()
+        if self._job is None and not self.low_power and self.fps > 0:
+            self._job = Animator.of(self).subscribe(self._tick, int(1000 / self.fps), widget=self)
+
+    def stop(self):
+        if self._job is not None:
+            Animator.of(self).unsubscribe(self._job)
+            self._job = None
+
+    def _tick(self):
         self.offset = (self.offset + 1) % len(self.cols)
-        self.after(120, self.animate)
+        self._recolor()
 
 class ToolTip:
     def __init__(self, widget, text):
@@ -548,6 +358,119 @@ class ToolTip:
             self.tip.destroy()
             self.tip = None
 
+class VirtualTable(ttk.Frame):
+    """Treeview over a list of formatted rows that only has items for the rows
+    in view.
+
+    columns: (heading, source column, width, anchor, formatter). format() turns
+    a DataFrame into row tuples with format_rows() (a formatter maps the
+    source Series to display strings; None means plain text). It touches no
+    widgets, so it can run on the I/O thread. Rows are keyed by their
+    position in the sheet; set_rows() loads everything, apply() takes a
+    commit's changes, and either way only visible items whose text changed
+    are rewritten.
+    """
+    def __init__(self, master, columns, height=18):
+        super().__init__(master)
+        self.columns = columns
+        self.rows = height
+        self.offset = 0
+        self.values = []
+        self._shown = {}  # item id -> values it displays
+
+        bar = ttk.Frame(self); bar.pack(side="bottom", fill="x", pady=(4,0))
+        ttk.Button(bar, text="⏮", width=3, command=lambda: self.scroll_to(0)).pack(side="left")
+        ttk.Button(bar, text="◀ Page", command=lambda: self.scroll_by(-self.rows)).pack(side="left", padx=2)
+        ttk.Button(bar, text="Page ▶", command=lambda: self.scroll_by(self.rows)).pack(side="left", padx=2)
+        ttk.Button(bar, text="⏭", width=3, command=lambda: self.scroll_to(len(self.values))).pack(side="left")
+        self.pos = ttk.Label(bar, text="No rows"); self.pos.pack(side="left", padx=10)
+        go = ttk.Entry(bar, width=8); go.pack(side="right")
+        go.bind("<Return>", lambda e: self._go_to(go.get()))
+        ttk.Label(bar, text="Go to row").pack(side="right", padx=4)
+
+        self.sb = ttk.Scrollbar(self, orient="vertical", command=self._yview); self.sb.pack(side="right", fill="y")
+        self.tv = ttk.Treeview(self, columns=[c[0] for c in columns], show="headings", height=height)
+        for name, _, width, anchor, _ in columns:
+            self.tv.heading(name, text=name)
+            self.tv.column(name, width=width, anchor=anchor)
+        self.tv.pack(side="left", fill="both", expand=True)
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tv.bind(seq, self._on_wheel)
+        self.tv.bind("<Prior>", lambda e: self.scroll_by(-self.rows) or "break")
+        self.tv.bind("<Next>", lambda e: self.scroll_by(self.rows) or "break")
+        self.tv.bind("<Configure>", self._on_resize)
+
+    def format(self, df):
+        return core.format_rows(self.columns, df)
+
+    def set_rows(self, values):
+        self.values = values
+        self.scroll_to(self.offset)
+
+    def apply(self, op, values, first=0):
+        # False when the rows do not line up (a reload is needed)
+        if op == "append":
+            if first > len(self.values):
+                return False
+            del self.values[first:]  # a no-op unless rows were dropped meanwhile
+            self.values.extend(values)
+        else:
+            self.values = values
+        self.scroll_to(self.offset)
+        return True
+
+    def scroll_to(self, offset):
+        self.offset = max(0, min(int(offset), len(self.values) - self.rows))
+        self._render()
+
+    def scroll_by(self, n):
+        self.scroll_to(self.offset + n)
+
+    def _go_to(self, text):
+        try:
+            self.scroll_to(int(text) - 1)
+        except ValueError:
+            pass
+
+    def _yview(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * len(self.values))
+        elif args[0] == "scroll":
+            self.scroll_by(int(args[1]) * (self.rows if args[2] == "pages" else 1))
+
+    def _on_wheel(self, e):
+        up = getattr(e, "num", None) == 4 or getattr(e, "delta", 0) > 0
+        self.scroll_by(-3 if up else 3)
+        return "break"
+
+    def _on_resize(self, e):
+        rowheight = int(ttk.Style(self).lookup("Treeview", "rowheight") or 20)
+        rows = max(1, (e.height - 26) // rowheight)  # less the heading
+        if rows != self.rows:
+            self.rows = rows
+            self.scroll_to(self.offset)
+
+    def _render(self):
+        n = len(self.values)
+        view = self.values[self.offset:self.offset + self.rows]
+        items = self.tv.get_children()
+        for i, v in enumerate(view):
+            if i >= len(items):
+                self._shown[self.tv.insert("", "end", values=v)] = v
+            elif self._shown.get(items[i]) != v:
+                self.tv.item(items[i], values=v)
+                self._shown[items[i]] = v
+        if len(items) > len(view):
+            for iid in items[len(view):]:
+                self._shown.pop(iid, None)
+            self.tv.delete(*items[len(view):])
+        if n:
+            self.sb.set(self.offset / n, (self.offset + len(view)) / n)
+            self.pos.config(text=f"Rows {self.offset + 1:,}–{self.offset + len(view):,} of {n:,}")
+        else:
+            self.sb.set(0, 1)
+            self.pos.config(text="No rows")
+
 class CommandPalette(tk.Toplevel):
     """Simple command palette with fuzzy-ish filtering."""
     def __init__(self, master, commands):
@@ -612,8 +535,10 @@ class CommandPalette(tk.Toplevel):
 class RainbowLedgerApp(tk.Tk):
     def __init__(self):
         super().__init__()
-        bootstrap_month_rotation()
-        ensure_workbook()
+        # every periodic UI job (banner, pulses, toasts, I/O polling) shares one timer
+        self.animator = Animator.of(self)
+        self._startup = []  # (op, ms) until the backend can record them
+        self._painted = False
 
         self.title(APP_TITLE)
         self.geometry("1120x760")
@@ -636,6 +561,68 @@ class RainbowLedgerApp(tk.Tk):
         self.banner = GradientBanner(self, height=84)
         self.banner.pack(fill="x")
 
+        # Splash until pandas/openpyxl are imported on a background thread
+        self.splash = ttk.Frame(self); self.splash.pack(fill="both", expand=True)
+        ttk.Label(self.splash, text="Loading your ledger…", font=("Segoe UI", 12)).pack(pady=(140,10))
+        splash_bar = ttk.Progressbar(self.splash, mode="indeterminate", length=260); splash_bar.pack()
+        splash_bar.start(20)
+        self.bind("<Map>", self._on_first_map, add="+")
+        self._loaded = {}
+        threading.Thread(target=self._load_backend, name="ledger-load", daemon=True).start()
+        self.animator.subscribe(self._backend_ready, 30)
+
+    def _on_first_map(self, e):
+        if e.widget is self and not self._painted:
+            self._painted = True
+            self.after_idle(lambda: self._startup_mark("first_paint"))
+
+    def _startup_mark(self, op, ms=None):
+        # ms defaults to the time since launch; recorded once the backend is in
+        self._startup.append((op, (time.perf_counter() - _STARTED) * 1000 if ms is None else ms))
+        if core is not None:
+            for op, ms in self._startup:
+                core.record_timing(op, ms, detail="startup")
+            self._startup = []
+
+    def _load_backend(self):
+        # background thread: imports and opens the month, never touches Tk.
+        # On a rollover day opening archives last month and writes reports.
+        try:
+            t0 = time.perf_counter()
+            load_backend()
+            self._loaded["import_ms"] = (time.perf_counter() - t0) * 1000
+            t0 = time.perf_counter()
+            self._loaded["first_run"] = core.find_last_workbook() is None
+            core.bootstrap_month_rotation()
+            core.ensure_workbook()
+            self._loaded["open_ms"] = (time.perf_counter() - t0) * 1000
+        except Exception as e:
+            self._loaded["error"] = e
+        self._loaded["done"] = True
+
+    def _backend_ready(self):
+        if "done" not in self._loaded:
+            return True
+        if "error" in self._loaded:
+            messagebox.showerror("Fatal Error", f"Could not load the ledger backend:\n{self._loaded['error']}")
+            self.destroy()
+            return False
+        self.splash.destroy()
+        company = ask_company_name() if self._loaded["first_run"] else None
+        self._build_ui()
+        if company:
+            self._io(core.set_company_name, company, fail="Could not save the company name")
+        self._startup_mark("backend_import", self._loaded["import_ms"])
+        self._startup_mark("open_month", self._loaded["open_ms"])
+        self._startup_mark("time_to_interactive")
+        return False
+
+    def _build_ui(self):
+        # storage runs on one background thread; results are picked up by _io_poll
+        self.io = core.IOExecutor(on_error=lambda e: messagebox.showerror("Error", str(e)), wakeup=self._wake_io_poll)
+        self._io_poll_job = self.animator.subscribe(self._io_poll, IO_POLL_BUSY_MS)
+        self._journal_dirty = threading.Event()
+
         # Top utility bar
         util = ttk.Frame(self); util.pack(fill="x", padx=12, pady=(8,0))
 
@@ -655,17 +642,30 @@ class RainbowLedgerApp(tk.Tk):
         btn_backup = ttk.Button(util, text="Backup Workbook", command=self._backup_workbook); btn_backup.pack(side="left", padx=4)
         ToolTip(btn_backup, "Create a time-stamped backup copy of the current workbook")
 
+        self.busy_bar = ttk.Progressbar(util, mode="indeterminate", length=90)
+        self.busy_lbl = ttk.Label(util, text="Working…")
+        self._busy_shown = False
+
         # Notebook
         self.nb = ttk.Notebook(self); self.nb.pack(fill="both", expand=True, padx=12, pady=12)
 
-        self._build_dashboard_tab()
-        self._build_transactions_tab()
-        self._build_invoices_tab()
-        self._build_customers_tab()
-        self._build_payroll_tab()
-        self._build_reports_tab()
-        self._build_settings_tab()
-        self._build_help_tab()  # new help tab
+        # Tabs stay empty frames until first shown; each builder then queues
+        # its own data load, so the window paints before any sheet is parsed.
+        self._tabs, self._tab_builders = {}, {}
+        for title, build in [("Dashboard", self._build_dashboard_tab), ("Transactions", self._build_transactions_tab),
+                             ("Invoices", self._build_invoices_tab), ("Customers", self._build_customers_tab),
+                             ("Payroll", self._build_payroll_tab), ("Reports", self._build_reports_tab),
+                             ("Settings", self._build_settings_tab), ("Help", self._build_help_tab)]:
+            tab = ttk.Frame(self.nb); self.nb.add(tab, text=title)
+            self._tabs[title] = tab
+            self._tab_builders[str(tab)] = (title, build)
+        self._built = set()
+        self.nb.bind("<<NotebookTabChanged>>", lambda e: self._ensure_tab(self.nb.select()))
+        # commits update these tables in place instead of reloading them
+        self._tables = {}
+        core.COMMIT_LISTENERS.append(self._on_commit)
+        core.SLOW_OP_LISTENERS.append(lambda rec: self.io.post(self._slow_op, rec))
+        self._ensure_tab(self.nb.select())
 
         # Shortcuts + palette
         self.bind_all("<Control-k>", lambda e: self._open_command_palette())
@@ -682,12 +682,91 @@ class RainbowLedgerApp(tk.Tk):
 
         self._register_commands()
 
-        self.after(600, lambda: self._toast(f"Welcome, {get_company_name()}!"))
-        self.after(1400, lambda: self._hint("Tip: Press Ctrl+K to run commands fast"))
+        # Write-behind: debounce journal flushes and fold the journal in on exit.
+        # Journal writes happen on the I/O thread, so they only raise a flag here.
+        self._flush_job = None
+        core.WRITE_LISTENERS.append(lambda _path: self._journal_dirty.set())
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        self.animator.later(600, lambda: self._io(core.get_company_name, done=lambda name: self._toast(f"Welcome, {name}!")))
+        self.animator.later(1400, lambda: self._hint("Tip: Press Ctrl+K to run commands fast"))
 
     # Utilities
+    def _ensure_tab(self, tab_id):
+        entry = self._tab_builders.pop(str(tab_id), None)
+        if entry:
+            title, build = entry
+            self._built.add(title)
+            build(self._tabs[title])
+
+    def _show_tab(self, title):
+        self.nb.select(self._tabs[title])
+        self._ensure_tab(self._tabs[title])
+
+    def _in_tab(self, title, fn):
+        # palette commands that read a tab's fields bring that tab up first
+        def run():
+            self._show_tab(title)
+            fn()
+        return run
+
+    def _fill_choices(self, combo, fn):
+        self._io(fn, done=lambda values: combo.configure(values=values))
+
+    def _io(self, fn, *args, key=None, done=None, fail="Error"):
+        # fn(*args) runs on the I/O thread; done(result) runs back on Tk
+        self.io.submit(fn, *args, key=key, done=done,
+                       error=lambda e: messagebox.showerror("Error", f"{fail}:\n{e}"))
+
+    def _wake_io_poll(self):
+        if threading.current_thread() is threading.main_thread():
+            self.animator.wake(self._io_poll_job)
+
+    def _io_poll(self):
+        # runs while jobs are queued and parks when idle; submitting a job wakes it
+        busy = self.io.pending > 0
+        self.io.run_callbacks()
+        if self._journal_dirty.is_set():
+            self._journal_dirty.clear()
+            self._schedule_flush()
+        busy = busy or self.io.pending > 0
+        if not busy:
+            self.animator.park(self._io_poll_job)
+        if busy != self._busy_shown:
+            self._busy_shown = busy
+            if busy:
+                self.busy_bar.pack(side="right", padx=4); self.busy_lbl.pack(side="right")
+                self.busy_bar.start(15)
+            else:
+                self.busy_bar.stop()
+                self.busy_bar.pack_forget(); self.busy_lbl.pack_forget()
+
+    def _schedule_flush(self, _path=None):
+        if self._flush_job:
+            self.animator.unsubscribe(self._flush_job)
+        self._flush_job = self.animator.later(core.FLUSH_DELAY_MS, self._flush_now)
+
+    def _flush_now(self, done=None):
+        self._flush_job = None
+        self._io(core.sync_workbook, key="flush", done=done,
+                 fail="Saving workbook failed (edits are kept and saved on the next try)")
+
+    def _on_close(self):
+        if self._flush_job:
+            self.animator.unsubscribe(self._flush_job)
+            self._flush_job = None
+        try:
+            self.io.call(core.sync_workbook)  # after any queued edits
+        except Exception as e:
+            if not messagebox.askyesno("Save failed", f"Could not save the workbook:\n{e}\n\n"
+                                       "Edits are kept in the journal/ledger database and written next start. Quit anyway?"):
+                return
+        self.destroy()
+
     def _open_workbook(self):
-        path = EXCEL_PATH
+        self._flush_now(done=lambda _: self._open_path(core.EXCEL_PATH))
+
+    def _open_path(self, path):
         if sys.platform.startswith("win"):
             os.startfile(path)
         elif sys.platform == "darwin":
@@ -696,54 +775,92 @@ class RainbowLedgerApp(tk.Tk):
             os.system(f'xdg-open "{path}"')
 
     def _open_month_folder(self):
-        path = os.path.dirname(EXCEL_PATH)
-        if sys.platform.startswith("win"):
-            os.startfile(path)
-        elif sys.platform == "darwin":
-            os.system(f'open "{path}"')
-        else:
-            os.system(f'xdg-open "{path}"')
+        self._open_path(os.path.dirname(core.EXCEL_PATH))
 
     def _switch_month_dialog(self):
         months = []
-        if os.path.isdir(DATA_ROOT):
-            for k in sorted(os.listdir(DATA_ROOT)):
-                if len(k)==7 and k[4]=='-' and os.path.exists(excel_path_for(k)):
+        if os.path.isdir(core.DATA_ROOT):
+            for k in sorted(os.listdir(core.DATA_ROOT)):
+                if len(k)==7 and k[4]=='-' and os.path.exists(core.excel_path_for(k)):
                     months.append(k)
-        default = month_key()
+        default = core.month_key()
         m = simpledialog.askstring("Switch Month", f"Enter month key (YYYY-MM)\nExisting: {', '.join(months) or 'none'}",
                                    initialvalue=default)
         if not m: return
         try:
-            bootstrap_month_rotation(switch_to=m)
-            ensure_workbook()
+            m = datetime.strptime(m.strip(), "%Y-%m").strftime("%Y-%m")
+        except ValueError:
+            messagebox.showwarning("Switch Month", f"{m!r} is not a YYYY-MM month."); return
+
+        def switched(_):
             self._toast(f"Switched to {m}")
             self._refresh_all()
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not switch:\n{e}")
+        # queued behind any pending edits; creates the month from the last one if needed
+        self._io(lambda: core.bootstrap_month_rotation(switch_to=m), done=switched, fail="Could not switch")
 
     def _close_month(self):
-        try:
-            k = month_key()
-            bootstrap_month_rotation(force_close=True)
-            self._toast(f"{k} finalized.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Close month failed:\n{e}")
+        k = core.month_key()
+        self._io(lambda: core.bootstrap_month_rotation(force_close=True),
+                 done=lambda _: self._toast(f"{k} finalized."), fail="Close month failed")
+
+    def _rebuild_all_months(self):
+        keys = [k for k in core.month_keys() if k < core.month_key()]
+        if not keys:
+            self._toast("No closed months to rebuild"); return
+        if not messagebox.askyesno("Rebuild All Months",
+                                   f"Rebuild Reports and FINAL copies for {len(keys)} months ({keys[0]} to {keys[-1]})?"):
+            return
+        # the workers read the open month from disk, so save it first
+        self._io(core.sync_workbook, done=lambda _: self._start_rebuild(keys), fail="Could not save the open workbook")
+
+    def _start_rebuild(self, keys):
+        win = tk.Toplevel(self); win.title("Rebuilding months"); win.geometry("420x110"); win.transient(self); win.grab_set()
+        win.protocol("WM_DELETE_WINDOW", lambda: None)
+        lbl = ttk.Label(win, text="Starting workers…"); lbl.pack(anchor="w", padx=12, pady=(14,6))
+        bar = ttk.Progressbar(win, maximum=2 * len(keys), length=390); bar.pack(padx=12)
+        q = queue.Queue()
+
+        def work():
+            try:
+                q.put(("done", core.rebuild_months_detached(keys, progress=lambda d, t, m: q.put(("step", (d, m))))))
+            except Exception as e:
+                q.put(("done", {"all": str(e)}))
+
+        def poll():
+            while True:
+                try:
+                    kind, val = q.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "step":
+                    bar["value"] = val[0]; lbl.config(text=val[1])
+                    continue
+                win.grab_release(); win.destroy()
+                self.io.submit(core.reset_caches)
+                self._refresh_all()
+                if val:
+                    messagebox.showwarning("Rebuild finished with errors",
+                                           "\n".join(f"{k}: {e}" for k, e in sorted(val.items())))
+                else:
+                    self._toast(f"Rebuilt {len(keys)} months")
+                return False
+
+        threading.Thread(target=work, daemon=True).start()
+        self.animator.subscribe(poll, 150)
 
     def _backup_workbook(self):
-        try:
-            dst = os.path.join(os.path.dirname(EXCEL_PATH), f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
-            shutil.copy2(EXCEL_PATH, dst)
-            self._toast("Backup created")
-        except Exception as e:
-            messagebox.showerror("Error", f"Backup failed:\n{e}")
+        def backup():
+            core.sync_workbook()
+            dst = os.path.join(os.path.dirname(core.EXCEL_PATH), f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
+            shutil.copy2(core.EXCEL_PATH, dst)
+        self._io(backup, done=lambda _: self._toast("Backup created"), fail="Backup failed")
 
     def _refresh_all(self):
-        self._load_dashboard()
-        self._refresh_tx_table()
-        self._refresh_inv_table()
-        self._refresh_pay_table()
-        self._load_report_preview()
+        # tabs that were never opened load fresh when they are
+        for title, load in [("Dashboard", self._load_dashboard), ("Transactions", self._refresh_tx_table),
+                            ("Invoices", self._refresh_inv_table), ("Payroll", self._refresh_pay_table),
+                            ("Reports", self._load_report_preview)]:
+            if title in self._built: load()
         self._hint("Tip: Press Ctrl+K to run commands fast")
 
     def _toast(self, msg):
@@ -754,16 +871,17 @@ class RainbowLedgerApp(tk.Tk):
         top.geometry(f"320x40+{x}+{y}")
         lbl = tk.Label(top, text=msg, bg="#222", fg="white", font=("Segoe UI", 10))
         lbl.pack(fill="both", expand=True)
-        top.after(1700, top.destroy)
+        self.animator.later(1700, top.destroy)
 
     def _hint(self, msg):
         x = self.banner.winfo_width()//2
         tag = "hint"
         self.banner.delete(tag)
         self.banner.create_text(x, 16, text=msg, fill="white", font=("Segoe UI", 10, "italic"), tags=tag)
-        self.after(4000, lambda: self.banner.delete(tag))
+        self.animator.later(4000, lambda: self.banner.delete(tag))
 
     def _confetti(self):
+        if self.banner.low_power: return
         particles = []
         for _ in range(24):
             x = random.randint(30, self.banner.winfo_width()-30)
@@ -773,28 +891,25 @@ class RainbowLedgerApp(tk.Tk):
             p = self.banner.create_oval(x-r, y-r, x+r, y+r, fill=c, outline="")
             particles.append(p)
         def fall():
-            for p in particles:
-                self.banner.move(p, 0, 3)
-            self.after(28, cleanup)
-        def cleanup():
-            if particles and random.random() > 0.08:
-                fall()
-            else:
+            if random.random() > 0.08:
                 for p in particles:
-                    self.banner.delete(p)
-        fall()
+                    self.banner.move(p, 0, 3)
+                return True
+            for p in particles:
+                self.banner.delete(p)
+            return False
+        self.animator.subscribe(fall, 28)
 
     def _card(self, parent):
         f = ttk.Frame(parent, style="Card.TFrame"); f.configure(padding=12); f.pack_propagate(False); return f
 
     # ----- Dashboard -----
-    def _build_dashboard_tab(self):
-        tab = ttk.Frame(self.nb); self.nb.add(tab, text="Dashboard")
+    def _build_dashboard_tab(self, tab):
 
         top = ttk.Frame(tab); top.pack(fill="x", pady=(8, 10))
         refresh_btn = FancyButton(top, text="Refresh Dashboard", command=self._load_dashboard); refresh_btn.enable_pulse(True); refresh_btn.pack(side="left", padx=4)
         btn_export = ttk.Button(top, text="Export Reports (CSV)", command=self._export_reports_csv); btn_export.pack(side="left", padx=4)
-        ToolTip(btn_export, "Exports P&L by Month, YTD, and Category Totals to CSV in this month folder")
+        ToolTip(btn_export, "Exports P&L by Month, YTD, Category Totals, Trailing 12 Months, and Year over Year to CSV in this month folder")
 
         # Onboarding checklist
         ob = self._card(tab); ob.pack(fill="x", padx=6, pady=6)
@@ -809,85 +924,81 @@ class RainbowLedgerApp(tk.Tk):
         for s in steps:
             ttk.Label(ob, text=s).pack(anchor="w")
 
+        # built once; _show_dashboard() only changes text and the rows that moved
         self.stats_frame = ttk.Frame(tab); self.stats_frame.pack(fill="both", expand=True)
+        self.dash_msg = ttk.Label(self.stats_frame, text="", font=("Segoe UI", 12))
+        self.dash_body = ttk.Frame(self.stats_frame)
+        row = ttk.Frame(self.dash_body); row.pack(fill="x", pady=6)
+        self.dash_cards = {}
+        for title in ("YTD Income", "YTD Expenses", "YTD Net", "Trailing 12M Net"):
+            c = self._card(row); c.pack(side="left", expand=True, fill="x", padx=6)
+            ttk.Label(c, text=title, font=("Segoe UI", 11, "bold")).pack(anchor="w")
+            self.dash_cards[title] = ttk.Label(c, text="", font=("Segoe UI", 16))
+            self.dash_cards[title].pack(anchor="w", pady=(6,0))
+
+        frame_tbl = self._card(self.dash_body); frame_tbl.pack(fill="both", expand=True, padx=6, pady=6)
+        ttk.Label(frame_tbl, text="P&L by Month", font=("Segoe UI", 11, "bold")).pack(anchor="w")
+        self.dash_table = ttk.Treeview(frame_tbl, columns=("Period","Income","Expenses","Net","Net LY"), show="headings", height=12)
+        for col, w in [("Period",120),("Income",150),("Expenses",150),("Net",150),("Net LY",150)]:
+            self.dash_table.heading(col, text=col)
+            self.dash_table.column(col, width=w, anchor="center" if col=="Period" else "e")
+        self.dash_table.pack(fill="both", expand=True, pady=(6,0))
+        self.dash_rows = {}  # Period -> (item id, values)
         self._load_dashboard()
 
     def _export_reports_csv(self):
-        try:
-            pnl = build_reports()
-            # Rebuild tables here and export
-            tx = read_sheet("Transactions")
-            tx["Date"] = pd.to_datetime(tx["Date"])
-            tx["YearMonth"] = tx["Date"].dt.to_period("M").astype(str)
-            income = tx[tx["Type"]=="income"].groupby("YearMonth")["Amount"].sum().rename("Income")
-            exp = tx[tx["Type"]=="expense"].groupby("YearMonth")["Amount"].sum().rename("Expenses")
-            pnl = pd.concat([income, exp], axis=1).fillna(0.0)
-            pnl["NetProfit"] = pnl["Income"] - pnl["Expenses"]
-            pnl = pnl.reset_index().rename(columns={"YearMonth":"Period"})
-
-            ytd_income = tx[tx["Type"]=="income"]["Amount"].sum()
-            ytd_exp = tx[tx["Type"]=="expense"]["Amount"].sum()
-            ytd = pd.DataFrame([
-                {"Metric":"YTD Income","Amount":ytd_income},
-                {"Metric":"YTD Expenses","Amount":ytd_exp},
-                {"Metric":"YTD Net","Amount":ytd_income - ytd_exp}
-            ])
-            cat_totals = (tx.groupby(["Type","Category"])["Amount"]
-                          .sum().reset_index()
-                          .sort_values(["Type","Amount"], ascending=[True, False]))
-
-            outdir = os.path.dirname(EXCEL_PATH)
-            pnl.to_csv(os.path.join(outdir, "P&L_by_Month.csv"), index=False)
-            ytd.to_csv(os.path.join(outdir, "YTD_Summary.csv"), index=False)
-            cat_totals.to_csv(os.path.join(outdir, "Category_Totals.csv"), index=False)
+        def exported(ok):
+            if not ok:
+                messagebox.showinfo("Export", "No transactions to report yet.")
+                return
             self._toast("Reports exported as CSV")
             self._confetti()
-        except Exception as e:
-            messagebox.showerror("Error", f"Export failed:\n{e}")
+        self._io(core.export_reports_csv, done=exported, fail="Export failed")
 
     def _load_dashboard(self):
-        for w in self.stats_frame.winfo_children():
-            w.destroy()
+        if "Dashboard" not in self._built: return
+        def load():
+            with core.perf_span("refresh", "Dashboard"):
+                return core.compute_reports()
+        self.io.submit(load, key="dashboard", done=self._show_dashboard,
+                       error=lambda e: self._show_dashboard(None, e))
+
+    def _show_dashboard(self, rs, error=None):
         try:
-            tx = read_sheet("Transactions")
-            if tx.empty:
-                ttk.Label(self.stats_frame, text="No data yet. Add transactions or invoices to get started.",
-                          font=("Segoe UI", 12)).pack(pady=20)
+            if error is not None:
+                raise error
+            if rs.pnl is None:
+                self._dash_message("No data yet. Add transactions or invoices to get started.")
                 return
-            tx["Date"] = pd.to_datetime(tx["Date"])
-            income = tx[tx["Type"]=="income"]["Amount"].sum()
-            exp = tx[tx["Type"]=="expense"]["Amount"].sum()
-            net = income - exp
-
-            row = ttk.Frame(self.stats_frame); row.pack(fill="x", pady=6)
-            for title, val in [("YTD Income", income), ("YTD Expenses", exp), ("YTD Net", net)]:
-                c = self._card(row); c.pack(side="left", expand=True, fill="x", padx=6)
-                ttk.Label(c, text=title, font=("Segoe UI", 11, "bold")).pack(anchor="w")
-                ttk.Label(c, text=f"${val:,.2f}", font=("Segoe UI", 16)).pack(anchor="w", pady=(6,0))
-
-            tx["YearMonth"] = tx["Date"].dt.to_period("M").astype(str)
-            income_m = tx[tx["Type"]=="income"].groupby("YearMonth")["Amount"].sum()
-            exp_m = tx[tx["Type"]=="expense"].groupby("YearMonth")["Amount"].sum()
-            pnl = pd.concat([income_m, exp_m], axis=1).fillna(0.0)
-            pnl["Net"] = pnl.iloc[:,0] - pnl.iloc[:,1]
-            pnl = pnl.reset_index().rename(columns={"YearMonth":"Period", pnl.columns[1]:"Income", pnl.columns[2]:"Expenses"})
-
-            frame_tbl = self._card(self.stats_frame); frame_tbl.pack(fill="both", expand=True, padx=6, pady=6)
-            ttk.Label(frame_tbl, text="P&L by Month", font=("Segoe UI", 11, "bold")).pack(anchor="w")
-            tv = ttk.Treeview(frame_tbl, columns=("Period","Income","Expenses","Net"), show="headings", height=12)
-            for col, w in [("Period",120),("Income",160),("Expenses",160),("Net",160)]:
-                tv.heading(col, text=col)
-                tv.column(col, width=w, anchor="center" if col=="Period" else "e")
-            tv.pack(fill="both", expand=True, pady=(6,0))
-            show = pnl.tail(12)
-            for _, r in show.iterrows():
-                tv.insert("", "end", values=(r["Period"], f"${r['Income']:,.2f}", f"${r['Expenses']:,.2f}", f"${r['Net']:,.2f}"))
+            income, exp, net = rs.ytd["Amount"].tolist()
+            t12_net = rs.trailing12["Amount"].iloc[2]
+            for title, val in [("YTD Income", income), ("YTD Expenses", exp), ("YTD Net", net), ("Trailing 12M Net", t12_net)]:
+                self.dash_cards[title].config(text=f"${val:,.2f}")
+
+            show = rs.yoy.tail(12)
+            rows = list(zip(show["Period"].astype(str), *(core.fmt_money(show[c]) for c in ("Income","Expenses","NetProfit","PriorYearNet"))))
+            keep = {r[0] for r in rows}
+            for period in [p for p in self.dash_rows if p not in keep]:
+                self.dash_table.delete(self.dash_rows.pop(period)[0])
+            for i, r in enumerate(rows):
+                iid, old = self.dash_rows.get(r[0], (None, None))
+                if iid is None:
+                    iid = self.dash_table.insert("", i, values=r)
+                elif old != r:
+                    self.dash_table.item(iid, values=r)
+                self.dash_rows[r[0]] = (iid, r)
+            self.dash_msg.pack_forget()
+            self.dash_body.pack(fill="both", expand=True)
         except Exception as e:
-            ttk.Label(self.stats_frame, text=f"Error loading dashboard: {e}").pack(pady=20)
+            self._dash_message(f"Error loading dashboard: {e}")
+
+    def _dash_message(self, text):
+        self.dash_body.pack_forget()
+        self.dash_msg.config(text=text)
+        self.dash_msg.pack(pady=20)
 
     # ----- Transactions -----
-    def _build_transactions_tab(self):
-        tab = ttk.Frame(self.nb); self.nb.add(tab, text="Transactions")
+    def _build_transactions_tab(self, tab):
 
         form = self._card(tab); form.pack(fill="x", padx=6, pady=6)
 
@@ -902,7 +1013,8 @@ class RainbowLedgerApp(tk.Tk):
         self.tx_type.current(1); self.tx_type.pack(side="left", padx=6)
 
         ttk.Label(row1, text="Category").pack(side="left", padx=(18,6))
-        self.tx_cat = ttk.Combobox(row1, values=get_categories(), state="readonly", width=28); self.tx_cat.pack(side="left", padx=6)
+        self.tx_cat = ttk.Combobox(row1, values=[], state="readonly", width=28); self.tx_cat.pack(side="left", padx=6)
+        self._fill_choices(self.tx_cat, core.get_categories)
 
         row2 = ttk.Frame(form); row2.pack(fill="x", pady=4)
         ttk.Label(row2, text="Amount").pack(side="left", padx=(0,6))
@@ -926,14 +1038,9 @@ class RainbowLedgerApp(tk.Tk):
         ToolTip(btn_import, "Map your CSV columns to Date/Amount/Description/Type/Category/Party/Method")
         btn_export_tx = ttk.Button(row4, text="Export Transactions CSV", command=self._export_transactions_csv); btn_export_tx.pack(side="left", padx=4)
         
-        self.tx_table = ttk.Treeview(tab, columns=("Date","Type","Category","Description","Party","Amount","Method","Reference","Linked"), show="headings", height=18)
-        for col, w in [
-            ("Date",100),("Type",80),("Category",160),("Description",240),
-            ("Party",160),("Amount",110),("Method",120),("Reference",120),("Linked",120)
-        ]:
-            self.tx_table.heading(col, text=col)
-            self.tx_table.column(col, width=w, anchor="w" if col in ("Description","Category","Party","Method") else ("e" if col=="Amount" else "center"))
+        self.tx_table = VirtualTable(tab, core.TX_TABLE_COLUMNS, height=18)
         self.tx_table.pack(fill="both", expand=True, padx=6, pady=(0,6))
+        self._tables["Transactions"] = self.tx_table
 
         self._refresh_tx_table()
 
@@ -950,41 +1057,45 @@ class RainbowLedgerApp(tk.Tk):
                 messagebox.showwarning("Missing data", "Date, Type, Category, and Amount are required.")
                 return
             amt = float(amt_text)
-            # If user chose transfer, still record it (neutral category)
-            add_transaction(date, ttype, cat, amt, desc, party, method)
-            self._toast("Transaction added")
-            self._refresh_tx_table()
-            self._load_dashboard()
         except Exception as e:
             messagebox.showerror("Error", f"Could not add transaction:\n{e}")
+            return
+        # If user chose transfer, still record it (neutral category)
+        self._io(core.add_transaction, date, ttype, cat, amt, desc, party, method,
+                 done=lambda _: self._saved("Transaction added"), fail="Could not add transaction")
+
+    def _saved(self, msg):
+        # the tables already have the change (see _on_commit)
+        self._toast(msg)
+        self._load_dashboard()
 
     def _refresh_tx_table(self):
-        for i in self.tx_table.get_children():
-            self.tx_table.delete(i)
-        try:
-            df = read_sheet("Transactions")
-            if df.empty:
-                return
-            df = df.copy()
-            df["Date"] = pd.to_datetime(df["Date"]).dt.strftime("%Y-%m-%d")
-            for _, r in df.iterrows():
-                self.tx_table.insert("", "end", values=(
-                    r.get("Date",""), r.get("Type",""), r.get("Category",""),
-                    r.get("Description",""), r.get("CustomerOrVendor",""),
-                    f"${float(r.get('Amount',0.0)):,.2f}",
-                    r.get("PaymentMethod",""), r.get("Reference",""), r.get("LinkedDoc","")
-                ))
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load transactions:\n{e}")
+        self._load_table(self.tx_table, "Transactions", "Failed to load transactions")
+
+    def _load_table(self, table, sheet, fail):
+        # read and format on the I/O thread; Tk only swaps the rows in
+        def load():
+            with core.perf_span("refresh", sheet) as span:
+                values = table.format(core.read_sheet(sheet))
+                span["rows"] = len(values)
+            return values
+        self._io(load, key=("table", sheet), done=table.set_rows, fail=fail)
+
+    def _on_commit(self, changes):
+        # I/O thread: format only the rows a commit touched, then hand them to
+        # Tk in order with everything else the I/O thread sends back
+        for op, sheet, rows, first in changes:
+            table = self._tables.get(sheet)
+            if table is not None:
+                self.io.post(self._apply_change, (sheet, op, table.format(rows), first))
+
+    def _apply_change(self, change):
+        sheet, op, values, first = change
+        if not self._tables[sheet].apply(op, values, first):
+            self._load_table(self._tables[sheet], sheet, f"Failed to load {sheet.lower()}")
 
     def _export_transactions_csv(self):
-        try:
-            df = read_sheet("Transactions")
-            out = os.path.join(os.path.dirname(EXCEL_PATH), "Transactions.csv")
-            df.to_csv(out, index=False)
-            self._toast("Transactions exported")
-        except Exception as e:
-            messagebox.showerror("Error", f"Export failed:\n{e}")
+        self._io(core.export_transactions_csv, done=lambda _: self._toast("Transactions exported"), fail="Export failed")
 
     # --- CSV Import Wizard (simple mapper) ---
     def _import_csv_wizard(self):
@@ -1018,34 +1129,12 @@ class RainbowLedgerApp(tk.Tk):
         frm = ttk.Frame(win); frm.pack(fill="both", expand=True, padx=10, pady=10)
 
         mappings = {}
+        guesses = core.guess_bank_mapping(cols)
         for i,(key,label) in enumerate(fields):
             row = ttk.Frame(frm); row.pack(fill="x", pady=4)
             ttk.Label(row, text=label, width=34).pack(side="left")
             cb = ttk.Combobox(row, values=cols, state="readonly")
-            # preselect guesses
-            guess = None
-            low = [c.lower() for c in cols]
-            if key=="Date":
-                for cand in ("date","posted","post date","transaction date"):
-                    if cand in low: guess = cols[low.index(cand)]; break
-            elif key=="Amount":
-                for cand in ("amount","amt","debit/credit","value"):
-                    if cand in low: guess = cols[low.index(cand)]; break
-            elif key=="Description":
-                for cand in ("description","memo","details","narrative"):
-                    if cand in low: guess = cols[low.index(cand)]; break
-            elif key=="Type":
-                for cand in ("type","dr/cr","credit/debit","direction"):
-                    if cand in low: guess = cols[low.index(cand)]; break
-            elif key=="Category":
-                if "category" in low: guess = cols[low.index("category")]
-            elif key=="Party":
-                for cand in ("name","payee","party","merchant","customer"):
-                    if cand in low: guess = cols[low.index(cand)]; break
-            elif key=="Method":
-                for cand in ("method","payment method","channel","card"):
-                    if cand in low: guess = cols[low.index(cand)]; break
-            if guess: cb.set(guess)
+            if guesses[key]: cb.set(guesses[key])
             cb.pack(side="left", padx=6, fill="x", expand=True)
             mappings[key] = cb
 
@@ -1055,66 +1144,146 @@ class RainbowLedgerApp(tk.Tk):
         def_type = ttk.Combobox(rowd, values=["income","expense"], state="readonly", width=12); def_type.current(1); def_type.pack(side="left", padx=6)
         rowc = ttk.Frame(frm); rowc.pack(fill="x", pady=(4,6))
         ttk.Label(rowc, text="Default Category when missing:", width=34).pack(side="left")
-        def_cat = ttk.Combobox(rowc, values=get_categories(), state="readonly", width=28); 
-        # pick a common expense default
-        if "Other Expenses" in get_categories():
-            def_cat.set("Other Expenses")
+        def_cat = ttk.Combobox(rowc, values=[], state="readonly", width=28)
+
+        def set_categories(cats):
+            if not win.winfo_exists(): return
+            def_cat.configure(values=cats)
+            # pick a common expense default
+            if "Other Expenses" in cats and not def_cat.get():
+                def_cat.set("Other Expenses")
+        self._io(core.get_categories, done=set_categories)
         def_cat.pack(side="left", padx=6)
+        skip_dups = tk.BooleanVar(value=True)
+        ttk.Checkbutton(frm, text="Skip rows already in the ledger (same date, amount, description, party)",
+                        variable=skip_dups).pack(anchor="w", pady=(8,0))
+
+        prog = ttk.Frame(win)
+        prog_lbl = ttk.Label(prog, text="Reading…"); prog_lbl.pack(anchor="w")
+        prog_bar = ttk.Progressbar(prog, maximum=1.0, length=520); prog_bar.pack(fill="x", pady=(4,0))
+        cancel = threading.Event()
+        job = {"running": False, "rows": 0, "skipped": []}
+
+        def on_cancel():
+            if job["running"]:
+                cancel.set(); prog_lbl.config(text="Cancelling…")
+            else:
+                win.destroy()
 
         btns = ttk.Frame(win); btns.pack(pady=10)
-        ttk.Button(btns, text="Cancel", command=win.destroy).pack(side="right", padx=6)
+        ttk.Button(btns, text="Cancel", command=on_cancel).pack(side="right", padx=6)
+        win.protocol("WM_DELETE_WINDOW", on_cancel)
+
+        def finish(error=None):
+            job["running"] = False
+            win.destroy()
+            self._load_dashboard()
+            if error is not None:
+                messagebox.showerror("Import failed", f"{error}\n\n{job['rows']} rows were imported before the error.")
+            elif cancel.is_set():
+                self._toast(f"Import cancelled — {job['rows']} rows kept")
+            else:
+                self._toast(f"Imported {job['rows']} rows")
+            if job["skipped"] and error is None:
+                self._show_skipped_duplicates(pd.concat(job["skipped"], ignore_index=True))
+
         def do_import():
             req = ("Date","Amount","Description")
             for r in req:
                 if not mappings[r].get():
                     messagebox.showwarning("Map required", f"Please map {r}.")
                     return
-            try:
-                df = read_sheet("Transactions")
-                incoming = pd.read_csv(path)
-                # Build normalized frame
-                def getcol(k):
-                    sel = mappings[k].get()
-                    return incoming[sel] if sel in incoming.columns else pd.Series([None]*len(incoming))
-                nd = pd.DataFrame({
-                    "Date": pd.to_datetime(getcol("Date"), errors="coerce"),
-                    "Amount": pd.to_numeric(getcol("Amount"), errors="coerce"),
-                    "Description": getcol("Description").astype(str),
-                    "Type": (getcol("Type").astype(str).str.lower().str.strip()
-                             if mappings["Type"].get() else pd.Series([None]*len(incoming))),
-                    "Category": getcol("Category").astype(str) if mappings["Category"].get() else None,
-                    "CustomerOrVendor": getcol("Party").astype(str) if mappings["Party"].get() else None,
-                    "PaymentMethod": getcol("Method").astype(str) if mappings["Method"].get() else None,
-                })
-                # Fill Type if missing: sign-based heuristic
-                nd["Type"] = nd["Type"].where(nd["Type"].isin(["income","expense"]))
-                nd.loc[nd["Type"].isna() & (nd["Amount"] < 0), "Type"] = "expense"
-                nd.loc[nd["Type"].isna() & (nd["Amount"] > 0), "Type"] = "income"
-                nd["Type"] = nd["Type"].fillna(def_type.get())
-                # Normalize Amount to positive numbers
-                nd.loc[nd["Type"]=="expense","Amount"] = nd.loc[nd["Type"]=="expense","Amount"].abs()
-                nd.loc[nd["Type"]=="income","Amount"] = nd.loc[nd["Type"]=="income","Amount"].abs()
-                # Category default
-                nd["Category"] = nd["Category"].where(nd["Category"].notna() & (nd["Category"].astype(str)!="nan"), def_cat.get())
-                # Required columns for sheet
-                nd["Reference"] = ""
-                nd["LinkedDoc"] = ""
-                # Drop unusable rows
-                nd = nd.dropna(subset=["Date","Amount"])
-                # Append and write
-                df = pd.concat([df, nd], ignore_index=True)
-                write_sheet(df, "Transactions")
-                self._toast(f"Imported {len(nd)} rows")
-                win.destroy()
-                self._refresh_tx_table()
-                self._load_dashboard()
-            except Exception as e:
-                messagebox.showerror("Import failed", str(e))
-        ttk.Button(btns, text="Import", command=do_import).pack(side="right", padx=6)
+            mapping = {k: cb.get() for k, cb in mappings.items()}
+            # parsing runs on its own thread; chunks are appended through the
+            # I/O thread one at a time, so the window keeps painting
+            q = queue.Queue(maxsize=2)
+
+            def put(item):
+                # give up once the dialog has finished so the thread never hangs
+                while job["running"]:
+                    try:
+                        q.put(item, timeout=0.2); return
+                    except queue.Full:
+                        pass
+
+            def work(seen):
+                try:
+                    for nd, frac in core.iter_bank_csv(path, mapping, dtype, dcat):
+                        if cancel.is_set():
+                            break
+                        dup = None
+                        if seen is not None:
+                            nd, dup = core.split_duplicates(nd, seen)
+                        put(("chunk", (nd, dup), frac))
+                    put(("end", None, None))
+                except Exception as e:
+                    put(("end", e, None))
+
+            def poll():
+                try:
+                    kind, val, frac = q.get_nowait()
+                except queue.Empty:
+                    self.animator.later(30, poll); return
+                if kind == "end":
+                    finish(val); return
+                nd, dup = val
+                if cancel.is_set() or nd.empty:
+                    appended(0, dup, frac); return
+                self.io.submit(core.append_rows, nd, "Transactions", done=lambda _: appended(len(nd), dup, frac),
+                               error=lambda e: (cancel.set(), finish(e)))
+
+            def appended(n, dup, frac):
+                job["rows"] += n
+                if not cancel.is_set() and dup is not None and not dup.empty:
+                    job["skipped"].append(dup)
+                prog_bar["value"] = frac
+                if not cancel.is_set():
+                    skipped = sum(len(d) for d in job["skipped"])
+                    prog_lbl.config(text=f"Imported {job['rows']:,} rows, skipped {skipped:,} duplicates ({frac:.0%})")
+                self.animator.later(1, poll)
+
+            def start(seen):
+                if not win.winfo_exists():
+                    return  # closed while the ledger was being read
+                job["running"] = True
+                threading.Thread(target=work, args=(seen,), daemon=True).start()
+                self.animator.later(30, poll)
+
+            dtype, dcat = def_type.get(), def_cat.get()
+            for w in frm.winfo_children():
+                for c in w.winfo_children():
+                    if isinstance(c, ttk.Combobox): c.config(state="disabled")
+            import_btn.config(state="disabled")
+            prog.pack(fill="x", padx=10, before=btns)
+            self._io(core.known_fingerprints if skip_dups.get() else (lambda: None), done=start,
+                     fail="Could not read the ledger for duplicates")
+        import_btn = ttk.Button(btns, text="Import", command=do_import); import_btn.pack(side="right", padx=6)
+
+    def _show_skipped_duplicates(self, dups):
+        win = tk.Toplevel(self)
+        win.title(f"Skipped {len(dups)} duplicate rows")
+        win.geometry("820x420+%d+%d" % (self.winfo_rootx()+100, self.winfo_rooty()+100))
+        ttk.Label(win, text=f"{len(dups):,} rows matched transactions already in the ledger and were not imported"
+                  + (" (first 500 shown)." if len(dups) > 500 else "."), wraplength=780).pack(anchor="w", padx=10, pady=(10,4))
+        cols = ("Date","Type","Category","Description","Party","Amount")
+        tv = ttk.Treeview(win, columns=cols, show="headings", height=14)
+        for c in cols:
+            tv.heading(c, text=c); tv.column(c, width=110 if c != "Description" else 260, anchor="w")
+        tv.pack(fill="both", expand=True, padx=10)
+        for r in dups.head(500).itertuples(index=False):
+            d = r.Date.strftime("%Y-%m-%d") if pd.notna(r.Date) else ""
+            tv.insert("", "end", values=(d, r.Type, r.Category, r.Description, "" if pd.isna(r.CustomerOrVendor) else r.CustomerOrVendor, f"{r.Amount:,.2f}"))
+
+        def import_anyway():
+            win.destroy()
+            self._io(core.append_rows, dups, "Transactions", fail="Import failed",
+                     done=lambda _: self._saved(f"Imported {len(dups)} more rows"))
+        btns = ttk.Frame(win); btns.pack(pady=8)
+        ttk.Button(btns, text="Close", command=win.destroy).pack(side="right", padx=6)
+        ttk.Button(btns, text="Import These Anyway", command=import_anyway).pack(side="right", padx=6)
 
     # ----- Invoices -----
-    def _build_invoices_tab(self):
-        tab = ttk.Frame(self.nb); self.nb.add(tab, text="Invoices")
+    def _build_invoices_tab(self, tab):
         form = self._card(tab); form.pack(fill="x", padx=6, pady=6)
         r1 = ttk.Frame(form); r1.pack(fill="x", pady=4)
         ttk.Label(r1, text="Date").pack(side="left"); 
@@ -1122,7 +1291,8 @@ class RainbowLedgerApp(tk.Tk):
         ttk.Label(r1, text="Due Date").pack(side="left", padx=(12,6))
         self.inv_due = ttk.Entry(r1, width=12); self.inv_due.insert(0, (datetime.today()+timedelta(days=14)).strftime("%Y-%m-%d")); self.inv_due.pack(side="left")
         ttk.Label(r1, text="Customer").pack(side="left", padx=(12,6))
-        self.inv_cust = ttk.Combobox(r1, values=get_customers(), width=28); self.inv_cust.pack(side="left", padx=6)
+        self.inv_cust = ttk.Combobox(r1, values=[], width=28); self.inv_cust.pack(side="left", padx=6)
+        self._fill_choices(self.inv_cust, core.get_customers)
 
         r2 = ttk.Frame(form); r2.pack(fill="x", pady=4)
         ttk.Label(r2, text="Item").pack(side="left"); self.inv_item = ttk.Entry(r2, width=28); self.inv_item.pack(side="left", padx=6)
@@ -1135,65 +1305,54 @@ class RainbowLedgerApp(tk.Tk):
         ttk.Label(r3, text="Mark Paid Invoice ID").pack(side="left", padx=(18,6))
         self.inv_mark_id = ttk.Entry(r3, width=12); self.inv_mark_id.pack(side="left", padx=4)
         ttk.Button(r3, text="Mark Paid", command=self._mark_invoice_paid).pack(side="left", padx=4)
+        btn_inv_import = ttk.Button(r3, text="Import Invoices CSV…", command=self._import_invoices_csv); btn_inv_import.pack(side="left", padx=(18,4))
+        ToolTip(btn_inv_import, "Create many invoices at once from a CSV (Customer, Item, Qty, Rate, Date, Due Date)")
 
-        self.inv_table = ttk.Treeview(tab, columns=("InvoiceID","Date","DueDate","Customer","Item","Qty","Rate","Amount","Status","Notes"), show="headings", height=16)
-        for c,w in [("InvoiceID",100),("Date",100),("DueDate",100),("Customer",180),("Item",220),("Qty",60),("Rate",90),("Amount",110),("Status",90),("Notes",220)]:
-            self.inv_table.heading(c, text=c); self.inv_table.column(c, width=w, anchor="center" if c in ("Qty","Rate","Amount","Status") else "w")
+        self.inv_table = VirtualTable(tab, core.INVOICE_TABLE_COLUMNS, height=16)
         self.inv_table.pack(fill="both", expand=True, padx=6, pady=(0,6))
+        self._tables["Invoices"] = self.inv_table
         self._refresh_inv_table()
 
     def _add_invoice(self):
         try:
-            inv_id, amt = create_invoice(
-                self.inv_date.get(), self.inv_due.get(), self.inv_cust.get(),
-                self.inv_item.get(), float(self.inv_qty.get()), float(self.inv_rate.get()),
-                self.inv_notes.get()
-            )
-            self._toast(f"Invoice {inv_id} created for ${amt:,.2f}")
-            self._refresh_inv_table()
-            self._refresh_tx_table()
-            self._load_dashboard()
-            self._confetti()
+            args = (self.inv_date.get(), self.inv_due.get(), self.inv_cust.get(),
+                    self.inv_item.get(), float(self.inv_qty.get()), float(self.inv_rate.get()),
+                    self.inv_notes.get())
         except Exception as e:
             messagebox.showerror("Error", f"Create invoice failed:\n{e}")
+            return
+
+        def created(res):
+            inv_id, amt = res
+            self._saved(f"Invoice {inv_id} created for ${amt:,.2f}")
+            self._confetti()
+        self._io(core.create_invoice, *args, done=created, fail="Create invoice failed")
+
+    def _import_invoices_csv(self):
+        path = filedialog.askopenfilename(
+            title="Select Invoices CSV",
+            filetypes=[("CSV files","*.csv"),("All files","*.*")]
+        )
+        if not path:
+            return
+        def created(inv):
+            self._saved(f"Created {len(inv)} invoices for ${inv['Amount'].sum():,.2f}")
+            self._confetti()
+        self._io(lambda: core.create_invoices_batch(core.read_invoices_csv(path)), done=created, fail="Import invoices failed")
 
     def _mark_invoice_paid(self):
-        try:
-            iid = self.inv_mark_id.get().strip()
-            if not iid:
-                messagebox.showwarning("Missing", "Enter an Invoice ID")
-                return
-            mark_invoice_paid(iid, datetime.today().strftime("%Y-%m-%d"))
-            self._toast(f"{iid} marked paid")
-            self._refresh_inv_table()
-            self._refresh_tx_table()
-            self._load_dashboard()
-        except Exception as e:
-            messagebox.showerror("Error", f"Mark paid failed:\n{e}")
+        iid = self.inv_mark_id.get().strip()
+        if not iid:
+            messagebox.showwarning("Missing", "Enter an Invoice ID")
+            return
+        self._io(core.mark_invoice_paid, iid, datetime.today().strftime("%Y-%m-%d"), fail="Mark paid failed",
+                 done=lambda _: self._saved(f"{iid} marked paid"))
 
     def _refresh_inv_table(self):
-        for i in self.inv_table.get_children():
-            self.inv_table.delete(i)
-        try:
-            df = read_sheet("Invoices")
-            if df.empty: return
-            df = df.copy()
-            for col in ("Date","DueDate"):
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col]).dt.strftime("%Y-%m-%d")
-            for _, r in df.iterrows():
-                self.inv_table.insert("", "end", values=(
-                    r.get("InvoiceID",""), r.get("Date",""), r.get("DueDate",""),
-                    r.get("CustomerName",""), r.get("Item",""), r.get("Qty",""),
-                    f"{float(r.get('Rate',0.0)):.2f}", f"${float(r.get('Amount',0.0)):,.2f}",
-                    r.get("Status",""), r.get("Notes","")
-                ))
-        except Exception as e:
-            messagebox.showerror("Error", f"Load invoices failed:\n{e}")
+        self._load_table(self.inv_table, "Invoices", "Load invoices failed")
 
     # ----- Customers -----
-    def _build_customers_tab(self):
-        tab = ttk.Frame(self.nb); self.nb.add(tab, text="Customers")
+    def _build_customers_tab(self, tab):
         form = self._card(tab); form.pack(fill="x", padx=6, pady=6)
         r1 = ttk.Frame(form); r1.pack(fill="x", pady=4)
         ttk.Label(r1, text="Name").pack(side="left"); self.cu_name = ttk.Entry(r1, width=28); self.cu_name.pack(side="left", padx=6)
@@ -1212,19 +1371,20 @@ class RainbowLedgerApp(tk.Tk):
         self._refresh_customers_table()
 
     def _add_customer(self):
-        try:
-            add_customer(self.cu_name.get(), self.cu_email.get(), self.cu_phone.get(), self.cu_addr.get(), self.cu_notes.get())
+        def added(_):
             self._toast("Customer added")
-            self.inv_cust.configure(values=get_customers())
+            if "Invoices" in self._built: self._fill_choices(self.inv_cust, core.get_customers)
             self._refresh_customers_table()
-        except Exception as e:
-            messagebox.showerror("Error", f"Add customer failed:\n{e}")
+        self._io(core.add_customer, self.cu_name.get(), self.cu_email.get(), self.cu_phone.get(), self.cu_addr.get(), self.cu_notes.get(),
+                 done=added, fail="Add customer failed")
 
     def _refresh_customers_table(self):
+        self._io(core.read_sheet, "Customers", key="cust_table", done=self._show_customers_table, fail="Load customers failed")
+
+    def _show_customers_table(self, df):
         for i in self.cu_table.get_children():
             self.cu_table.delete(i)
         try:
-            df = read_sheet("Customers")
             if df.empty: return
             for _, r in df.iterrows():
                 self.cu_table.insert("", "end", values=(r.get("CustomerName",""), r.get("Email",""), r.get("Phone",""), r.get("BillingAddress",""), r.get("Notes","")))
@@ -1232,8 +1392,7 @@ class RainbowLedgerApp(tk.Tk):
             messagebox.showerror("Error", f"Load customers failed:\n{e}")
 
     # ----- Payroll -----
-    def _build_payroll_tab(self):
-        tab = ttk.Frame(self.nb); self.nb.add(tab, text="Payroll")
+    def _build_payroll_tab(self, tab):
         form = self._card(tab); form.pack(fill="x", padx=6, pady=6)
         r1 = ttk.Frame(form); r1.pack(fill="x", pady=4)
         ttk.Label(r1, text="Employee Name").pack(side="left"); self.pay_empname = ttk.Entry(r1, width=24); self.pay_empname.pack(side="left", padx=6)
@@ -1247,59 +1406,70 @@ class RainbowLedgerApp(tk.Tk):
         run = self._card(tab); run.pack(fill="x", padx=6, pady=6)
         r2 = ttk.Frame(run); r2.pack(fill="x", pady=4)
         ttk.Label(r2, text="Date").pack(side="left"); self.run_date = ttk.Entry(r2, width=12); self.run_date.insert(0, datetime.today().strftime("%Y-%m-%d")); self.run_date.pack(side="left", padx=6)
-        ttk.Label(r2, text="Employee").pack(side="left", padx=(12,6)); self.run_emp = ttk.Combobox(r2, values=get_employees(), width=28); self.run_emp.pack(side="left")
+        ttk.Label(r2, text="Employee").pack(side="left", padx=(12,6)); self.run_emp = ttk.Combobox(r2, values=[], width=28); self.run_emp.pack(side="left")
+        self._fill_choices(self.run_emp, core.get_employees)
         ttk.Label(r2, text="Hours (hourly)").pack(side="left", padx=(12,6)); self.run_hours = ttk.Entry(r2, width=8); self.run_hours.insert(0,"0"); self.run_hours.pack(side="left")
-        FancyButton(run, text="Run Payroll", command=self._run_payroll).pack(pady=6)
+        r3 = ttk.Frame(run); r3.pack(pady=6)
+        FancyButton(r3, text="Run Payroll", command=self._run_payroll).pack(side="left", padx=4)
+        btn_run_all = ttk.Button(r3, text="Run All Employees…", command=self._run_payroll_all); btn_run_all.pack(side="left", padx=4)
+        ToolTip(btn_run_all, "Pay every employee for Date in one pass (hours from a CSV with EmployeeName, Hours)")
 
-        self.pay_table = ttk.Treeview(tab, columns=("PayslipID","Date","Employee","Hours","Gross","Tax","Net","Notes"), show="headings", height=14)
-        for c,w in [("PayslipID",100),("Date",100),("Employee",180),("Hours",80),("Gross",110),("Tax",110),("Net",110),("Notes",220)]:
-            self.pay_table.heading(c, text=c); self.pay_table.column(c, width=w, anchor="center" if c in ("Hours","Date") else "w")
+        self.pay_table = VirtualTable(tab, core.PAYSLIP_TABLE_COLUMNS, height=14)
         self.pay_table.pack(fill="both", expand=True, padx=6, pady=(0,6))
+        self._tables["Payslips"] = self.pay_table
         self._refresh_pay_table()
 
     def _add_employee(self):
         try:
-            add_employee(
-                self.pay_empname.get(), self.pay_type.get(),
-                float(self.pay_hrate.get() or 0.0), float(self.pay_salary.get() or 0.0),
-                float(self.pay_tax.get() or 0.1), ""
-            )
-            self._toast("Employee added")
-            self.run_emp.configure(values=get_employees())
+            args = (self.pay_empname.get(), self.pay_type.get(),
+                    float(self.pay_hrate.get() or 0.0), float(self.pay_salary.get() or 0.0),
+                    float(self.pay_tax.get() or 0.1), "")
         except Exception as e:
             messagebox.showerror("Error", f"Add employee failed:\n{e}")
+            return
+
+        def added(_):
+            self._toast("Employee added")
+            self._fill_choices(self.run_emp, core.get_employees)
+        self._io(core.add_employee, *args, done=added, fail="Add employee failed")
 
     def _run_payroll(self):
         try:
-            ps_id, gross, tax, net = run_payroll(self.run_date.get(), self.run_emp.get(), float(self.run_hours.get() or 0.0))
-            self._toast(f"Payroll {ps_id}: Net ${net:,.2f}")
-            self._refresh_pay_table()
-            self._refresh_tx_table()
-            self._load_dashboard()
+            hours = float(self.run_hours.get() or 0.0)
         except Exception as e:
             messagebox.showerror("Error", f"Run payroll failed:\n{e}")
+            return
+
+        def paid(res):
+            ps_id, gross, tax, net = res
+            self._saved(f"Payroll {ps_id}: Net ${net:,.2f}")
+        self._io(core.run_payroll, self.run_date.get(), self.run_emp.get(), hours, done=paid, fail="Run payroll failed")
+
+    def _run_payroll_all(self):
+        ans = messagebox.askyesnocancel(
+            "Run Payroll for All",
+            "Load hourly employees' hours from a CSV (EmployeeName, Hours)?\n\n"
+            "Yes: pick a CSV\nNo: pay salaried employees only")
+        if ans is None: return
+        path = None
+        if ans:
+            path = filedialog.askopenfilename(title="Select Hours CSV",
+                                              filetypes=[("CSV files","*.csv"),("All files","*.*")])
+            if not path: return
+        date = self.run_date.get()
+
+        def paid(ps):
+            if ps.empty:
+                self._toast("No employees to pay")
+                return
+            self._saved(f"Payroll: {len(ps)} payslips, Net ${ps['Net'].sum():,.2f}")
+        self._io(lambda: core.run_payroll_batch(date, core.read_hours_csv(path) if path else None), done=paid, fail="Run payroll failed")
 
     def _refresh_pay_table(self):
-        for i in self.pay_table.get_children():
-            self.pay_table.delete(i)
-        try:
-            df = read_sheet("Payslips")
-            if df.empty: return
-            df = df.copy()
-            df["Date"] = pd.to_datetime(df["Date"]).dt.strftime("%Y-%m-%d")
-            for _, r in df.iterrows():
-                self.pay_table.insert("", "end", values=(
-                    r.get("PayslipID",""), r.get("Date",""), r.get("EmployeeName",""),
-                    r.get("Hours",""), f"${float(r.get('Gross',0.0)):,.2f}",
-                    f"${float(r.get('Tax',0.0)):,.2f}", f"${float(r.get('Net',0.0)):,.2f}",
-                    r.get("Notes","")
-                ))
-        except Exception as e:
-            messagebox.showerror("Error", f"Load payslips failed:\n{e}")
+        self._load_table(self.pay_table, "Payslips", "Load payslips failed")
 
     # ----- Reports -----
-    def _build_reports_tab(self):
-        tab = ttk.Frame(self.nb); self.nb.add(tab, text="Reports")
+    def _build_reports_tab(self, tab):
         top = ttk.Frame(tab); top.pack(fill="x", pady=6)
         FancyButton(top, text="Build / Refresh Reports", command=self._load_report_preview).pack(side="left", padx=6)
         self.rep_table = ttk.Treeview(tab, columns=("Col1","Col2","Col3","Col4","Col5"), show="headings", height=20)
@@ -1310,30 +1480,49 @@ class RainbowLedgerApp(tk.Tk):
         self._load_report_preview()
 
     def _load_report_preview(self):
+        def build():
+            core.build_reports()  # writes to sheet
+            # render the same blocks that were just written – keep it simple
+            return core.report_grid(core.report_layout(core.compute_reports()))
+        self._io(build, key="reports", done=self._show_report_preview, fail="Build/preview failed")
+
+    def _show_report_preview(self, grid):
         try:
-            build_reports()  # writes to sheet
-            df = pd.read_excel(EXCEL_PATH, sheet_name="Reports", header=0)
-            # render any table-ish content – keep it simple
             for i in self.rep_table.get_children():
                 self.rep_table.delete(i)
             # craft display: take up to 5 columns
-            df = df.fillna("")
-            max_cols = min(5, df.shape[1])
+            head = grid[0]
+            max_cols = min(5, len(head))
             self.rep_table["columns"] = [f"Col{i}" for i in range(1,max_cols+1)]
-            for i,c in enumerate(df.columns[:max_cols], 1):
+            for i,c in enumerate(head[:max_cols], 1):
                 self.rep_table.heading(f"Col{i}", text=c)
-            for _, r in df.iloc[:500].iterrows():
-                vals = [str(r[c]) for c in df.columns[:max_cols]]
+            for r in grid[1:501]:
+                vals = (r + [""] * max_cols)[:max_cols]
                 self.rep_table.insert("", "end", values=vals)
         except Exception as e:
             messagebox.showerror("Error", f"Build/preview failed:\n{e}")
 
+    def _verify_aggregates(self):
+        self._io(core.verify_aggregates, True, done=self._show_aggregate_diff, fail="Verify failed")
+
+    def _show_aggregate_diff(self, diff):
+        try:
+            if diff.empty:
+                self._toast("Aggregates match the ledger")
+            else:
+                rows = "\n".join(f"{ym} {t} {c}: {r.AmountStored:,.2f} -> {r.AmountActual:,.2f}"
+                                 for (ym, t, c), r in diff.head(15).iterrows())
+                messagebox.showwarning("Aggregates rebuilt", f"{len(diff)} totals were out of sync and have been rebuilt:\n\n{rows}")
+                self._load_dashboard()
+        except Exception as e:
+            messagebox.showerror("Error", f"Verify failed:\n{e}")
+
     # ----- Settings -----
-    def _build_settings_tab(self):
-        tab = ttk.Frame(self.nb); self.nb.add(tab, text="Settings")
+    def _build_settings_tab(self, tab):
         card = self._card(tab); card.pack(fill="x", padx=6, pady=6)
         ttk.Label(card, text="Company Name").pack(side="left"); 
-        self.set_company = ttk.Entry(card, width=40); self.set_company.insert(0, get_company_name()); self.set_company.pack(side="left", padx=6)
+        self.set_company = ttk.Entry(card, width=40); self.set_company.pack(side="left", padx=6)
+        self._io(core.get_company_name, done=lambda name: self.set_company.insert(0, name))
         ttk.Button(card, text="Save", command=self._save_company).pack(side="left", padx=6)
 
         cat = self._card(tab); cat.pack(fill="both", expand=True, padx=6, pady=6)
@@ -1352,47 +1541,40 @@ class RainbowLedgerApp(tk.Tk):
         self._refresh_categories_table()
 
     def _save_company(self):
-        try:
-            set_company_name(self.set_company.get())
+        def saved(_):
             self._toast("Saved")
-            self.after(50, lambda: self.banner.draw_gradient())
-        except Exception as e:
-            messagebox.showerror("Error", f"Save failed:\n{e}")
+            self.animator.later(50, self.banner.draw_gradient)
+        self._io(core.set_company_name, self.set_company.get(), done=saved, fail="Save failed")
+
+    def _categories_changed(self, msg):
+        self._refresh_categories_table()
+        if "Transactions" in self._built: self._fill_choices(self.tx_cat, core.get_categories)
+        self._toast(msg)
 
     def _add_category(self):
-        try:
-            add_category(self.cat_name.get(), self.cat_type.get())
-            self._refresh_categories_table()
-            self.tx_cat.configure(values=get_categories())
-            self._toast("Category added")
-        except Exception as e:
-            messagebox.showerror("Error", f"Add category failed:\n{e}")
+        self._io(core.add_category, self.cat_name.get(), self.cat_type.get(),
+                 done=lambda _: self._categories_changed("Category added"), fail="Add category failed")
 
     def _remove_category(self):
-        try:
-            sel = self.cat_table.selection()
-            if not sel: return
-            name = self.cat_table.item(sel[0], "values")[0]
-            remove_category(name)
-            self._refresh_categories_table()
-            self.tx_cat.configure(values=get_categories())
-            self._toast("Category removed")
-        except Exception as e:
-            messagebox.showerror("Error", f"Remove failed:\n{e}")
+        sel = self.cat_table.selection()
+        if not sel: return
+        name = self.cat_table.item(sel[0], "values")[0]
+        self._io(core.remove_category, name, done=lambda _: self._categories_changed("Category removed"), fail="Remove failed")
 
     def _refresh_categories_table(self):
+        self._io(core.get_categories_df, key="cat_table", done=self._show_categories_table, fail="Load categories failed")
+
+    def _show_categories_table(self, df):
         for i in self.cat_table.get_children():
             self.cat_table.delete(i)
         try:
-            df = get_categories_df()
             for _, r in df.iterrows():
                 self.cat_table.insert("", "end", values=(r.get("Category",""), r.get("Type","")))
         except Exception as e:
             messagebox.showerror("Error", f"Load categories failed:\n{e}")
 
     # ----- Help -----
-    def _build_help_tab(self):
-        tab = ttk.Frame(self.nb); self.nb.add(tab, text="Help")
+    def _build_help_tab(self, tab):
         top = ttk.Frame(tab); top.pack(fill="x", padx=8, pady=8)
         ttk.Label(top, text="Search").pack(side="left")
         q = ttk.Entry(top, width=40); q.pack(side="left", padx=6)
@@ -1419,22 +1601,95 @@ class RainbowLedgerApp(tk.Tk):
         refresh_list()
         if lst.size(): lst.selection_set(0); show_item()
 
+    # ----- Performance -----
+    def _toggle_low_power(self):
+        self.banner.set_low_power(not self.banner.low_power)
+        self._toast("Low-power mode on" if self.banner.low_power else "Low-power mode off")
+
+    def _slow_op(self, rec):
+        what = f"{rec['op']} {rec['detail']}".strip()
+        self._toast(f"Slow: {what} took {rec['ms']/1000:.1f}s")
+
+    def _show_performance(self):
+        win = tk.Toplevel(self)
+        win.title("Performance")
+        win.geometry("860x560+%d+%d" % (self.winfo_rootx()+80, self.winfo_rooty()+80))
+        top = ttk.Frame(win); top.pack(fill="x", padx=10, pady=(10,4))
+        ttk.Label(top, text="Warn when an operation takes longer than").pack(side="left")
+        slow = ttk.Entry(top, width=8); slow.insert(0, f"{core.SLOW_OP_MS:g}"); slow.pack(side="left", padx=6)
+        ttk.Label(top, text="ms").pack(side="left")
+
+        def set_slow(_=None):
+            try:
+                core.SLOW_OP_MS = max(float(slow.get()), 0.0)
+            except ValueError:
+                slow.delete(0, "end"); slow.insert(0, f"{core.SLOW_OP_MS:g}")
+        slow.bind("<Return>", set_slow); slow.bind("<FocusOut>", set_slow)
+
+        timers = ttk.Label(top); timers.pack(side="right")
+        ttk.Label(win, text=f"Latency by operation (ms, last {core.PERF_HISTORY} calls each)",
+                  font=("Segoe UI", 10, "bold")).pack(anchor="w", padx=10, pady=(6,2))
+        cols = ("Operation","Calls","p50","p90","p99","Max","Rows")
+        summary = ttk.Treeview(win, columns=cols, show="headings", height=8)
+        for c in cols:
+            summary.heading(c, text=c); summary.column(c, width=160 if c == "Operation" else 90, anchor="w" if c == "Operation" else "e")
+        summary.pack(fill="x", padx=10)
+
+        ttk.Label(win, text="Slowest recent calls", font=("Segoe UI", 10, "bold")).pack(anchor="w", padx=10, pady=(10,2))
+        cols = ("When","Operation","Detail","ms","Rows","Bytes")
+        slowest = ttk.Treeview(win, columns=cols, show="headings", height=10)
+        for c, w in [("When",150),("Operation",130),("Detail",250),("ms",90),("Rows",90),("Bytes",100)]:
+            slowest.heading(c, text=c); slowest.column(c, width=w, anchor="e" if c in ("ms","Rows","Bytes") else "w")
+        slowest.pack(fill="both", expand=True, padx=10)
+
+        def num(v, fmt="{:,}"):
+            return "" if v is None else fmt.format(v)
+
+        def refresh():
+            timers.config(text=f"UI timers: {self.animator.active} active, {self.animator.parked} parked")
+            for tv in (summary, slowest):
+                tv.delete(*tv.get_children())
+            for r in core.perf_summary().itertuples(index=False):
+                summary.insert("", "end", values=(r.op, r.calls, f"{r.p50:,.1f}", f"{r.p90:,.1f}", f"{r.p99:,.1f}",
+                                                  f"{r.max:,.1f}", f"{r.rows:,}"))
+            for r in core.slowest_calls(25):
+                slowest.insert("", "end", values=(r["at"].replace("T", " "), r["op"], r["detail"], f"{r['ms']:,.1f}",
+                                                  num(r["rows"]), num(r["bytes"])))
+
+        def reset():
+            core.reset_timings(); refresh()
+
+        btns = ttk.Frame(win); btns.pack(fill="x", padx=10, pady=8)
+        ttk.Button(btns, text="Close", command=win.destroy).pack(side="right", padx=6)
+        ttk.Button(btns, text="Open Log", command=lambda: self._open_path(core.perf_log_path())).pack(side="right", padx=6)
+        ttk.Button(btns, text="Reset", command=reset).pack(side="right", padx=6)
+        ttk.Button(btns, text="Refresh", command=refresh).pack(side="right", padx=6)
+        refresh()
+
     # ----- Command Palette -----
     def _register_commands(self):
         cmds = [
-            ("Dashboard: Refresh", self._load_dashboard),
-            ("Transactions: Add", self._add_tx),
+            ("Dashboard: Refresh", self._in_tab("Dashboard", self._load_dashboard)),
+            ("Transactions: Add", self._in_tab("Transactions", self._add_tx)),
             ("Transactions: Import CSV", self._import_csv_wizard),
             ("Transactions: Export CSV", self._export_transactions_csv),
-            ("Invoices: Create", self._add_invoice),
-            ("Invoices: Mark Paid", self._mark_invoice_paid),
-            ("Reports: Build/Refresh", self._load_report_preview),
-            ("Settings: Save Company", self._save_company),
+            ("Invoices: Create", self._in_tab("Invoices", self._add_invoice)),
+            ("Invoices: Mark Paid", self._in_tab("Invoices", self._mark_invoice_paid)),
+            ("Invoices: Import CSV", self._import_invoices_csv),
+            ("Payroll: Run", self._in_tab("Payroll", self._run_payroll)),
+            ("Payroll: Run All Employees…", self._in_tab("Payroll", self._run_payroll_all)),
+            ("Reports: Build/Refresh", self._in_tab("Reports", self._load_report_preview)),
+            ("Reports: Verify/Rebuild Aggregates", self._verify_aggregates),
+            ("Settings: Save Company", self._in_tab("Settings", self._save_company)),
             ("Open: Workbook", self._open_workbook),
             ("Open: Month Folder", self._open_month_folder),
             ("Month: Switch…", self._switch_month_dialog),
             ("Month: Close (Finalize)", self._close_month),
+            ("Month: Rebuild All Closed Months…", self._rebuild_all_months),
             ("Backup: Workbook", self._backup_workbook),
+            ("Workbook: Save/Export Now", self._flush_now),
+            ("Performance: Show Timings…", self._show_performance),
+            ("View: Toggle Low-Power Mode", self._toggle_low_power),
         ]
         self._commands = cmds
 
@@ -1444,6 +1699,13 @@ class RainbowLedgerApp(tk.Tk):
 
 # ---- main ----
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    if "--rebuild-months" in sys.argv[1:]:
+        # same as: python -m ledger_cli [--data DIR] rebuild-months [--only YYYY-MM] [--workers N]
+        import ledger_cli
+        args = [a for a in sys.argv[1:] if a != "--rebuild-months"]
+        at = sys.argv[1:].index("--rebuild-months")
+        sys.exit(ledger_cli.main(args[:at] + ["rebuild-months"] + args[at:]))
     try:
         app = RainbowLedgerApp()
         app.mainloop()
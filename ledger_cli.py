@@ -0,0 +1,201 @@
+"""Headless command line for Rainbow Ledger (no Tkinter, no display needed).
+
+    python -m ledger_cli add-tx 2026-10-03 expense Supplies 42.50 --description "Printer paper"
+    python -m ledger_cli import-csv statement.csv --default-category "Other Expenses"
+    python -m ledger_cli run-payroll --hours-csv hours.csv
+    python -m ledger_cli build-reports
+    python -m ledger_cli close-month
+    python -m ledger_cli export reports --out /srv/exports
+    python -m ledger_cli serve --port 8765
+
+Every command works on the current month's workbook under the data folder
+(--data, default data/ next to the app), or on --month YYYY-MM. The month
+rollover the GUI does at startup happens here too, and the workbook is
+brought up to date before the command exits.
+"""
+import os
+import sys
+import shutil
+import argparse
+from datetime import datetime
+
+import pandas as pd
+
+import ledger_core as core
+
+# ---------- Commands ----------
+def cmd_add_tx(args):
+    core.add_transaction(args.date, args.type, args.category, args.amount, args.description,
+                         args.party, args.method, args.reference)
+    print(f"Added {args.type} {args.category} {args.amount:,.2f} on {args.date}")
+
+def cmd_import_csv(args):
+    if args.invoices:
+        inv = core.create_invoices_batch(core.read_invoices_csv(args.path))
+        print(f"Created {len(inv)} invoices, total {inv['Amount'].sum():,.2f}")
+        return
+    mapping = core.guess_bank_mapping(pd.read_csv(args.path, nrows=0).columns)
+    for key in core.BANK_CSV_GUESSES:
+        col = getattr(args, f"{key.lower()}_col")
+        if col is not None:
+            mapping[key] = col or None  # --type-col "" unmaps a guessed column
+    missing = [k for k in ("Date", "Amount", "Description") if not mapping.get(k)]
+    if missing:
+        raise ValueError("Could not find a column for " + ", ".join(missing)
+                         + "; pass " + " ".join(f"--{k.lower()}-col" for k in missing))
+
+    def progress(frac, n):
+        if args.verbose:
+            print(f"  {frac:6.1%}  {n} rows", file=sys.stderr, flush=True)
+    n, skipped = core.import_bank_csv(args.path, mapping, args.default_type, args.default_category,
+                                      progress=progress, skip_duplicates=not args.keep_duplicates)
+    print(f"Imported {n} rows" + (f", skipped {len(skipped)} duplicates" if len(skipped) else ""))
+
+def cmd_run_payroll(args):
+    if args.employee:
+        ps_id, gross, tax, net = core.run_payroll(args.date, args.employee, args.hours or 0.0)
+        print(f"{ps_id} {args.employee}: gross {gross:,.2f} tax {tax:,.2f} net {net:,.2f}")
+        return
+    hours = core.read_hours_csv(args.hours_csv) if args.hours_csv else None
+    ps = core.run_payroll_batch(args.date, hours)
+    print(f"Ran payroll for {len(ps)} employees: gross {ps['Gross'].sum():,.2f} net {ps['Net'].sum():,.2f}")
+
+def cmd_build_reports(args):
+    core.build_reports()
+    print(f"Reports rebuilt in {core.EXCEL_PATH}")
+
+def cmd_close_month(args):
+    # what the GUI's Close This Month does, without swallowing errors
+    key = args.month or core.month_key()
+    core.finalize_month(key)
+    shutil.copy2(core.EXCEL_PATH, core.final_path_for(key))
+    print(f"{key} finalized: {core.final_path_for(key)}")
+
+def cmd_export(args):
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+    if args.what in ("transactions", "all"):
+        path, n = core.export_transactions_csv(os.path.join(args.out, "Transactions.csv") if args.out else None)
+        print(f"Wrote {n} transactions to {path}")
+    if args.what in ("reports", "all"):
+        paths = core.export_reports_csv(args.out)
+        print("\n".join(f"Wrote {p}" for p in paths) if paths else "No transactions to report yet.")
+    if args.what in ("workbook", "all"):
+        core.sync_workbook()
+        if args.out:
+            shutil.copy2(core.EXCEL_PATH, args.out)
+        print(f"Workbook saved: {os.path.join(args.out, core.EXCEL_FILENAME) if args.out else core.EXCEL_PATH}")
+
+def cmd_rebuild_months(args):
+    unknown = sorted(set(args.only or ()) - set(core.month_keys()))
+    if unknown:
+        raise ValueError(f"no workbook for {', '.join(unknown)} under {core.DATA_ROOT}")
+    errors = core.rebuild_all_months(args.only, args.workers,
+                                     lambda done, total, msg: print(f"[{done}/{total}] {msg}", flush=True))
+    for k, e in sorted(errors.items()):
+        print(f"{k}: {e}", file=sys.stderr)
+    return 1 if errors else 0
+
+def cmd_serve(args):
+    import ledger_server
+    return ledger_server.serve(args.host, args.port, follow_month=args.month is None, verbose=args.verbose)
+
+# ---------- Arguments ----------
+def _date(text):
+    try:
+        return pd.to_datetime(text).strftime("%Y-%m-%d")
+    except (ValueError, TypeError):
+        raise argparse.ArgumentTypeError(f"not a date: {text!r}")
+
+def _month(text):
+    try:
+        return datetime.strptime(text, "%Y-%m").strftime("%Y-%m")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {text!r}")
+
+def build_parser():
+    today = datetime.now().strftime("%Y-%m-%d")
+    ap = argparse.ArgumentParser(prog="python -m ledger_cli", description="Rainbow Ledger without the window.")
+    ap.add_argument("--data", default=core.DATA_ROOT, help="data folder with the YYYY-MM month folders (default %(default)s)")
+    ap.add_argument("--month", type=_month, help="work on this YYYY-MM workbook instead of the current month")
+    ap.add_argument("--backend", choices=["excel", "sqlite"], default=core.STORAGE_BACKEND)
+    ap.add_argument("-v", "--verbose", action="store_true", help="print progress and a timing summary to stderr")
+    sub = ap.add_subparsers(dest="command", required=True, metavar="command")
+
+    p = sub.add_parser("add-tx", help="add one transaction")
+    p.add_argument("date", type=_date)
+    p.add_argument("type", choices=["income", "expense", "transfer"])
+    p.add_argument("category")
+    p.add_argument("amount", type=float)
+    p.add_argument("--description", default="")
+    p.add_argument("--party", default="", help="customer or vendor")
+    p.add_argument("--method", default="", help="payment method")
+    p.add_argument("--reference", default="")
+    p.set_defaults(func=cmd_add_tx)
+
+    p = sub.add_parser("import-csv", help="import a bank statement CSV (or invoices with --invoices)")
+    p.add_argument("path")
+    p.add_argument("--invoices", action="store_true",
+                   help="the CSV has invoice lines (CustomerName, Item, Qty, Rate, Date, DueDate, Notes)")
+    for key in core.BANK_CSV_GUESSES:
+        p.add_argument(f"--{key.lower()}-col", metavar="COLUMN",
+                       help=f"CSV column for {key} (default: guessed from the header)")
+    p.add_argument("--default-type", choices=["income", "expense"], default="expense",
+                   help="Type for rows whose type or sign is missing (default %(default)s)")
+    p.add_argument("--default-category", default="Other Expenses")
+    p.add_argument("--keep-duplicates", action="store_true", help="import rows already in the ledger too")
+    p.set_defaults(func=cmd_import_csv)
+
+    p = sub.add_parser("run-payroll", help="pay every employee, or one with --employee")
+    p.add_argument("--date", type=_date, default=today)
+    p.add_argument("--employee", help="pay only this employee")
+    p.add_argument("--hours", type=float, help="hours for --employee (hourly staff)")
+    p.add_argument("--hours-csv", help="EmployeeName,Hours CSV for hourly staff")
+    p.set_defaults(func=cmd_run_payroll)
+
+    p = sub.add_parser("build-reports", help="rebuild the Reports sheet")
+    p.set_defaults(func=cmd_build_reports)
+
+    p = sub.add_parser("close-month", help="finalize the month: reports, summary and FINAL copy")
+    p.set_defaults(func=cmd_close_month)
+
+    p = sub.add_parser("export", help="write CSVs and/or save the workbook")
+    p.add_argument("what", nargs="?", choices=["transactions", "reports", "workbook", "all"], default="all")
+    p.add_argument("--out", help="folder to write to (default: the month folder)")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("rebuild-months", help="rebuild Reports and FINAL copies for closed months")
+    p.add_argument("--only", action="append", type=_month, metavar="YYYY-MM",
+                   help="month to rebuild (repeatable; default: all closed months)")
+    p.add_argument("--workers", type=int, help=f"worker processes (default {core.REBUILD_MAX_WORKERS})")
+    p.set_defaults(func=cmd_rebuild_months)
+
+    p = sub.add_parser("serve", help="accept transactions, invoices and hours as JSON over HTTP")
+    p.add_argument("--host", default="127.0.0.1", help="address to listen on (default %(default)s)")
+    p.add_argument("--port", type=int, default=8765)
+    p.set_defaults(func=cmd_serve)
+    return ap
+
+def main(argv=None):
+    ap = build_parser()
+    args = ap.parse_args(argv)
+    if args.command == "run-payroll" and args.employee is None and args.hours is not None:
+        ap.error("run-payroll: --hours needs --employee")
+    core.DATA_ROOT, core.STORAGE_BACKEND = os.path.abspath(args.data), args.backend
+    try:
+        if args.command != "rebuild-months":
+            core.bootstrap_month_rotation(switch_to=args.month)
+            core.ensure_workbook()
+        rc = args.func(args)
+        core.sync_workbook()
+    except (ValueError, KeyError, OSError) as e:
+        print(f"{args.command}: {e}", file=sys.stderr)
+        return 1
+    if args.verbose:
+        summary = core.perf_summary()
+        if not summary.empty:
+            print(summary.to_string(index=False), file=sys.stderr)
+    return rc or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
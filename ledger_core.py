@@ -0,0 +1,1910 @@
+# ledger_core.py
+# Rainbow Ledger backend: monthly Excel workbooks, write-behind journal,
+# reports, imports and payroll. pandas + openpyxl, no Tkinter, so scripts and
+# headless jobs can use it without a display; finance_app_gui.py loads it in
+# the background once its window is up.
+# Requirements: pip install pandas openpyxl
+
+import os
+import re
+import sys
+import shutil
+import json
+import atexit
+import sqlite3
+import itertools
+import time
+import threading
+import queue
+import logging
+import logging.handlers
+import contextlib
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import namedtuple, Counter, deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_ROOT = os.path.join(APP_DIR, "data")
+
+EXCEL_FILENAME = "company_finance.xlsx"
+EXCEL_PATH = None  # set at runtime by bootstrap_month_rotation()
+
+# Write-behind: edits go to an fsync'd journal next to the workbook and the
+# .xlsx is rewritten on a debounce timer, month switch/close and exit.
+WRITE_BEHIND = True
+FLUSH_DELAY_MS = 5000
+
+# "excel" keeps the .xlsx (plus journal) as the record; "sqlite" keeps a ledger
+# database next to it and regenerates the .xlsx on demand and at month close.
+STORAGE_BACKEND = os.environ.get("RAINBOW_LEDGER_BACKEND", "excel")
+
+DEFAULT_CATEGORIES = [
+    # Expenses (simplified Schedule C-ish)
+    "Advertising","Car and Truck Expenses","Contract Labor","Depreciation","Employee Benefit Programs",
+    "Insurance (Other)","Interest (Mortgage)","Interest (Other)","Legal and Professional Services",
+    "Office Expenses","Rent or Lease (Vehicles)","Rent or Lease (Other)","Repairs and Maintenance",
+    "Supplies","Taxes and Licenses","Travel","Meals (50%)","Utilities","Wages","Other Expenses",
+    # Income
+    "Sales","Services","Other Income"
+]
+
+def set_excel_path(path):
+    global EXCEL_PATH
+    if EXCEL_PATH and EXCEL_PATH != path:
+        sync_workbook(EXCEL_PATH)
+    EXCEL_PATH = path
+    if path and os.path.exists(path) and STORAGE_BACKEND != "sqlite":
+        recover_journal(path)
+
+def month_key(dt=None):
+    return (dt or datetime.today()).strftime("%Y-%m")
+
+def month_dir(key=None):
+    k = key or month_key()
+    d = os.path.join(DATA_ROOT, k)
+    os.makedirs(d, exist_ok=True)
+    return d
+
+def excel_path_for(key=None):
+    return os.path.join(month_dir(key), EXCEL_FILENAME)
+
+def _autosize(ws):
+    for col in ws.columns:
+        max_len = 10
+        letter = get_column_letter(col[0].column)
+        for cell in col:
+            v = cell.value
+            if v is not None:
+                max_len = max(max_len, len(str(v)))
+        ws.column_dimensions[letter].width = max_len + 2
+
+def create_workbook(path, company_name="My Company"):
+    wb = Workbook()
+
+    ws = wb.active
+    ws.title = "Settings"
+    ws.append(["Key","Value"])
+    ws.append(["CompanyName", company_name])
+    ws.append(["BaseCurrency","USD"])
+    _autosize(ws)
+
+    ws = wb.create_sheet("ChartOfAccounts")
+    ws.append(["Category","Type"])
+    for c in DEFAULT_CATEGORIES:
+        t = "income" if c in ["Sales","Services","Other Income"] else "expense"
+        ws.append([c, t])
+    _autosize(ws)
+
+    ws = wb.create_sheet("Customers")
+    ws.append(["CustomerName","Email","Phone","BillingAddress","Notes"])
+    _autosize(ws)
+
+    ws = wb.create_sheet("Vendors")
+    ws.append(["VendorName","Email","Phone","Address","Notes"])
+    _autosize(ws)
+
+    ws = wb.create_sheet("Employees")
+    ws.append(["EmployeeName","Type","HourlyRate","Salary","TaxRate","Notes"])
+    _autosize(ws)
+
+    ws = wb.create_sheet("Transactions")
+    ws.append(["Date","Type","Category","Description","CustomerOrVendor","Amount","PaymentMethod","Reference","LinkedDoc"])
+    _autosize(ws)
+
+    ws = wb.create_sheet("Invoices")
+    ws.append(["InvoiceID","Date","DueDate","CustomerName","Item","Qty","Rate","Amount","Status","Notes"])
+    _autosize(ws)
+
+    ws = wb.create_sheet("Payslips")
+    ws.append(["PayslipID","Date","EmployeeName","Hours","Gross","Tax","Net","Notes"])
+    _autosize(ws)
+
+    ws = wb.create_sheet("Reports")
+    ws.append(["ReportName","AsOf","Notes"])
+    _autosize(ws)
+
+    wb.save(path)
+    invalidate_cache(path)
+
+def find_last_workbook():
+    if not os.path.isdir(DATA_ROOT):
+        return None
+    keys = [k for k in os.listdir(DATA_ROOT) if os.path.isdir(os.path.join(DATA_ROOT, k))]
+    keys = sorted([k for k in keys if len(k) == 7 and k[4] == "-"])  # YYYY-MM
+    for k in reversed(keys):
+        p = os.path.join(DATA_ROOT, k, EXCEL_FILENAME)
+        if os.path.exists(p):
+            return k, p
+    return None
+
+def get_default_columns_for_sheet(sheet):
+    defaults = {
+        "Settings": ["Key","Value"],
+        "ChartOfAccounts": ["Category","Type"],
+        "Customers": ["CustomerName","Email","Phone","BillingAddress","Notes"],
+        "Vendors": ["VendorName","Email","Phone","Address","Notes"],
+        "Employees": ["EmployeeName","Type","HourlyRate","Salary","TaxRate","Notes"],
+    }
+    return defaults.get(sheet, [])
+
+def create_new_month_from_previous(prev_path, current_path):
+    sync_workbook(prev_path)
+    masters = ["Settings","ChartOfAccounts","Customers","Vendors","Employees"]
+    tx_sheets = {
+        "Transactions": ["Date","Type","Category","Description","CustomerOrVendor","Amount","PaymentMethod","Reference","LinkedDoc"],
+        "Invoices":     ["InvoiceID","Date","DueDate","CustomerName","Item","Qty","Rate","Amount","Status","Notes"],
+        "Payslips":     ["PayslipID","Date","EmployeeName","Hours","Gross","Tax","Net","Notes"],
+        "Reports":      ["ReportName","AsOf","Notes"],
+    }
+    frames = {}
+    with pd.ExcelWriter(current_path, engine="openpyxl") as xw:
+        for s in masters:
+            try:
+                df = _load_sheet_from_disk(prev_path, s)
+                if df is None or df.empty:
+                    df = pd.DataFrame(columns=get_default_columns_for_sheet(s))
+            except Exception:
+                df = pd.DataFrame(columns=get_default_columns_for_sheet(s))
+            df.to_excel(xw, sheet_name=s, index=False)
+            frames[s] = df
+        for s, cols in tx_sheets.items():
+            frames[s] = pd.DataFrame(columns=cols)
+            frames[s].to_excel(xw, sheet_name=s, index=False)
+    invalidate_cache(current_path)
+    _sidecar_store(current_path, frames)
+
+def final_path_for(key):
+    return os.path.join(DATA_ROOT, key, f"company_finance_FINAL_{key}.xlsx")
+
+def finalize_month(key, prior=None):
+    # Reports sheet + month summary for the workbook at EXCEL_PATH
+    sync_workbook(EXCEL_PATH)
+    build_reports(prior)
+    write_month_summary(key, transaction_aggregates())
+
+def archive_prev_month(prev_key, prev_path):
+    set_excel_path(prev_path)
+    try:
+        finalize_month(prev_key)
+    except Exception:
+        pass
+    try:
+        shutil.copy2(prev_path, final_path_for(prev_key))
+    except Exception:
+        pass
+
+def bootstrap_month_rotation(force_close=None, switch_to=None):
+    os.makedirs(DATA_ROOT, exist_ok=True)
+    if switch_to:
+        # switch to existing month key if exists (or create if not)
+        path = excel_path_for(switch_to)
+        if not os.path.exists(path):
+            last = find_last_workbook()
+            if last:
+                _, last_path = last
+                create_new_month_from_previous(last_path, path)
+            else:
+                create_workbook(path, "My Company")
+        set_excel_path(path)
+        return
+
+    cur_key = month_key()
+    cur_path = excel_path_for(cur_key)
+    last = find_last_workbook()
+
+    if force_close and last:
+        last_key, last_path = last
+        archive_prev_month(last_key, last_path)
+
+    if last:
+        last_key, last_path = last
+        if last_key != cur_key:
+            archive_prev_month(last_key, last_path)
+            if not os.path.exists(cur_path):
+                create_new_month_from_previous(last_path, cur_path)
+
+    if not os.path.exists(cur_path):
+        create_workbook(cur_path, "My Company")
+
+    set_excel_path(cur_path)
+
+def ensure_workbook(ask_company=None):
+    # ask_company() -> name for a brand-new workbook (the GUI asks in a dialog)
+    if not os.path.exists(EXCEL_PATH):
+        company = ask_company() if ask_company else None
+        if not company:
+            company = "My Company"
+        create_workbook(EXCEL_PATH, company_name=company)
+
+# ---------- Instrumentation ----------
+# Storage, report, import and table-refresh steps are timed with perf_span().
+# The last PERF_HISTORY calls per operation stay in memory for the Performance
+# panel, every call is appended to perf.log in the data folder (rotated by
+# size), and calls slower than SLOW_OP_MS also go to SLOW_OP_LISTENERS.
+PERF_LOG_NAME = "perf.log"
+PERF_LOG_MAX_BYTES = 1_000_000
+PERF_LOG_BACKUPS = 3
+PERF_LOG_ENABLED = True
+PERF_HISTORY = 500
+SLOW_OP_MS = float(os.environ.get("RAINBOW_LEDGER_SLOW_MS", "1000"))
+SLOW_OP_LISTENERS = []  # called with the timing record, on the timed thread
+
+_PERF = {}  # op -> deque of records
+_PERF_LOCK = threading.Lock()
+_PERF_LOG_LOCK = threading.Lock()  # one handler swap at a time; timed threads all log
+_perf_logger = logging.getLogger("rainbow_ledger.perf")
+_perf_logger.propagate = False
+_perf_logger.setLevel(logging.INFO)
+_perf_handler = None  # ours, whatever else is attached to the logger
+
+def perf_log_path():
+    return os.path.join(DATA_ROOT, PERF_LOG_NAME)
+
+def _perf_log(rec, slow):
+    global _perf_handler
+    path = perf_log_path()
+    with _PERF_LOG_LOCK:
+        if _perf_handler is None or _perf_handler.baseFilename != os.path.abspath(path):
+            if _perf_handler is not None:
+                _perf_logger.removeHandler(_perf_handler); _perf_handler.close()
+            os.makedirs(DATA_ROOT, exist_ok=True)
+            _perf_handler = logging.handlers.RotatingFileHandler(path, maxBytes=PERF_LOG_MAX_BYTES,
+                                                                 backupCount=PERF_LOG_BACKUPS, encoding="utf-8", delay=True)
+            _perf_handler.setFormatter(logging.Formatter("%(message)s"))
+            _perf_logger.addHandler(_perf_handler)
+        _perf_logger.log(logging.WARNING if slow else logging.INFO, json.dumps(rec))
+
+def record_timing(op, ms, rows=None, nbytes=None, detail=""):
+    rec = {"at": datetime.now().isoformat(timespec="milliseconds"), "op": op, "ms": round(ms, 3),
+           "rows": rows, "bytes": nbytes, "detail": detail, "thread": threading.current_thread().name}
+    with _PERF_LOCK:
+        _PERF.setdefault(op, deque(maxlen=PERF_HISTORY)).append(rec)
+    slow = ms >= SLOW_OP_MS
+    if PERF_LOG_ENABLED:
+        try:
+            _perf_log(rec, slow)
+        except OSError:
+            pass  # timings are best effort; never fail the operation over them
+    if slow:
+        for listener in SLOW_OP_LISTENERS:
+            listener(rec)
+    return rec
+
+@contextlib.contextmanager
+def perf_span(op, detail=""):
+    # the block may fill in info["rows"] / info["bytes"] / info["detail"]
+    info = {"rows": None, "bytes": None, "detail": detail}
+    t0 = time.perf_counter()
+    try:
+        yield info
+    finally:
+        record_timing(op, (time.perf_counter() - t0) * 1000, info["rows"], info["bytes"], info["detail"])
+
+def perf_summary():
+    # per operation: calls, p50/p90/p99/max ms and rows over the kept history
+    with _PERF_LOCK:
+        recs = {op: list(d) for op, d in _PERF.items()}
+    out = []
+    for op, rs in sorted(recs.items()):
+        ms = np.array([r["ms"] for r in rs])
+        p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+        out.append({"op": op, "calls": len(rs), "p50": p50, "p90": p90, "p99": p99, "max": ms.max(),
+                    "rows": sum(r["rows"] or 0 for r in rs)})
+    return pd.DataFrame(out, columns=["op", "calls", "p50", "p90", "p99", "max", "rows"])
+
+def slowest_calls(n=20):
+    with _PERF_LOCK:
+        recs = [r for d in _PERF.values() for r in d]
+    return sorted(recs, key=lambda r: r["ms"], reverse=True)[:n]
+
+def reset_timings():
+    with _PERF_LOCK:
+        _PERF.clear()
+
+# ---------- Workbook cache ----------
+# Parsed sheets are kept per workbook path and handed out until the file on
+# disk changes (mtime/size) or the app writes it itself.
+_WB_CACHE = {}  # path -> {"stamp": (mtime_ns, size), "sheets": {name: DataFrame}, "versions": {name: int}}
+_VERSION_SEQ = itertools.count(1)
+STORAGE_LOCK = threading.RLock()  # held by the I/O thread per job and by read_sheet()
+# called on the committing thread with [(op, sheet, rows, first row number)]
+# per commit; a "replace" carries the whole new sheet
+COMMIT_LISTENERS = []
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def _cache_entry(path):
+    stamp = _file_stamp(path)
+    entry = _WB_CACHE.get(path)
+    if entry is None or entry["stamp"] != stamp:
+        entry = {"stamp": stamp, "sheets": {}, "versions": {}}
+        _WB_CACHE[path] = entry
+    return entry
+
+def sheet_version(sheet):
+    # changes whenever the sheet's contents may have changed (our commits or
+    # a different file on disk); use it to key anything derived from a sheet
+    return _cache_entry(EXCEL_PATH)["versions"].setdefault(sheet, next(_VERSION_SEQ))
+
+def invalidate_cache(path=None):
+    if path is None:
+        _WB_CACHE.clear()
+    else:
+        _WB_CACHE.pop(path, None)
+
+def read_sheet(sheet):
+    with STORAGE_LOCK, perf_span("read_sheet", f"{sheet} (cached)") as span:
+        entry = _cache_entry(EXCEL_PATH)
+        df = entry["sheets"].get(sheet)
+        if df is None:
+            df = _db_read(EXCEL_PATH, sheet) if STORAGE_BACKEND == "sqlite" else None
+            span["detail"] = f"{sheet} (sqlite)"
+            if df is None:
+                df = _load_sheet_from_disk(EXCEL_PATH, sheet)
+                span["detail"], span["bytes"] = sheet, (_file_stamp(EXCEL_PATH) or (0, None))[1]
+                jp = journal_path_for(EXCEL_PATH)
+                if os.path.exists(jp):
+                    df = _replay_journal(df, sheet, _read_journal(jp))
+            entry["sheets"][sheet] = df
+        span["rows"] = len(df)
+        # callers mutate what they get back, so never hand out the cached frame
+        return df.copy()
+
+def write_sheet(df, sheet):
+    with SheetTransaction() as uow:
+        uow.write(df, sheet)
+
+def append_rows(rows, sheet):
+    with SheetTransaction() as uow:
+        uow.append(rows, sheet)
+
+class SheetTransaction:
+    """Unit of work over the current workbook.
+
+    Stages appends/replacements to any number of sheets and commits them
+    together: one journal record in write-behind mode, one workbook rewrite
+    otherwise. Used as a context manager it commits on success and drops
+    everything staged if the block raises.
+    """
+    def __init__(self):
+        self._frames = {}  # sheet -> staged full frame
+        self._ops = []     # (op, sheet, df) in staging order
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def read(self, sheet):
+        if sheet in self._frames:
+            return self._frames[sheet].copy()
+        return read_sheet(sheet)
+
+    def append(self, rows, sheet):
+        base = self._frames[sheet] if sheet in self._frames else read_sheet(sheet)
+        self._frames[sheet] = pd.concat([base, rows], ignore_index=True)
+        self._ops.append(("append", sheet, rows))
+
+    def write(self, df, sheet):
+        self._frames[sheet] = df.copy()
+        self._ops.append(("replace", sheet, df))
+
+    def commit(self):
+        if not self._ops:
+            return
+        detail = ", ".join(f"{op} {sheet}" for op, sheet, _ in self._ops)
+        with perf_span("write_sheet", detail) as span:
+            span["rows"] = sum(len(df) for _, _, df in self._ops)
+            self._commit()
+
+    def _commit(self):
+        entry = _cache_entry(EXCEL_PATH)  # validate against disk before we touch it
+        if STORAGE_BACKEND == "sqlite":
+            _db_commit(EXCEL_PATH, self._ops, self._frames)
+        elif WRITE_BEHIND:
+            _journal_write(EXCEL_PATH, self._ops)
+        else:
+            _write_sheets_atomic(EXCEL_PATH, self._frames)
+            entry["stamp"] = _file_stamp(EXCEL_PATH)
+        # sheets we did not touch are unchanged; write-through the ones we did
+        entry["sheets"].update(self._frames)
+        for sheet in self._frames:
+            entry["versions"][sheet] = next(_VERSION_SEQ)
+        agg = entry.get("aggregates")
+        for op, sheet, df in self._ops:
+            if agg is None:
+                break
+            if sheet == "Transactions":
+                agg = _merge_aggregates(agg, _aggregate(df)) if op == "append" else None
+        entry["aggregates"] = agg
+        for op, sheet, df in self._ops:
+            if sheet == "Transactions":
+                _fingerprints_committed(EXCEL_PATH, entry, op, df)
+        if COMMIT_LISTENERS:
+            changes = self._changes()
+            for listener in COMMIT_LISTENERS:
+                listener(changes)
+        self._frames, self._ops = {}, []
+
+    def _changes(self):
+        # walk back from the final frames to number each appended block;
+        # anything staged before a sheet's last replace is superseded by it
+        size = {sheet: len(df) for sheet, df in self._frames.items()}
+        out = []
+        for op, sheet, df in reversed(self._ops):
+            if size[sheet] is None:
+                continue
+            if op == "append":
+                size[sheet] -= len(df)
+                out.append((op, sheet, df, size[sheet]))
+            else:
+                out.append((op, sheet, df, 0))
+                size[sheet] = None
+        return out[::-1]
+
+# ---------- Columnar sidecar ----------
+# Each workbook keeps a JSON copy of its sheets (pandas "split" layout plus
+# the column dtypes) in <name>.sidecar/, with a manifest of the workbook stamp
+# every copy matches. JSON rather than pickle: the data folder may be shared,
+# and loading a sidecar must never run code.
+# A sheet is loaded from its sidecar only when that stamp is the workbook's
+# current one, so an edit made in Excel falls back to parsing the .xlsx.
+# Sidecars mirror the .xlsx, never the journal.
+USE_SIDECAR = True
+
+def sidecar_dir_for(path):
+    return os.path.splitext(path)[0] + ".sidecar"
+
+def _sidecar_file(path, sheet):
+    return os.path.join(sidecar_dir_for(path), f"{sheet}.json")
+
+def _sidecar_manifest(path):
+    try:
+        with open(os.path.join(sidecar_dir_for(path), "manifest.json"), encoding="utf-8") as f:
+            return {k: tuple(v) for k, v in json.load(f).items()}
+    except (OSError, ValueError, TypeError):
+        return {}
+
+def _sidecar_load(path, sheet):
+    if not USE_SIDECAR:
+        return None
+    stamp = _file_stamp(path)
+    if stamp is None or _sidecar_manifest(path).get(sheet) != stamp:
+        return None
+    try:
+        with open(_sidecar_file(path, sheet), encoding="utf-8") as f:
+            rec = json.load(f)
+        df = pd.DataFrame(rec["frame"]["data"], columns=rec["frame"]["columns"])
+        for col, dtype in rec["dtypes"].items():
+            if dtype.startswith("datetime64"):
+                df[col] = pd.to_datetime(df[col], errors="coerce")
+            elif dtype in ("float64", "int64", "bool"):
+                df[col] = df[col].astype(dtype)
+        return df
+    except (OSError, ValueError, KeyError, TypeError):
+        return None  # missing, torn or from an older version: parse the .xlsx
+
+def _sidecar_store(path, frames, old_stamp=None):
+    # `frames` match the workbook as it is now. Sidecars that matched
+    # old_stamp stay valid: our own write left those sheets alone.
+    if not USE_SIDECAR:
+        return
+    try:
+        stamp = _file_stamp(path)
+        manifest = {s: (stamp if old_stamp is not None and st == old_stamp else st)
+                    for s, st in _sidecar_manifest(path).items()}
+        d = sidecar_dir_for(path)
+        os.makedirs(d, exist_ok=True)
+        for sheet, df in frames.items():
+            dtypes = {str(c): str(t) for c, t in df.dtypes.items()}
+            with open(_sidecar_file(path, sheet), "w", encoding="utf-8") as f:
+                f.write('{"dtypes": %s, "frame": %s}' % (
+                    json.dumps(dtypes), df.to_json(orient="split", index=False, date_format="iso")))
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(d, f"{sheet}.pkl"))  # written by older versions
+            manifest[sheet] = stamp
+        tmp = os.path.join(d, "manifest.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, os.path.join(d, "manifest.json"))
+    except (OSError, ValueError, TypeError, OverflowError):
+        pass  # only an accelerator; the workbook stays the record
+
+def _load_sheet_from_disk(path, sheet):
+    df = _sidecar_load(path, sheet)
+    if df is None:
+        df = pd.read_excel(path, sheet_name=sheet)
+        _sidecar_store(path, {sheet: df})
+    return df
+
+# ---------- Write-behind journal ----------
+# One JSON record per line: a "base" header with the workbook stamp the journal
+# started from, then "append"/"replace" records per sheet. A multi-sheet commit
+# is a single "batch" line, so a torn write drops all of it or none. The
+# workbook on disk plus the journal is the current state; flush_journal()
+# folds it back in, noting the stamps before and after the rewrite in
+# "flush"/"flushed" records so recover_journal() can tell whether it landed.
+WRITE_LISTENERS = []  # called with the workbook path after every journaled write
+
+_DATE_COLUMNS = ("Date", "DueDate", "AsOf")
+
+def journal_path_for(path):
+    return os.path.splitext(path)[0] + ".journal"
+
+def _journal_write(path, ops):
+    jp = journal_path_for(path)
+    new = not os.path.exists(jp)
+    records = [
+        {"op": op, "sheet": sheet,
+         "frame": json.loads(df.to_json(orient="split", index=False, date_format="iso"))}
+        for op, sheet, df in ops
+    ]
+    rec = records[0] if len(records) == 1 else {"op": "batch", "ops": records}
+    with open(jp, "a", encoding="utf-8") as f:
+        if new:
+            f.write(json.dumps({"op": "base", "stamp": _file_stamp(path)}) + "\n")
+        f.write(json.dumps(rec) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    for fn in list(WRITE_LISTENERS):
+        fn(path)
+
+def _read_journal(jp):
+    records = []
+    with open(jp, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                break  # torn last line from a crash mid-write
+            records.extend(rec["ops"] if rec.get("op") == "batch" else [rec])
+    return records
+
+def _journal_frame(frame):
+    df = pd.DataFrame(frame["data"], columns=frame["columns"])
+    for col in _DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    return df
+
+def _replay_journal(df, sheet, records):
+    for r in records:
+        if r.get("sheet") != sheet:
+            continue
+        rows = _journal_frame(r["frame"])
+        if r["op"] == "append":
+            df = pd.concat([df, rows], ignore_index=True)
+        elif r["op"] == "replace":
+            df = rows
+    return df
+
+def _write_sheets_atomic(path, frames, before_replace=None):
+    with perf_span("write_workbook", ", ".join(frames)) as span:
+        _write_sheets(path, frames, before_replace)
+        span["rows"], span["bytes"] = sum(len(df) for df in frames.values()), os.path.getsize(path)
+
+def _write_sheets(path, frames, before_replace=None):
+    # before_replace(stamp) gets the new file's stamp, which the rename keeps
+    old_stamp = _file_stamp(path)
+    tmp = os.path.splitext(path)[0] + ".tmp.xlsx"
+    shutil.copy2(path, tmp)
+    with pd.ExcelWriter(tmp, engine="openpyxl", mode="a", if_sheet_exists="replace") as xw:
+        for sheet, df in frames.items():
+            df.to_excel(xw, sheet_name=sheet, index=False)
+    with open(tmp, "rb+") as f:
+        os.fsync(f.fileno())
+    if before_replace is not None:
+        before_replace(_file_stamp(tmp))
+    os.replace(tmp, path)
+    _sidecar_store(path, frames, old_stamp)
+
+def journal_pending(path=None):
+    path = path or EXCEL_PATH
+    return bool(path) and os.path.exists(journal_path_for(path))
+
+def flush_journal(path=None):
+    path = path or EXCEL_PATH
+    if not journal_pending(path) or not os.path.exists(path):
+        return False
+    jp = journal_path_for(path)
+    records = _read_journal(jp)
+    sheets = []
+    for r in records:
+        if r.get("op") in ("append", "replace") and r["sheet"] not in sheets:
+            sheets.append(r["sheet"])
+    entry = _cache_entry(path)
+    frames = {}
+    for sheet in sheets:
+        df = entry["sheets"].get(sheet)
+        if df is None:
+            try:
+                df = _load_sheet_from_disk(path, sheet)
+            except ValueError:
+                df = pd.DataFrame()
+            df = _replay_journal(df, sheet, records)
+        frames[sheet] = df
+    # park the journal while the workbook is rewritten, with the stamps the
+    # workbook has before and will have after the rewrite; anything else
+    # (reports, an Excel save) may have changed the file since "base"
+    flushing = jp + ".flushing"
+    _journal_mark(jp, {"op": "flush", "stamp": _file_stamp(path)})
+    os.replace(jp, flushing)
+    try:
+        _write_sheets_atomic(path, frames,
+                             lambda stamp: _journal_mark(flushing, {"op": "flushed", "stamp": stamp}))
+    except Exception:
+        os.replace(flushing, jp)
+        raise
+    os.remove(flushing)
+    entry["stamp"] = _file_stamp(path)
+    entry["sheets"].update(frames)
+    return True
+
+def _journal_mark(jp, rec):
+    with open(jp, "a", encoding="utf-8") as f:
+        f.write(json.dumps(rec) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def recover_journal(path):
+    jp = journal_path_for(path)
+    flushing = jp + ".flushing"
+    if os.path.exists(flushing):
+        landed = [r["stamp"] for r in _read_journal(flushing) if r.get("op") == "flushed"]
+        if landed and tuple(landed[-1]) == _file_stamp(path):
+            os.remove(flushing)  # the rewrite is on disk
+        else:
+            # not rewritten, or we cannot tell: replay it. Edits journaled
+            # since (a new journal started after the park) go after it.
+            if os.path.exists(jp):
+                with open(flushing, "a", encoding="utf-8") as out, open(jp, encoding="utf-8") as f:
+                    lines = f.readlines()
+                    out.writelines(lines[1:] if lines and lines[0].startswith('{"op": "base"') else lines)
+                    out.flush()
+                    os.fsync(out.fileno())
+            os.replace(flushing, jp)
+    return flush_journal(path)
+
+# ---------- SQLite ledger ----------
+# Optional backend (STORAGE_BACKEND = "sqlite"): every sheet except Reports
+# lives in <name>.sqlite next to the workbook. The database is seeded from the
+# .xlsx on first use, commits are single SQLite transactions, and
+# export_ledger_db() regenerates the workbook. If the .xlsx was edited
+# outside the app and the database has nothing unexported, it is re-imported.
+_DB_CONNS = {}  # workbook path -> sqlite3.Connection
+_DB_SHEETS = ["Settings","ChartOfAccounts","Customers","Vendors","Employees","Transactions","Invoices","Payslips"]
+_DB_INDEXES = {
+    "Transactions": ["Date", "Category"],
+    "Invoices": ["InvoiceID"],
+    "Payslips": ["EmployeeName"],
+    "Employees": ["EmployeeName"],
+}
+
+def ledger_db_path_for(path):
+    return os.path.splitext(path)[0] + ".sqlite"
+
+def _db_meta(con, key, value=None):
+    if value is None:
+        row = con.execute("SELECT value FROM _meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    con.execute("INSERT OR REPLACE INTO _meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+def _db_tables(con):
+    return {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+def _db_values(df):
+    out = df.copy()
+    for c in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[c]):
+            out[c] = out[c].dt.strftime("%Y-%m-%d %H:%M:%S")
+    out = out.astype(object).where(out.notna(), None)
+    stamp = lambda v: v.isoformat(sep=" ") if isinstance(v, datetime) else v
+    return [tuple(stamp(v) for v in r) for r in out.itertuples(index=False, name=None)]
+
+def _db_create(con, sheet, df):
+    def decl(dtype):
+        if pd.api.types.is_float_dtype(dtype): return "REAL"
+        if pd.api.types.is_integer_dtype(dtype): return "INTEGER"
+        if pd.api.types.is_datetime64_any_dtype(dtype): return "TEXT"
+        return ""  # no affinity: mixed Settings values keep their own type
+    cols = ", ".join(f'"{c}" {decl(t)}'.rstrip() for c, t in df.dtypes.items())
+    con.execute(f'DROP TABLE IF EXISTS "{sheet}"')
+    con.execute(f'CREATE TABLE "{sheet}" ({cols})')
+    for c in _DB_INDEXES.get(sheet, []):
+        if c in df.columns:
+            con.execute(f'CREATE INDEX "ix_{sheet}_{c}" ON "{sheet}" ("{c}")')
+
+def _db_insert(con, sheet, df):
+    if df.empty:
+        return
+    cols = ", ".join(f'"{c}"' for c in df.columns)
+    marks = ", ".join("?" for _ in df.columns)
+    con.executemany(f'INSERT INTO "{sheet}" ({cols}) VALUES ({marks})', _db_values(df))
+
+def _db_columns(con, sheet):
+    return [r[1] for r in con.execute(f'PRAGMA table_info("{sheet}")')]
+
+def _db_import_workbook(con, path):
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        for sheet in _DB_SHEETS:
+            try:
+                df = _load_sheet_from_disk(path, sheet)
+            except ValueError:
+                df = pd.DataFrame(columns=get_default_columns_for_sheet(sheet))
+            _db_create(con, sheet, df)
+            _db_insert(con, sheet, df)
+        _db_meta(con, "xlsx_stamp", _file_stamp(path))
+        _db_meta(con, "dirty", False)
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+
+def _ledger_db(path):
+    con = _DB_CONNS.get(path)
+    if con is None:
+        con = sqlite3.connect(ledger_db_path_for(path), isolation_level=None, check_same_thread=False)
+        con.execute("CREATE TABLE IF NOT EXISTS _meta (key TEXT PRIMARY KEY, value TEXT)")
+        _DB_CONNS[path] = con
+    stamp = _db_meta(con, "xlsx_stamp")
+    if stamp is None or (tuple(json.loads(stamp) or ()) != _file_stamp(path)
+                         and not json.loads(_db_meta(con, "dirty") or "false")):
+        flush_journal(path)  # coming from the Excel backend with edits pending
+        _db_import_workbook(con, path)
+        invalidate_cache(path)
+    return con
+
+def _db_read(path, sheet):
+    con = _ledger_db(path)
+    if sheet not in _db_tables(con):
+        return None
+    df = pd.read_sql_query(f'SELECT * FROM "{sheet}" ORDER BY rowid', con)
+    for col in _DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    return df
+
+def _db_commit(path, ops, frames):
+    con = _ledger_db(path)
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        tables = _db_tables(con)
+        for op, sheet, df in ops:
+            if op == "append" and sheet in tables and set(df.columns) <= set(_db_columns(con, sheet)):
+                _db_insert(con, sheet, df)
+            else:
+                # a replace, or rows that bring new columns: rewrite the table
+                # from the staged frame (which already holds every op so far)
+                _db_create(con, sheet, frames[sheet])
+                _db_insert(con, sheet, frames[sheet])
+                tables.add(sheet)
+        _db_meta(con, "dirty", True)
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+
+def db_aggregates(path=None):
+    con = _ledger_db(path or EXCEL_PATH)
+    if "Transactions" not in _db_tables(con):
+        return None
+    df = pd.read_sql_query(
+        "SELECT COALESCE(substr(Date, 1, 7), 'NaT') AS YearMonth, COALESCE(Type, '') AS Type, "
+        "COALESCE(Category, '') AS Category, SUM(COALESCE(Amount, 0)) AS Amount, COUNT(*) AS Count "
+        "FROM Transactions GROUP BY 1, 2, 3", con)
+    df["Amount"] = df["Amount"].astype(float)
+    df["Count"] = df["Count"].astype("int64")
+    return df.set_index(AGG_KEYS)
+
+def export_ledger_db(path=None):
+    path = path or EXCEL_PATH
+    if not path or not os.path.exists(ledger_db_path_for(path)):
+        return False
+    con = _ledger_db(path)
+    if not json.loads(_db_meta(con, "dirty") or "false"):
+        return False
+    frames = {sheet: _db_read(path, sheet) for sheet in _DB_SHEETS if sheet in _db_tables(con)}
+    entry = _cache_entry(path)
+    _write_sheets_atomic(path, frames)
+    entry["stamp"] = _file_stamp(path)
+    con.execute("BEGIN IMMEDIATE")
+    _db_meta(con, "xlsx_stamp", entry["stamp"])
+    _db_meta(con, "dirty", False)
+    con.execute("COMMIT")
+    return True
+
+def sync_workbook(path=None):
+    # bring the .xlsx up to date with whatever the active backend holds
+    if STORAGE_BACKEND == "sqlite":
+        return export_ledger_db(path)
+    return flush_journal(path)
+
+def _flush_at_exit():
+    try:
+        with STORAGE_LOCK:  # let a running I/O job finish first
+            sync_workbook()
+    except Exception:
+        pass
+
+atexit.register(_flush_at_exit)
+
+def get_company_name():
+    try:
+        s = read_sheet("Settings")
+        row = s.loc[s["Key"]=="CompanyName"]
+        if not row.empty:
+            return str(row.iloc[0]["Value"])
+        return "My Company"
+    except Exception:
+        return "My Company"
+
+def set_company_name(new_name):
+    s = read_sheet("Settings")
+    if (s["Key"]=="CompanyName").any():
+        s.loc[s["Key"]=="CompanyName", "Value"] = new_name
+    else:
+        s = pd.concat([s, pd.DataFrame([{"Key":"CompanyName","Value":new_name}])], ignore_index=True)
+    write_sheet(s, "Settings")
+
+def get_categories_df():
+    try:
+        return read_sheet("ChartOfAccounts")
+    except Exception:
+        create_workbook(EXCEL_PATH, get_company_name())
+        return read_sheet("ChartOfAccounts")
+
+def get_categories(kind=None):
+    df = get_categories_df()
+    if kind in ("income","expense"):
+        return sorted(df[df["Type"]==kind]["Category"].astype(str).tolist())
+    return sorted(df["Category"].astype(str).tolist())
+
+def add_category(name, ctype):
+    df = get_categories_df()
+    if ((df["Category"] == name) & (df["Type"] == ctype)).any():
+        return
+    df = pd.concat([df, pd.DataFrame([{"Category":name, "Type":ctype}])], ignore_index=True)
+    write_sheet(df, "ChartOfAccounts")
+
+def remove_category(name):
+    df = get_categories_df()
+    df = df[df["Category"] != name]
+    write_sheet(df, "ChartOfAccounts")
+
+def next_id(df, col, prefix):
+    if df.empty:
+        return f"{prefix}0001"
+    s = (
+        df[col].dropna().astype(str)
+        .str.replace(prefix,"", regex=False)
+        .str.extract(r"(\d+)")
+        .dropna()
+    )
+    if s.empty:
+        return f"{prefix}0001"
+    n = int(s.max()[0]) + 1
+    return f"{prefix}{n:04d}"
+
+# ID sequences: the next number per prefix lives in the Settings sheet (and so
+# carries over to new months). next_id() scans the document sheet only when
+# the counter is missing.
+ID_SEQUENCES = {
+    "INV": ("Invoices", "InvoiceID", "NextInvoiceNo"),
+    "PAY": ("Payslips", "PayslipID", "NextPayslipNo"),
+}
+
+def reserve_ids(uow, prefix, count=1):
+    sheet, col, key = ID_SEQUENCES[prefix]
+    settings = uow.read("Settings")
+    hit = settings["Key"] == key
+    start = pd.to_numeric(settings.loc[hit, "Value"], errors="coerce").dropna()
+    if start.empty:
+        start = int(next_id(uow.read(sheet), col, prefix)[len(prefix):])
+        settings = settings[~hit]
+        settings = pd.concat([settings, pd.DataFrame([{"Key": key, "Value": start}])], ignore_index=True)
+        hit = settings["Key"] == key
+    else:
+        start = int(start.iloc[0])
+    settings["Value"] = settings["Value"].astype(object)
+    settings.loc[hit, "Value"] = start + count
+    uow.write(settings, "Settings")
+    return [f"{prefix}{n:04d}" for n in range(start, start + count)]
+
+def add_customer(name, email="", phone="", billing="", notes=""):
+    new = pd.DataFrame([{"CustomerName":name,"Email":email,"Phone":phone,"BillingAddress":billing,"Notes":notes}])
+    append_rows(new, "Customers")
+
+def get_customers():
+    try:
+        return read_sheet("Customers")["CustomerName"].dropna().astype(str).tolist()
+    except Exception:
+        return []
+
+def add_employee(name, etype="hourly", hourly_rate=0.0, salary=0.0, taxrate=0.1, notes=""):
+    new = pd.DataFrame([{"EmployeeName":name,"Type":etype,"HourlyRate":hourly_rate,"Salary":salary,"TaxRate":taxrate,"Notes":notes}])
+    append_rows(new, "Employees")
+
+def get_employees():
+    try:
+        return read_sheet("Employees")["EmployeeName"].dropna().astype(str).tolist()
+    except Exception:
+        return []
+
+def _transaction_rows(date, ttype, category, amount, description="", party="", paymethod="", reference="", linked=""):
+    return pd.DataFrame([{
+        "Date": pd.to_datetime(date),
+        "Type": ttype,
+        "Category": category,
+        "Description": description,
+        "CustomerOrVendor": party,
+        "Amount": float(amount),
+        "PaymentMethod": paymethod,
+        "Reference": reference,
+        "LinkedDoc": linked
+    }])
+
+def add_transaction(date, ttype, category, amount, description="", party="", paymethod="", reference="", linked=""):
+    append_rows(_transaction_rows(date, ttype, category, amount, description, party, paymethod, reference, linked),
+                "Transactions")
+
+# ---------- Bank CSV import ----------
+BANK_CSV_CHUNK_ROWS = 5000
+
+def normalize_bank_rows(incoming, mapping, default_type="expense", default_category=""):
+    """Bank CSV rows -> Transactions rows. mapping: {Date, Amount, Description,
+    Type, Category, Party, Method} -> CSV column ('' or None when unmapped)."""
+    def getcol(k):
+        sel = mapping.get(k)
+        return incoming[sel] if sel in incoming.columns else pd.Series([None]*len(incoming), index=incoming.index)
+    def text(k):
+        # blank cells stay blank rather than becoming the string "nan"
+        return getcol(k).fillna("").astype(str)
+    nd = pd.DataFrame({
+        "Date": pd.to_datetime(getcol("Date"), errors="coerce"),
+        "Amount": pd.to_numeric(getcol("Amount"), errors="coerce"),
+        "Description": text("Description"),
+        "Type": (getcol("Type").astype(str).str.lower().str.strip()
+                 if mapping.get("Type") else pd.Series([None]*len(incoming), index=incoming.index)),
+        "Category": getcol("Category").astype(str) if mapping.get("Category") else None,
+        "CustomerOrVendor": text("Party"),
+        "PaymentMethod": text("Method"),
+    }, index=incoming.index)
+    # Fill Type if missing: sign-based heuristic
+    nd["Type"] = nd["Type"].where(nd["Type"].isin(["income","expense"]))
+    nd.loc[nd["Type"].isna() & (nd["Amount"] < 0), "Type"] = "expense"
+    nd.loc[nd["Type"].isna() & (nd["Amount"] > 0), "Type"] = "income"
+    nd["Type"] = nd["Type"].fillna(default_type)
+    # Normalize Amount to positive numbers
+    nd["Amount"] = nd["Amount"].abs()
+    # Category default
+    nd["Category"] = nd["Category"].where(nd["Category"].notna() & (nd["Category"].astype(str)!="nan"), default_category)
+    # Required columns for sheet
+    nd["Reference"] = ""
+    nd["LinkedDoc"] = ""
+    # Drop unusable rows
+    return nd.dropna(subset=["Date","Amount"]).reset_index(drop=True)
+
+# CSV header candidates for each mapping field, checked in order (lowercase)
+BANK_CSV_GUESSES = {
+    "Date": ("date","posted","post date","transaction date"),
+    "Amount": ("amount","amt","debit/credit","value"),
+    "Description": ("description","memo","details","narrative"),
+    "Type": ("type","dr/cr","credit/debit","direction"),
+    "Category": ("category",),
+    "Party": ("name","payee","party","merchant","customer"),
+    "Method": ("method","payment method","channel","card"),
+}
+
+def guess_bank_mapping(columns):
+    # {field: CSV column or None} from the header names alone
+    cols = [str(c) for c in columns]
+    low = [c.lower() for c in cols]
+    return {key: next((cols[low.index(c)] for c in cands if c in low), None)
+            for key, cands in BANK_CSV_GUESSES.items()}
+
+def iter_bank_csv(path, mapping, default_type="expense", default_category="", chunksize=None):
+    # yields (normalized chunk, fraction of the file read) without loading it all
+    size = os.path.getsize(path) or 1
+    with open(path, "rb") as f:
+        pos, t0 = 0, time.perf_counter()
+        for chunk in pd.read_csv(f, chunksize=chunksize or BANK_CSV_CHUNK_ROWS):
+            nd = normalize_bank_rows(chunk, mapping, default_type, default_category)
+            read, pos = f.tell() - pos, f.tell()
+            record_timing("import_parse", (time.perf_counter() - t0) * 1000, len(nd), read, os.path.basename(path))
+            yield nd, min(pos / size, 1.0)
+            t0 = time.perf_counter()
+
+def import_bank_csv(path, mapping, default_type="expense", default_category="", progress=None, skip_duplicates=True):
+    # one commit per chunk; returns (rows added, duplicate rows skipped)
+    n, skipped = 0, []
+    seen = known_fingerprints() if skip_duplicates else None
+    for nd, frac in iter_bank_csv(path, mapping, default_type, default_category):
+        if seen is not None:
+            nd, dup = split_duplicates(nd, seen)
+            skipped.append(dup)
+        if not nd.empty:
+            append_rows(nd, "Transactions")
+        n += len(nd)
+        if progress:
+            progress(frac, n)
+    return n, (pd.concat(skipped, ignore_index=True) if skipped else pd.DataFrame())
+
+# ---------- Import dedupe index ----------
+# Every Transactions row has a 64-bit fingerprint of (date, amount in cents,
+# normalized description, normalized party). Each workbook keeps its rows'
+# fingerprints in <name>.fingerprints (raw uint64, appended on every commit),
+# so an import can be checked against all months without rescanning them.
+# The file is trusted only while it has one entry per Transactions row.
+def fingerprint_path_for(path):
+    return os.path.splitext(path)[0] + ".fingerprints"
+
+def _norm_text(s):
+    s = s.fillna("").astype(str).str.lower().str.replace(r"\s+", " ", regex=True).str.strip()
+    return s.mask(s.isin(["nan", "none"]), "")
+
+def tx_fingerprints(tx):
+    if tx.empty:
+        return np.empty(0, dtype="<u8")
+    key = pd.DataFrame({
+        "Date": pd.to_datetime(tx["Date"], errors="coerce").dt.strftime("%Y-%m-%d").fillna(""),
+        "Cents": (pd.to_numeric(tx["Amount"], errors="coerce").fillna(0.0) * 100).round().astype("int64"),
+        "Description": _norm_text(tx["Description"]),
+        "Party": _norm_text(tx["CustomerOrVendor"]),
+    })
+    return pd.util.hash_pandas_object(key, index=False).to_numpy().astype("<u8")
+
+def _fingerprints_load(path, rows):
+    try:
+        fps = np.fromfile(fingerprint_path_for(path), dtype="<u8")
+    except (OSError, ValueError):
+        return None
+    return Counter(fps.tolist()) if len(fps) == rows else None
+
+def _fingerprints_store(path, fps, mode="wb"):
+    try:
+        with open(fingerprint_path_for(path), mode) as f:
+            f.write(np.asarray(fps, dtype="<u8").tobytes())
+    except OSError:
+        pass  # only an index; rebuilt from the sheet when it does not match
+
+def _fingerprints_committed(path, entry, op, df):
+    if op == "append":
+        fps = tx_fingerprints(df)
+        if entry.get("fingerprints") is not None:
+            entry["fingerprints"].update(fps.tolist())
+        if os.path.exists(fingerprint_path_for(path)):
+            _fingerprints_store(path, fps, "ab")
+    else:
+        entry["fingerprints"] = None
+        try:
+            os.remove(fingerprint_path_for(path))
+        except OSError:
+            pass
+
+def ledger_fingerprints():
+    # fingerprints of the current workbook's Transactions (journal included)
+    entry = _cache_entry(EXCEL_PATH)
+    if entry.get("fingerprints") is None:
+        tx = read_sheet("Transactions")
+        fps = _fingerprints_load(EXCEL_PATH, len(tx))
+        if fps is None:
+            arr = tx_fingerprints(tx)
+            _fingerprints_store(EXCEL_PATH, arr)
+            fps = Counter(arr.tolist())
+        entry["fingerprints"] = fps
+    return entry["fingerprints"]
+
+_FP_MONTHS = {}  # month key -> (workbook stamp, Counter)
+
+def _month_fingerprints(key):
+    path = os.path.join(DATA_ROOT, key, EXCEL_FILENAME)
+    stamp = _file_stamp(path)
+    cached = _FP_MONTHS.get(key)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    fps = _fingerprints_load(path, int(month_summary(key)["Count"].sum()))
+    if fps is None:
+        arr = tx_fingerprints(_load_sheet_from_disk(path, "Transactions"))
+        _fingerprints_store(path, arr)
+        fps = Counter(arr.tolist())
+    _FP_MONTHS[key] = (stamp, fps)
+    return fps
+
+def known_fingerprints():
+    """Counts of every fingerprint in the ledger, all months. The result is a
+    fresh Counter the caller may consume."""
+    cur = _path_month_key(EXCEL_PATH)
+    seen = Counter(ledger_fingerprints())
+    for k in month_keys():
+        if k != cur:
+            seen.update(_month_fingerprints(k))
+    return seen
+
+def split_duplicates(nd, seen):
+    """Split rows into (new, duplicate). A row is a duplicate while the ledger
+    still has an unmatched row with the same fingerprint, so two identical
+    purchases on one day are only skipped if the ledger already has both.
+    Matched fingerprints are consumed from `seen`."""
+    if nd.empty:
+        return nd, nd.iloc[0:0]
+    with perf_span("import_dedupe") as span:
+        fp = pd.Series(tx_fingerprints(nd), index=nd.index)
+        avail = fp.map(lambda h: seen.get(h, 0))
+        dup = fp.groupby(fp).cumcount() < avail
+        seen.subtract(fp[dup].tolist())
+        span["rows"], span["detail"] = len(nd), f"{int(dup.sum())} duplicates"
+    return nd[~dup], nd[dup]
+
+def create_invoice(date, due_date, customer, item, qty, rate, notes=""):
+    uow = SheetTransaction()
+    inv_id = reserve_ids(uow, "INV")[0]
+    amount = float(qty) * float(rate)
+
+    new_inv = pd.DataFrame([{
+        "InvoiceID":inv_id,"Date":pd.to_datetime(date),"DueDate":pd.to_datetime(due_date),
+        "CustomerName":customer,"Item":item,"Qty":float(qty),"Rate":float(rate),
+        "Amount":amount,"Status":"Unpaid","Notes":notes
+    }])
+    uow.append(new_inv, "Invoices")
+    uow.append(_transaction_rows(date, "income", "Sales", amount, f"Invoice {inv_id}: {item} x{qty}", customer, "Invoice", inv_id, inv_id),
+              "Transactions")
+    uow.commit()
+    return inv_id, amount
+
+def read_invoices_csv(path):
+    df = pd.read_csv(path)
+    low = {str(c).strip().lower(): c for c in df.columns}
+    def pick(*cands):
+        return next((low[c] for c in cands if c in low), None)
+    cols = {
+        "CustomerName": pick("customername","customer","client"),
+        "Item": pick("item","product","description"),
+        "Qty": pick("qty","quantity"),
+        "Rate": pick("rate","price","unit price"),
+        "Date": pick("date","invoice date"),
+        "DueDate": pick("duedate","due date","due"),
+        "Notes": pick("notes","memo"),
+    }
+    missing = [k for k in ("CustomerName","Item","Qty","Rate") if cols[k] is None]
+    if missing:
+        raise ValueError("Invoices CSV is missing columns: " + ", ".join(missing))
+    return pd.DataFrame({k: (df[c] if c is not None else None) for k, c in cols.items()})
+
+def create_invoices_batch(lines, uow=None):
+    """Create one invoice per row of `lines` in a single commit.
+
+    `lines` has CustomerName, Item, Qty, Rate and optionally Date (default
+    today), DueDate (default Date + 14 days) and Notes. Returns the new
+    Invoices rows. Given a SheetTransaction, only stages them in it and
+    leaves the commit to the caller.
+    """
+    lines = lines.reset_index(drop=True)
+    qty = pd.to_numeric(lines["Qty"], errors="coerce")
+    rate = pd.to_numeric(lines["Rate"], errors="coerce")
+    bad = qty.isna() | rate.isna() | lines["CustomerName"].isna()
+    if bad.any():
+        raise ValueError(f"Invalid Qty/Rate/Customer on CSV row(s): {', '.join(str(i + 2) for i in lines.index[bad][:10])}")
+    blank = pd.Series(None, index=lines.index, dtype=object)
+    date = pd.to_datetime(lines.get("Date", blank), errors="coerce").fillna(pd.Timestamp.today().normalize())
+    due = pd.to_datetime(lines.get("DueDate", blank), errors="coerce").fillna(date + pd.Timedelta(days=14))
+    notes = lines.get("Notes", blank).fillna("").astype(str)
+    customer = lines["CustomerName"].astype(str)
+    item = lines["Item"].fillna("").astype(str)
+    amount = qty * rate
+
+    own = uow is None
+    uow = SheetTransaction() if own else uow
+    ids = reserve_ids(uow, "INV", len(lines))
+    new_inv = pd.DataFrame({
+        "InvoiceID": ids, "Date": date, "DueDate": due, "CustomerName": customer, "Item": item,
+        "Qty": qty.astype(float), "Rate": rate.astype(float), "Amount": amount.astype(float),
+        "Status": "Unpaid", "Notes": notes,
+    })
+    new_tx = pd.DataFrame({
+        "Date": date, "Type": "income", "Category": "Sales",
+        "Description": "Invoice " + new_inv["InvoiceID"] + ": " + item + " x" + qty.astype(float).astype(str),
+        "CustomerOrVendor": customer, "Amount": new_inv["Amount"],
+        "PaymentMethod": "Invoice", "Reference": ids, "LinkedDoc": ids,
+    })
+    uow.append(new_inv, "Invoices")
+    uow.append(new_tx, "Transactions")
+    if own:
+        uow.commit()
+    return new_inv
+
+def mark_invoice_paid(invoice_id, date, method="Bank"):
+    uow = SheetTransaction()
+    inv_df = uow.read("Invoices")
+    if not (inv_df["InvoiceID"] == invoice_id).any():
+        raise ValueError("Invoice not found")
+    inv_df.loc[inv_df["InvoiceID"] == invoice_id, "Status"] = "Paid"
+    uow.write(inv_df, "Invoices")
+    uow.append(_transaction_rows(date, "income", "Other Income", 0.0, f"Payment received for {invoice_id}", "", method, invoice_id, invoice_id),
+              "Transactions")
+    uow.commit()
+
+def run_payroll(date, employee, hours=0.0):
+    emp_df = read_sheet("Employees")
+    row = emp_df[emp_df["EmployeeName"]==employee]
+    if row.empty:
+        raise ValueError("Employee not found")
+    r = row.iloc[0]
+    etype = str(r["Type"]).strip().lower()
+    taxrate = float(r["TaxRate"] or 0.1)
+    if etype == "hourly":
+        gross = float(hours) * float(r["HourlyRate"] or 0.0)
+    else:
+        gross = float(r["Salary"] or 0.0) / 26.0
+    tax = round(gross * taxrate, 2)
+    net = round(gross - tax, 2)
+
+    uow = SheetTransaction()
+    ps_id = reserve_ids(uow, "PAY")[0]
+    new_ps = pd.DataFrame([{
+        "PayslipID":ps_id,"Date":pd.to_datetime(date),"EmployeeName":employee,"Hours":float(hours),
+        "Gross":gross,"Tax":tax,"Net":net,"Notes":""
+    }])
+    uow.append(new_ps, "Payslips")
+    uow.append(pd.concat([
+        _transaction_rows(date, "expense", "Wages", gross, f"Payroll gross {ps_id}", employee, "Bank", ps_id, ps_id),
+        _transaction_rows(date, "expense", "Taxes and Licenses", tax, f"Payroll tax {ps_id}", employee, "Bank", ps_id, ps_id),
+    ], ignore_index=True), "Transactions")
+    uow.commit()
+    return ps_id, gross, tax, net
+
+def read_hours_csv(path):
+    df = pd.read_csv(path)
+    low = {str(c).strip().lower(): c for c in df.columns}
+    name_col = next((low[c] for c in ("employeename","employee","name") if c in low), None)
+    hours_col = low.get("hours")
+    if name_col is None or hours_col is None:
+        raise ValueError("Hours CSV needs EmployeeName and Hours columns")
+    out = pd.DataFrame({
+        "EmployeeName": df[name_col].astype(str).str.strip(),
+        "Hours": pd.to_numeric(df[hours_col], errors="coerce").fillna(0.0),
+    })
+    return out.groupby("EmployeeName", sort=False)["Hours"].sum()
+
+def run_payroll_batch(date, hours=None, uow=None, salaried=True):
+    """Pay every employee in one pass and one commit.
+
+    `hours` maps EmployeeName -> hours (dict, Series, or a frame with
+    EmployeeName/Hours columns). Salaried staff are paid unless `salaried`
+    is False; hourly staff only when they have hours. Returns the new
+    Payslips rows. Given a SheetTransaction, only stages them in it.
+    """
+    if hours is None:
+        hours = pd.Series(dtype=float)
+    elif isinstance(hours, pd.DataFrame):
+        hours = hours.groupby(hours["EmployeeName"].astype(str))["Hours"].sum()
+    else:
+        hours = pd.Series(hours, dtype=float)
+
+    emp = read_sheet("Employees").dropna(subset=["EmployeeName"])
+    emp["EmployeeName"] = emp["EmployeeName"].astype(str)
+    emp = emp.drop_duplicates("EmployeeName")
+    unknown = sorted(set(hours.index.astype(str)) - set(emp["EmployeeName"]))
+    if unknown:
+        raise ValueError("Employee not found: " + ", ".join(unknown))
+
+    hourly = emp["Type"].astype(str).str.strip().str.lower() == "hourly"
+    hrs = emp["EmployeeName"].map(hours).fillna(0.0).astype(float)
+    rate = pd.to_numeric(emp["HourlyRate"], errors="coerce").fillna(0.0)
+    salary = pd.to_numeric(emp["Salary"], errors="coerce").fillna(0.0)
+    taxrate = pd.to_numeric(emp["TaxRate"], errors="coerce").fillna(0.0).replace(0.0, 0.1)
+
+    gross = (hrs * rate).where(hourly, salary / 26.0)
+    pay = hourly & (hrs > 0)
+    if salaried:
+        pay |= ~hourly
+    emp, hrs, gross, taxrate = emp[pay], hrs[pay], gross[pay], taxrate[pay]
+    if emp.empty:
+        return pd.DataFrame(columns=["PayslipID","Date","EmployeeName","Hours","Gross","Tax","Net","Notes"])
+    tax = (gross * taxrate).round(2)
+    net = (gross - tax).round(2)
+
+    own = uow is None
+    uow = SheetTransaction() if own else uow
+    ids = reserve_ids(uow, "PAY", len(emp))
+    when = pd.to_datetime(date)
+    new_ps = pd.DataFrame({
+        "PayslipID": ids, "Date": when, "EmployeeName": emp["EmployeeName"].values,
+        "Hours": hrs.values, "Gross": gross.values, "Tax": tax.values, "Net": net.values, "Notes": "",
+    })
+
+    def tx_rows(category, amounts, label):
+        return pd.DataFrame({
+            "Date": when, "Type": "expense", "Category": category,
+            "Description": [f"Payroll {label} {i}" for i in ids],
+            "CustomerOrVendor": new_ps["EmployeeName"], "Amount": amounts.astype(float).values,
+            "PaymentMethod": "Bank", "Reference": ids, "LinkedDoc": ids,
+        })
+    # interleave wages/tax rows per payslip, same order as one-by-one runs
+    new_tx = (pd.concat([tx_rows("Wages", gross, "gross"), tx_rows("Taxes and Licenses", tax, "tax")])
+              .sort_index(kind="stable").reset_index(drop=True))
+
+    uow.append(new_ps, "Payslips")
+    uow.append(new_tx, "Transactions")
+    if own:
+        uow.commit()
+    return new_ps
+
+# ---------- Transaction aggregates ----------
+# Amount/Count per (YearMonth, Type, Category), kept next to the cached sheets
+# and updated from the rows each commit appends. A replaced Transactions sheet
+# or a changed file drops it and the next reader rebuilds it from scratch.
+AGG_KEYS = ["YearMonth", "Type", "Category"]
+
+def _aggregate(tx):
+    if tx.empty:
+        idx = pd.MultiIndex.from_arrays([[], [], []], names=AGG_KEYS)
+        return pd.DataFrame({"Amount": pd.Series(dtype=float), "Count": pd.Series(dtype="int64")}, index=idx)
+    keys = pd.DataFrame({
+        "YearMonth": pd.to_datetime(tx["Date"], errors="coerce").dt.to_period("M").astype(str),
+        "Type": tx["Type"].fillna("").astype(str),
+        "Category": tx["Category"].fillna("").astype(str),
+        "Amount": pd.to_numeric(tx["Amount"], errors="coerce").fillna(0.0).astype(float),
+    })
+    return keys.groupby(AGG_KEYS).agg(Amount=("Amount", "sum"), Count=("Amount", "size"))
+
+def _merge_aggregates(agg, delta):
+    if agg.empty:
+        return delta
+    if delta.empty:
+        return agg
+    out = agg.add(delta, fill_value=0)
+    out["Count"] = out["Count"].astype("int64")
+    return out
+
+def transaction_aggregates():
+    entry = _cache_entry(EXCEL_PATH)
+    agg = entry.get("aggregates")
+    if agg is None:
+        if STORAGE_BACKEND == "sqlite":
+            agg = db_aggregates()
+        if agg is None:
+            agg = _aggregate(read_sheet("Transactions"))
+        entry["aggregates"] = agg
+    return agg.copy()
+
+def verify_aggregates(rebuild=False):
+    """Recompute aggregates from the Transactions sheet and diff them against
+    the stored ones. Returns the keys that disagree (empty when in sync)."""
+    entry = _cache_entry(EXCEL_PATH)
+    fresh = _aggregate(read_sheet("Transactions"))
+    stored = entry.get("aggregates")
+    if stored is None:
+        # nothing has been aggregated yet, so nothing can have drifted
+        stored = fresh
+    both = stored.join(fresh, how="outer", lsuffix="Stored", rsuffix="Actual").fillna(0)
+    diff = both[((both["AmountStored"] - both["AmountActual"]).abs() > 0.005)
+                | (both["CountStored"] != both["CountActual"])]
+    if rebuild:
+        entry["aggregates"] = fresh
+        _REPORT_MEMO.pop(EXCEL_PATH, None)
+    return diff
+
+def _pnl_by_month(agg):
+    if agg.empty:
+        return pd.DataFrame(columns=["Period", "Income", "Expenses", "NetProfit"])
+    by = agg["Amount"].groupby(level=["YearMonth", "Type"]).sum().unstack("Type")
+    by = by.reindex(columns=["income", "expense"]).dropna(how="all").fillna(0.0)
+    pnl = by.rename(columns={"income": "Income", "expense": "Expenses"})
+    pnl["NetProfit"] = pnl["Income"] - pnl["Expenses"]
+    pnl = pnl.reset_index().rename(columns={"YearMonth": "Period"})
+    pnl.columns.name = None
+    return pnl
+
+def _type_totals(agg):
+    t = agg["Amount"].groupby(level="Type").sum()
+    return float(t.get("income", 0.0)), float(t.get("expense", 0.0))
+
+def _category_totals(agg):
+    if agg.empty:
+        return pd.DataFrame(columns=["Type", "Category", "Amount"])
+    cat = agg["Amount"].groupby(level=["Type", "Category"]).sum().reset_index()
+    cat = cat[(cat["Type"] != "") & (cat["Category"] != "")]
+    return cat.sort_values(["Type", "Amount"], ascending=[True, False]).reset_index(drop=True)
+
+# ---------- Month history ----------
+# Each closed month keeps month_summary.json in its folder: the transaction
+# aggregates plus the workbook stamp they were taken from. Multi-month views
+# (YTD, trailing 12 months, year over year) add these up instead of opening
+# older workbooks. A summary whose workbook changed since, or a month that was
+# never closed, is rebuilt once from the sidecar/.xlsx.
+SUMMARY_FILENAME = "month_summary.json"
+_SUMMARY_CACHE = {}  # month key -> (workbook stamp, aggregates)
+
+def month_keys():
+    if not os.path.isdir(DATA_ROOT):
+        return []
+    return sorted(k for k in os.listdir(DATA_ROOT)
+                  if len(k) == 7 and k[4] == "-" and os.path.exists(os.path.join(DATA_ROOT, k, EXCEL_FILENAME)))
+
+def _path_month_key(path):
+    k = os.path.basename(os.path.dirname(path))
+    return k if len(k) == 7 and k[4] == "-" else month_key()
+
+def write_month_summary(key, agg=None):
+    path = os.path.join(DATA_ROOT, key, EXCEL_FILENAME)
+    if agg is None:
+        agg = _aggregate(_load_sheet_from_disk(path, "Transactions"))
+    stamp = _file_stamp(path)
+    data = {
+        "month": key,
+        "workbook_stamp": stamp,
+        "rows": [[ym, t, c, float(a), int(n)] for (ym, t, c), a, n in agg[["Amount", "Count"]].itertuples(name=None)],
+    }
+    out = os.path.join(DATA_ROOT, key, SUMMARY_FILENAME)
+    with open(out + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(out + ".tmp", out)
+    _SUMMARY_CACHE[key] = (stamp, agg)
+    return agg
+
+def month_summary(key):
+    path = os.path.join(DATA_ROOT, key, EXCEL_FILENAME)
+    stamp = _file_stamp(path)
+    cached = _SUMMARY_CACHE.get(key)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    try:
+        with open(os.path.join(DATA_ROOT, key, SUMMARY_FILENAME), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = None
+    if not data or tuple(data.get("workbook_stamp") or ()) != stamp:
+        return write_month_summary(key)
+    rows = pd.DataFrame(data["rows"], columns=AGG_KEYS + ["Amount", "Count"])
+    agg = rows.set_index(AGG_KEYS) if not rows.empty else _aggregate(pd.DataFrame())
+    _SUMMARY_CACHE[key] = (stamp, agg)
+    return agg
+
+def _history_stamp():
+    cur = _path_month_key(EXCEL_PATH)
+    return tuple((k, _file_stamp(os.path.join(DATA_ROOT, k, EXCEL_FILENAME))) for k in month_keys() if k < cur)
+
+def history_aggregates(prior=None):
+    # earlier months from their summaries plus the live current workbook;
+    # prior={key: aggregates} supplies the earlier months instead
+    cur = _path_month_key(EXCEL_PATH)
+    if prior is None:
+        parts = [month_summary(k) for k in month_keys() if k < cur]
+    else:
+        parts = [a for k, a in prior.items() if k < cur]
+    parts = [p for p in parts + [transaction_aggregates()] if not p.empty]
+    if not parts:
+        return _aggregate(pd.DataFrame())
+    out = pd.concat(parts).groupby(level=AGG_KEYS).sum()
+    out["Count"] = out["Count"].astype("int64")
+    return out
+
+def _window_totals(hist, lo, hi, label):
+    ym = hist.index.get_level_values("YearMonth")
+    inc, exp = _type_totals(hist[(ym >= lo) & (ym <= hi)])
+    return pd.DataFrame([
+        {"Metric":f"{label} Income","Amount":inc},
+        {"Metric":f"{label} Expenses","Amount":exp},
+        {"Metric":f"{label} Net","Amount":inc - exp}
+    ])
+
+def _year_over_year(hist, cur):
+    pnl = _pnl_by_month(hist).set_index("Period")
+    end = pd.Period(cur, "M")
+    periods = [str(end - i) for i in range(11, -1, -1)]
+    prior = [str(end - i - 12) for i in range(11, -1, -1)]
+    out = pd.DataFrame({
+        "Period": periods,
+        "Income": pnl["Income"].reindex(periods).values,
+        "Expenses": pnl["Expenses"].reindex(periods).values,
+        "NetProfit": pnl["NetProfit"].reindex(periods).values,
+        "PriorYearNet": pnl["NetProfit"].reindex(prior).values,
+    })
+    out = out[out[["NetProfit", "PriorYearNet"]].notna().any(axis=1)].fillna(0.0)
+    out["Change"] = out["NetProfit"] - out["PriorYearNet"]
+    return out.reset_index(drop=True)
+
+# ---------- Reports ----------
+# One computation shared by build_reports(), the dashboard, the Reports preview
+# and the CSV export, memoized on the Transactions version and the stamps of
+# the earlier months' workbooks. P&L by month and category totals cover this
+# workbook; YTD, trailing 12 months and year over year come from the history.
+ReportSet = namedtuple("ReportSet", ["pnl", "ytd", "category_totals", "trailing12", "yoy"])
+_REPORT_MEMO = {}  # path -> (version, ReportSet)
+
+def reset_caches():
+    # forget parsed sheets, month summaries and reports, e.g. after other
+    # processes rewrote the workbooks
+    invalidate_cache()
+    _SUMMARY_CACHE.clear()
+    _REPORT_MEMO.clear()
+
+def compute_reports(prior=None):
+    # the frames are shared between callers; copy before changing them
+    version = (sheet_version("Transactions"), _history_stamp())
+    memo = _REPORT_MEMO.get(EXCEL_PATH)
+    if prior is None and memo and memo[0] == version:
+        return memo[1]
+    agg = transaction_aggregates()
+    hist = history_aggregates(prior)
+    if hist.empty:
+        rs = ReportSet(None, None, None, None, None)
+    else:
+        cur = _path_month_key(EXCEL_PATH)
+        t12_start = str(pd.Period(cur, "M") - 11)
+        rs = ReportSet(
+            _pnl_by_month(agg),
+            _window_totals(hist, f"{cur[:4]}-01", f"{cur[:4]}-12", "YTD"),
+            _category_totals(agg),
+            _window_totals(hist, t12_start, cur, "T12M"),
+            _year_over_year(hist, cur),
+        )
+    if prior is None:
+        _REPORT_MEMO[EXCEL_PATH] = (version, rs)
+    return rs
+
+def report_layout(rs, as_of=None):
+    # (startrow, frame) blocks as they sit on the Reports sheet
+    as_of = as_of or pd.Timestamp.today()
+    if rs.pnl is None:
+        return [(0, pd.DataFrame([{"ReportName":"No data yet","AsOf":as_of,"Notes":""}]))]
+    blocks, row = [], 0
+    for name, df in [("P&L by Month", rs.pnl), ("YTD Summary", rs.ytd), ("Category Totals", rs.category_totals),
+                     ("Trailing 12 Months", rs.trailing12), ("Year over Year", rs.yoy)]:
+        blocks.append((row, pd.DataFrame([{"ReportName":name,"AsOf":as_of,"Notes":""}])))
+        blocks.append((row + 2, df))
+        row += 2 + df.shape[0] + 2
+    return blocks
+
+def report_grid(blocks):
+    # the Reports sheet as rows of cells, without reading it back
+    grid = []
+    for start, df in blocks:
+        grid.extend([] for _ in range(start - len(grid)))
+        grid.append([str(c) for c in df.columns])
+        grid.extend(["" if pd.isna(v) else str(v) for v in r] for r in df.itertuples(index=False))
+    return grid
+
+def build_reports(prior=None):
+    with perf_span("build_reports", _path_month_key(EXCEL_PATH)) as span:
+        out = _build_reports(prior)
+        span["rows"] = len(out)
+        return out
+
+def _build_reports(prior=None):
+    rs = compute_reports(prior)
+    blocks = report_layout(rs)
+    old_stamp = _file_stamp(EXCEL_PATH)
+    # overlay keeps every block; the old sheet is dropped first so a shorter
+    # report leaves no stale rows behind
+    with pd.ExcelWriter(EXCEL_PATH, engine="openpyxl", mode="a", if_sheet_exists="overlay") as xw:
+        if "Reports" in xw.book.sheetnames:
+            idx = xw.book.sheetnames.index("Reports")
+            xw.book.remove(xw.book["Reports"])
+            xw.book.create_sheet("Reports", idx)
+        for start, df in blocks:
+            df.to_excel(xw, sheet_name="Reports", index=False, startrow=start)
+    _reports_written()
+    _sidecar_store(EXCEL_PATH, {}, old_stamp)
+    return rs.pnl if rs.pnl is not None else blocks[0][1]
+
+def _reports_written():
+    entry = _WB_CACHE.get(EXCEL_PATH)
+    if entry is not None:
+        entry["stamp"] = _file_stamp(EXCEL_PATH)
+        entry["sheets"].pop("Reports", None)
+    con = _DB_CONNS.get(EXCEL_PATH)
+    if STORAGE_BACKEND == "sqlite" and con is not None:
+        # our own Reports write is not an outside edit to re-import
+        _db_meta(con, "xlsx_stamp", _file_stamp(EXCEL_PATH))
+
+REPORT_CSV_FILES = [
+    ("pnl", "P&L_by_Month.csv"), ("ytd", "YTD_Summary.csv"), ("category_totals", "Category_Totals.csv"),
+    ("trailing12", "Trailing_12_Months.csv"), ("yoy", "Year_over_Year.csv"),
+]
+
+def export_reports_csv(outdir=None):
+    # Reports sheet + one CSV per report; returns the files written ([] with no transactions)
+    build_reports()
+    rs = compute_reports()  # same computation build_reports() just used
+    if rs.pnl is None:
+        return []
+    outdir = outdir or os.path.dirname(EXCEL_PATH)
+    os.makedirs(outdir, exist_ok=True)
+    paths = []
+    for field, name in REPORT_CSV_FILES:
+        paths.append(os.path.join(outdir, name))
+        getattr(rs, field).to_csv(paths[-1], index=False)
+    return paths
+
+def export_transactions_csv(path=None):
+    path = path or os.path.join(os.path.dirname(EXCEL_PATH), "Transactions.csv")
+    tx = read_sheet("Transactions")
+    tx.to_csv(path, index=False)
+    return path, len(tx)
+
+# ---------- Display formatting ----------
+# Sheet rows -> the strings the GUI tables show, column by column. Kept here
+# (no widgets involved) so it can run on the I/O thread and in benchmarks.
+def fmt_date(s):
+    return pd.to_datetime(s, errors="coerce").dt.strftime("%Y-%m-%d").fillna("")
+
+def fmt_money(s):
+    return pd.to_numeric(s, errors="coerce").fillna(0.0).map("${:,.2f}".format)
+
+def fmt_rate(s):
+    return pd.to_numeric(s, errors="coerce").fillna(0.0).map("{:.2f}".format)
+
+def format_rows(columns, df):
+    # DataFrame -> display tuples in one column-wise pass; no widgets involved
+    if df.empty:
+        return []
+    cols = []
+    for _, src, _, _, fmt in columns:
+        s = df[src] if src in df.columns else pd.Series("", index=df.index)
+        cols.append((fmt(s) if fmt else s.fillna("").astype(str)).tolist())
+    return list(zip(*cols))
+
+# (heading, source column, width, anchor, formatter)
+TX_TABLE_COLUMNS = [
+    ("Date","Date",100,"center",fmt_date), ("Type","Type",80,"center",None),
+    ("Category","Category",160,"w",None), ("Description","Description",240,"w",None),
+    ("Party","CustomerOrVendor",160,"w",None), ("Amount","Amount",110,"e",fmt_money),
+    ("Method","PaymentMethod",120,"w",None), ("Reference","Reference",120,"center",None),
+    ("Linked","LinkedDoc",120,"center",None),
+]
+INVOICE_TABLE_COLUMNS = [
+    ("InvoiceID","InvoiceID",100,"w",None), ("Date","Date",100,"w",fmt_date), ("DueDate","DueDate",100,"w",fmt_date),
+    ("Customer","CustomerName",180,"w",None), ("Item","Item",220,"w",None), ("Qty","Qty",60,"center",None),
+    ("Rate","Rate",90,"center",fmt_rate), ("Amount","Amount",110,"center",fmt_money),
+    ("Status","Status",90,"center",None), ("Notes","Notes",220,"w",None),
+]
+PAYSLIP_TABLE_COLUMNS = [
+    ("PayslipID","PayslipID",100,"w",None), ("Date","Date",100,"center",fmt_date),
+    ("Employee","EmployeeName",180,"w",None), ("Hours","Hours",80,"center",None),
+    ("Gross","Gross",110,"w",fmt_money), ("Tax","Tax",110,"w",fmt_money), ("Net","Net",110,"w",fmt_money),
+    ("Notes","Notes",220,"w",None),
+]
+
+# ---------- Background I/O ----------
+# The GUI hands storage calls to one worker thread so Excel parsing and
+# rewrites never run inside a Tk callback. Jobs run one at a time in order,
+# which also makes that thread the ledger's single writer.
+class IOExecutor:
+    """Runs submitted calls in order on one thread.
+
+    done(result) / error(exc) come back through run_callbacks(), which the
+    owner calls from its own thread (the GUI polls it with after()). A job
+    submitted with a key replaces the waiting job with that key, so five
+    Refresh clicks in a row become one load, run at the newest position.
+    """
+    def __init__(self, on_error=None, wakeup=None):
+        self.on_error = on_error
+        self.wakeup = wakeup  # called on the submitting thread after each submit
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._waiting = {}  # key -> job not started yet
+        self._lock = threading.Lock()
+        self._pending = 0
+        threading.Thread(target=self._run, name="ledger-io", daemon=True).start()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def _enqueue(self, job):
+        key = job["key"]
+        with self._lock:
+            old = self._waiting.pop(key, None) if key is not None else None
+            if old is not None:
+                old["cancelled"] = True
+                self._pending -= 1
+            if key is not None:
+                self._waiting[key] = job
+            self._pending += 1
+        self._jobs.put(job)
+        if self.wakeup is not None:
+            self.wakeup()
+        return job
+
+    def submit(self, fn, *args, key=None, done=None, error=None):
+        return self._enqueue({"fn": fn, "args": args, "key": key, "done": done, "error": error, "cancelled": False})
+
+    def call(self, fn, *args):
+        # run after everything already queued and wait for the result here
+        job = self._enqueue({"fn": fn, "args": args, "key": None, "cancelled": False, "event": threading.Event()})
+        job["event"].wait()
+        if "exc" in job:
+            raise job["exc"]
+        return job["result"]
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            with self._lock:
+                if job["cancelled"]:
+                    continue
+                if job["key"] is not None and self._waiting.get(job["key"]) is job:
+                    del self._waiting[job["key"]]
+            try:
+                with STORAGE_LOCK:
+                    job["result"] = job["fn"](*job["args"])
+                cb, val = job.get("done"), job["result"]
+            except Exception as e:
+                job["exc"] = e
+                cb, val = job.get("error") or self.on_error, e
+            # queue the callback before the job stops counting as pending, so
+            # pending == 0 means every result is already waiting
+            if "event" not in job and cb is not None:
+                self._results.put((cb, val))
+            with self._lock:
+                self._pending -= 1
+            if "event" in job:
+                job["event"].set()
+
+    def post(self, cb, val):
+        # from a running job: deliver cb(val) in order with job results
+        self._results.put((cb, val))
+
+    def run_callbacks(self):
+        while True:
+            try:
+                cb, val = self._results.get_nowait()
+            except queue.Empty:
+                return
+            cb(val)
+
+# ---------- Rebuild all months ----------
+# One worker process per month. Pass 1 syncs each workbook and returns its
+# totals; pass 2 rebuilds each month's Reports from the earlier months' totals
+# and copies the FINAL file. No worker ever reads another month's workbook,
+# so the months can be rewritten side by side.
+# Spawned workers re-import the launching process's main module, so the GUI
+# runs the pool through ledger_cli (rebuild_months_detached) and its workers
+# never load Tk.
+REBUILD_MAX_WORKERS = 4
+
+def _rebuild_worker_init(data_root, backend):
+    global DATA_ROOT, STORAGE_BACKEND, PERF_LOG_ENABLED
+    DATA_ROOT, STORAGE_BACKEND = data_root, backend
+    PERF_LOG_ENABLED = False  # one process writes perf.log; rotation is not multi-process safe
+
+def _month_totals_job(key):
+    set_excel_path(excel_path_for(key))
+    sync_workbook(EXCEL_PATH)
+    return transaction_aggregates()
+
+def _month_rebuild_job(key, prior):
+    path = excel_path_for(key)
+    set_excel_path(path)
+    finalize_month(key, prior)
+    shutil.copy2(path, final_path_for(key))
+
+def rebuild_all_months(keys=None, workers=None, progress=None):
+    """Re-finalize closed months (all before this month by default).
+    progress(done, total, message) is called from this thread after each step;
+    returns {month: error} for the months that failed."""
+    if keys is None:
+        keys = [k for k in month_keys() if k < month_key()]
+    keys = sorted(keys)
+    if not keys:
+        return {}
+    workers = max(1, min(workers or REBUILD_MAX_WORKERS, os.cpu_count() or 1, len(keys)))
+    total, done, totals, errors = 2 * len(keys), 0, {}, {}
+
+    def step(fut, key, what):
+        nonlocal done
+        done += 1
+        try:
+            res = fut.result()
+        except Exception as e:
+            errors[key] = f"{type(e).__name__}: {e}"
+            res = None
+        if progress:
+            progress(done, total, f"{key} {what}" + (" failed" if key in errors else ""))
+        return res
+
+    # spawn, not fork: the parent may be running Tk
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_rebuild_worker_init,
+                             initargs=(DATA_ROOT, STORAGE_BACKEND)) as pool:
+        futs = {pool.submit(_month_totals_job, k): k for k in keys}
+        for fut in as_completed(futs):
+            agg = step(fut, futs[fut], "totals")
+            if futs[fut] not in errors:
+                totals[futs[fut]] = agg
+        # YTD needs every earlier month, not just the ones being rebuilt:
+        # the rest come from their summaries, as in history_aggregates()
+        prior, unreadable = dict(totals), {}
+        for p in month_keys():
+            if p < keys[-1] and p not in prior:
+                try:
+                    prior[p] = month_summary(p)
+                except Exception as e:
+                    unreadable[p] = f"{type(e).__name__}: {e}"
+        for k in keys:
+            gaps = [p for p in unreadable if p < k]
+            if k in totals and gaps:
+                errors[k] = f"not rebuilt: totals for {', '.join(gaps)} are unavailable, so YTD would be short"
+        futs = {pool.submit(_month_rebuild_job, k, {p: a for p, a in prior.items() if p < k}): k
+                for k in keys if k in totals and k not in errors}
+        done += len(keys) - len(futs)
+        for fut in as_completed(futs):
+            step(fut, futs[fut], "reports")
+    return errors
+
+def rebuild_command(keys=None, workers=None):
+    # argv for `ledger_cli rebuild-months` on this data folder; a frozen build
+    # has no -m, so its own --rebuild-months hands over to ledger_cli
+    if getattr(sys, "frozen", False):
+        cmd, sub = [sys.executable], "--rebuild-months"
+    else:
+        cmd, sub = [sys.executable, "-m", "ledger_cli"], "rebuild-months"
+    cmd += ["--data", os.path.abspath(DATA_ROOT), "--backend", STORAGE_BACKEND, sub]
+    for k in keys or ():
+        cmd += ["--only", k]
+    if workers:
+        cmd += ["--workers", str(workers)]
+    return cmd
+
+def rebuild_months_detached(keys=None, workers=None, progress=None):
+    """rebuild_all_months() in a child process, with the same arguments and
+    result; for callers whose main module should not be loaded by workers."""
+    if keys is None:
+        keys = [k for k in month_keys() if k < month_key()]
+    if not keys:
+        return {}
+    proc = subprocess.Popen(rebuild_command(keys, workers), cwd=APP_DIR, text=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    err = []
+    reader = threading.Thread(target=lambda: err.extend(proc.stderr), daemon=True)
+    reader.start()
+    for line in proc.stdout:
+        m = re.match(r"\[(\d+)/(\d+)\] (.*)", line)
+        if m and progress:
+            progress(int(m[1]), int(m[2]), m[3])
+    rc = proc.wait()
+    reader.join()
+    errors = {m[1]: m[2] for m in (re.match(r"(\d{4}-\d{2}): (.*)", line.rstrip()) for line in err) if m}
+    if rc and not errors:
+        errors["all"] = err[-1].strip() if err else f"exit status {rc}"
+    return errors
@@ -0,0 +1,428 @@
+"""Local HTTP ingestion server for Rainbow Ledger (http.server, no Tkinter).
+
+    python -m ledger_cli serve --port 8765
+
+    POST /transactions   {"transactions": [{"Date": "2026-10-17", "Type": "income",
+                                            "Category": "Sales", "Amount": 12.5, ...}, ...]}
+    POST /invoices       {"invoices": [{"CustomerName": "Acme", "Item": "Widget",
+                                        "Qty": 2, "Rate": 10, "Date": ..., "DueDate": ..., "Notes": ...}]}
+    POST /payroll/hours  {"date": "2026-10-17", "hours": [{"EmployeeName": "Ann", "Hours": 7.5}, ...]}
+    GET  /status         queue depth, commit latency and counters
+
+A bare JSON list works as the body too. Requests are parsed and checked on
+the connection's thread, then handed to one writer thread that stages
+everything waiting in the queue into a single SheetTransaction, so a burst of
+posts becomes one journal record instead of one per post. The reply is sent
+once the batch has committed. A 503 (queue full) was never queued and is safe
+to resend. A 504 only means the commit is slow: the request stays queued and
+is still committed, so resending it would record it twice.
+
+Hours are paid as they arrive: each posted batch becomes payslips for the
+hourly employees in it (salaried staff are left to the regular payroll run).
+"""
+import sys
+import json
+import time
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+import ledger_core as core
+
+SERVER_MAX_QUEUE = 2000      # waiting requests before new posts get 503
+SERVER_MAX_BATCH = 500       # requests staged into one commit
+SERVER_COALESCE_MS = 5       # wait this long for company when a batch would be a single request
+SERVER_MAX_BODY = 16 << 20
+SERVER_REPLY_TIMEOUT = 60.0
+SERVER_HISTORY = 1000        # commits/requests kept for the latency percentiles
+
+TX_COLUMNS = ["Date","Type","Category","Description","CustomerOrVendor","Amount","PaymentMethod","Reference","LinkedDoc"]
+# accepted spellings of each column, lowercase; the sheet name itself always works
+TX_ALIASES = {
+    "CustomerOrVendor": ("party", "customer", "vendor"),
+    "PaymentMethod": ("method", "paymentmethod", "payment_method"),
+    "LinkedDoc": ("linked", "linkeddoc"),
+}
+INVOICE_COLUMNS = ["CustomerName","Item","Qty","Rate","Date","DueDate","Notes"]
+INVOICE_ALIASES = {"CustomerName": ("customer", "client"), "DueDate": ("due", "due_date")}
+HOURS_ALIASES = {"EmployeeName": ("employee", "name")}
+
+class RequestError(ValueError):
+    """Bad request body; sent back as 400 with its message."""
+    status = 400
+
+class Busy(RuntimeError):
+    status = 503
+
+# ---------- Request bodies ----------
+# Checked in plain Python on the connection's thread: building a DataFrame
+# per post costs more than the commit it feeds. The writer turns everything
+# in a batch into one frame per kind.
+def _records(body, key):
+    if isinstance(body, dict):
+        body = body.get(key)
+    if not isinstance(body, list) or not all(isinstance(r, dict) for r in body):
+        raise RequestError(f'expected a list of objects (or {{"{key}": [...]}})')
+    if not body:
+        raise RequestError(f"no {key} in request")
+    return body
+
+def _pick(record, col, aliases):
+    low = {str(k).strip().lower(): v for k, v in record.items()}
+    for name in (col.lower(),) + aliases.get(col, ()):
+        if low.get(name) not in (None, ""):
+            return low[name]
+    return None
+
+def _date(value, i, what="Date"):
+    when = None
+    if isinstance(value, str):
+        try:
+            when = datetime.fromisoformat(value.strip())
+        except ValueError:
+            pass
+    if when is None:
+        try:
+            when = pd.Timestamp(value)
+        except (ValueError, TypeError):
+            when = pd.NaT
+        if pd.isna(when):
+            where = f" in item {i}" if i is not None else ""
+            raise RequestError(f"invalid {what}{where}: {value!r}")
+        when = when.to_pydatetime()
+    # the sheets hold naive local dates
+    return when.astimezone().replace(tzinfo=None) if when.tzinfo else when
+
+def _number(value, i, what):
+    try:
+        x = float(value)
+    except (ValueError, TypeError):
+        x = float("nan")
+    if x != x or x in (float("inf"), float("-inf")):
+        raise RequestError(f"invalid {what} in item {i}: {value!r}")
+    return x
+
+def _text(value):
+    return "" if value is None else str(value)
+
+def parse_transactions(body):
+    rows = []
+    for i, r in enumerate(_records(body, "transactions")):
+        ttype = _text(_pick(r, "Type", TX_ALIASES)).strip().lower()
+        if ttype not in ("income", "expense", "transfer"):
+            raise RequestError(f"invalid Type in item {i}: expected income, expense or transfer")
+        category = _text(_pick(r, "Category", TX_ALIASES)).strip()
+        if not category:
+            raise RequestError(f"missing Category in item {i}")
+        row = {col: _text(_pick(r, col, TX_ALIASES)) for col in TX_COLUMNS}
+        row.update(Date=_date(_pick(r, "Date", TX_ALIASES), i), Type=ttype, Category=category,
+                   Amount=_number(_pick(r, "Amount", TX_ALIASES), i, "Amount"))
+        rows.append(row)
+    return rows
+
+def parse_invoices(body):
+    rows = []
+    for i, r in enumerate(_records(body, "invoices")):
+        row = {col: _pick(r, col, INVOICE_ALIASES) for col in INVOICE_COLUMNS}
+        if row["CustomerName"] is None:
+            raise RequestError(f"missing CustomerName in item {i}")
+        row["Qty"], row["Rate"] = _number(row["Qty"], i, "Qty"), _number(row["Rate"], i, "Rate")
+        for col in ("Date", "DueDate"):
+            if row[col] is not None:
+                row[col] = _date(row[col], i, col)
+        rows.append(row)
+    return rows
+
+def parse_hours(body):
+    default = body.get("date") if isinstance(body, dict) else None
+    default = _date(default, None, "date") if default is not None else datetime.combine(datetime.now().date(), datetime.min.time())
+    rows = []
+    for i, r in enumerate(_records(body, "hours")):
+        name = _text(_pick(r, "EmployeeName", HOURS_ALIASES)).strip()
+        if not name:
+            raise RequestError(f"missing EmployeeName in item {i}")
+        hours = _number(_pick(r, "Hours", HOURS_ALIASES), i, "Hours")
+        if hours < 0:
+            raise RequestError(f"invalid Hours in item {i}: {hours}")
+        when = _pick(r, "Date", HOURS_ALIASES)
+        rows.append({"EmployeeName": name, "Hours": hours, "Date": _date(when, i) if when is not None else default})
+    return rows
+
+# ---------- Staging ----------
+# Each kind stages the requests of one batch (lists of parsed rows, in
+# arrival order) into the batch's SheetTransaction and returns one reply per
+# request.
+def _stage_transactions(uow, requests):
+    tx = pd.DataFrame.from_records([row for rows in requests for row in rows], columns=TX_COLUMNS)
+    tx["Date"] = pd.to_datetime(tx["Date"])
+    uow.append(tx, "Transactions")
+    return [{"added": len(rows)} for rows in requests]
+
+def _stage_invoices(uow, requests):
+    lines = pd.DataFrame.from_records([row for rows in requests for row in rows], columns=INVOICE_COLUMNS)
+    inv = core.create_invoices_batch(lines, uow)
+    out, at = [], 0
+    for rows in requests:
+        part = inv.iloc[at:at + len(rows)]
+        at += len(rows)
+        out.append({"invoices": [{"InvoiceID": i, "Amount": float(a)} for i, a in zip(part["InvoiceID"], part["Amount"])]})
+    return out
+
+def _stage_hours(uow, requests):
+    # hours for the same employee and date across requests make one payslip
+    hours = pd.DataFrame.from_records([row for rows in requests for row in rows], columns=["EmployeeName", "Hours", "Date"])
+    hours["Date"] = pd.to_datetime(hours["Date"])
+    paid = {}
+    for when, day in hours.groupby("Date", sort=True):
+        ps = core.run_payroll_batch(when, day.groupby("EmployeeName", sort=False)["Hours"].sum(), uow, salaried=False)
+        for r in ps.itertuples(index=False):
+            paid[(when, r.EmployeeName)] = {"PayslipID": r.PayslipID, "EmployeeName": r.EmployeeName,
+                                            "Date": when.strftime("%Y-%m-%d"), "Hours": float(r.Hours),
+                                            "Gross": float(r.Gross), "Tax": float(r.Tax), "Net": float(r.Net)}
+    out = []
+    for rows in requests:
+        keys = dict.fromkeys((pd.Timestamp(r["Date"]), r["EmployeeName"]) for r in rows)
+        out.append({"payslips": [paid[k] for k in keys if k in paid]})
+    return out
+
+STAGERS = {"transactions": _stage_transactions, "invoices": _stage_invoices, "hours": _stage_hours}
+
+# ---------- Writer ----------
+class IngestWriter:
+    """The server's single writer: one thread, one commit per batch.
+
+    submit() queues a parsed request and blocks until the batch holding it
+    has committed (or failed). If a batch fails, its requests are retried one
+    by one so a single bad post does not sink everyone else's.
+    """
+    def __init__(self, follow_month=True):
+        self.follow_month = follow_month
+        self._jobs = queue.Queue(maxsize=SERVER_MAX_QUEUE)
+        self._lock = threading.Lock()
+        self._commit_ms = deque(maxlen=SERVER_HISTORY)
+        self._wait_ms = deque(maxlen=SERVER_HISTORY)
+        self._batch_sizes = deque(maxlen=SERVER_HISTORY)
+        self.requests = self.rows = self.commits = self.failed = self.in_flight = 0
+        self.started = time.time()
+        self._month = core.month_key()
+        self._dirty, self._last = False, time.perf_counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, kind, rows):
+        job = {"kind": kind, "rows": rows, "t0": time.perf_counter(), "event": threading.Event()}
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            raise Busy(f"writer queue is full ({SERVER_MAX_QUEUE} requests waiting)")
+        if not job["event"].wait(SERVER_REPLY_TIMEOUT):
+            raise TimeoutError("timed out waiting for the commit")
+        if "exc" in job:
+            raise job["exc"]
+        return job["result"]
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        idle = core.FLUSH_DELAY_MS / 1000
+        while not (self._stop.is_set() and self._jobs.empty()):
+            try:
+                batch = [self._jobs.get(timeout=min(idle, 0.5))]
+            except queue.Empty:
+                if self._dirty and (self._stop.is_set() or time.perf_counter() - self._last >= idle):
+                    self._flush()
+                continue
+            if self._jobs.empty() and SERVER_COALESCE_MS:
+                time.sleep(SERVER_COALESCE_MS / 1000)
+            while len(batch) < SERVER_MAX_BATCH:
+                try:
+                    batch.append(self._jobs.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit_batch(batch)
+        if self._dirty:
+            self._flush()
+
+    def _flush(self):
+        with core.STORAGE_LOCK:
+            try:
+                core.sync_workbook()
+                self._dirty = False
+            except Exception as e:  # the journal still has every commit; try again later
+                print(f"saving workbook failed: {e}", file=sys.stderr)
+            self._last = time.perf_counter()
+
+    def _commit_batch(self, batch):
+        self.in_flight = len(batch)
+        try:
+            with core.STORAGE_LOCK:
+                try:
+                    if self.follow_month and core.month_key() != self._month:
+                        core.bootstrap_month_rotation()  # first post of a new month closes the old one
+                        self._month = core.month_key()
+                    self._commit(batch)
+                except Exception as e:
+                    for job in batch:
+                        job["exc"] = e
+                    if len(batch) > 1 and self._month == core.month_key():
+                        for job in batch:
+                            try:
+                                self._commit([job])
+                                del job["exc"]
+                            except Exception as e:
+                                job["exc"] = e
+        finally:
+            self._dirty, self._last = True, time.perf_counter()
+            self.in_flight = 0
+            now = time.perf_counter()
+            with self._lock:
+                for job in batch:
+                    self.requests += 1
+                    if "exc" in job:
+                        self.failed += 1
+                    else:
+                        self.rows += len(job["rows"])
+                    self._wait_ms.append((now - job["t0"]) * 1000)
+            for job in batch:
+                job["event"].set()
+
+    def _commit(self, jobs):
+        # stage every kind into one unit of work; results are only handed out after it commits
+        t0 = time.perf_counter()
+        uow = core.SheetTransaction()
+        replies = {}
+        for kind, stage in STAGERS.items():
+            mine = [job for job in jobs if job["kind"] == kind]
+            if mine:
+                replies.update(zip(map(id, mine), stage(uow, [job["rows"] for job in mine])))
+        with core.perf_span("ingest_commit", f"{len(jobs)} requests") as span:
+            span["rows"] = sum(len(job["rows"]) for job in jobs)
+            uow.commit()
+        for job in jobs:
+            job["result"] = replies[id(job)]
+        ms = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self.commits += 1
+            self._commit_ms.append(ms)
+            self._batch_sizes.append(len(jobs))
+
+    def status(self):
+        def pct(values):
+            if not values:
+                return None
+            p50, p90, p99 = np.percentile(np.fromiter(values, float), [50, 90, 99]).round(2).tolist()
+            return {"p50": p50, "p90": p90, "p99": p99, "max": round(max(values), 2)}
+        with self._lock:
+            commit_ms, wait_ms, sizes = list(self._commit_ms), list(self._wait_ms), list(self._batch_sizes)
+            up = time.time() - self.started
+            return {
+                "workbook": core.EXCEL_PATH,
+                "queue_depth": self._jobs.qsize(), "in_flight": self.in_flight, "max_queue": SERVER_MAX_QUEUE,
+                "requests": self.requests, "failed": self.failed, "rows": self.rows, "commits": self.commits,
+                "requests_per_sec": round(self.requests / up, 1) if up else 0.0,
+                "mean_batch": round(sum(sizes) / len(sizes), 1) if sizes else None,
+                "commit_ms": pct(commit_ms),
+                "request_ms": pct(wait_ms),
+                "unsaved": self._dirty,
+                "uptime_s": round(up, 1),
+            }
+
+# ---------- HTTP ----------
+ROUTES = {
+    "/transactions": ("transactions", parse_transactions),
+    "/invoices": ("invoices", parse_invoices),
+    "/payroll/hours": ("hours", parse_hours),
+}
+
+class IngestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so a POS can stream posts on one connection
+    server_version = "RainbowLedger"
+    writer = None
+    verbose = False
+
+    def _reply(self, status, payload, close=False):
+        data = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if close:
+            self.send_header("Connection", "close")  # also sets close_connection
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("/status", ""):
+            self._reply(200, self.writer.status())
+        else:
+            self._reply(404, {"error": f"no such endpoint: {self.path}"})
+
+    def do_POST(self):
+        route = ROUTES.get(self.path.rstrip("/"))
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            # cannot tell where the body ends
+            self._reply(400, {"error": f"invalid Content-Length: {self.headers.get('Content-Length')!r}"}, close=True)
+            return
+        if route is None or length > SERVER_MAX_BODY:
+            # the body was not read
+            if route is None:
+                self._reply(404, {"error": f"no such endpoint: {self.path}"}, close=True)
+            else:
+                self._reply(413, {"error": f"body over {SERVER_MAX_BODY} bytes"}, close=True)
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"null")
+            kind, parse = route
+            self._reply(200, self.writer.submit(kind, parse(body)))
+        except json.JSONDecodeError as e:
+            self._reply(400, {"error": f"invalid JSON: {e}"})
+        except (RequestError, Busy) as e:
+            self._reply(e.status, {"error": str(e)})
+        except ValueError as e:  # e.g. an unknown employee, raised while staging
+            self._reply(422, {"error": str(e)})
+        except TimeoutError as e:
+            # the request stays queued and will still be committed
+            self._reply(504, {"error": str(e), "queued": True,
+                              "detail": "The request is still queued and will be committed. Do not resend it; "
+                                        "check the ledger first, or it will be recorded twice."})
+        except Exception as e:
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def log_message(self, fmt, *args):
+        if self.verbose:
+            super().log_message(fmt, *args)
+
+class IngestServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default 5 resets clients when a burst of POS terminals connects at once
+
+def make_server(host="127.0.0.1", port=8765, follow_month=True, verbose=False):
+    writer = IngestWriter(follow_month)
+    handler = type("Handler", (IngestHandler,), {"writer": writer, "verbose": verbose})
+    httpd = IngestServer((host, port), handler)
+    httpd.writer = writer
+    return httpd
+
+def serve(host="127.0.0.1", port=8765, follow_month=True, verbose=False):
+    httpd = make_server(host, port, follow_month, verbose)
+    print(f"Rainbow Ledger listening on http://{httpd.server_address[0]}:{httpd.server_address[1]} "
+          f"({core.EXCEL_PATH})", flush=True)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        httpd.writer.close()  # commits whatever is queued and saves the workbook
+    return 0
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ledger_core as core
+
+MONTH = "2026-10"
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    # a fresh month workbook under tmp_path, write-behind on, nothing cached
+    monkeypatch.setattr(core, "DATA_ROOT", str(tmp_path / "data"))
+    monkeypatch.setattr(core, "STORAGE_BACKEND", "excel")
+    monkeypatch.setattr(core, "WRITE_BEHIND", True)
+    monkeypatch.setattr(core, "EXCEL_PATH", None)
+    core.reset_caches()
+    core.bootstrap_month_rotation(switch_to=MONTH)
+    core.ensure_workbook()
+    yield core
+    core.reset_caches()
+
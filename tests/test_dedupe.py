@@ -0,0 +1,68 @@
+from collections import Counter
+
+import pandas as pd
+
+import ledger_core as core
+
+HEADER = "Date,Amount,Description,Payee\n"
+MAPPING = {"Date": "Date", "Amount": "Amount", "Description": "Description", "Party": "Payee"}
+
+def _csv(tmp_path, name, lines):
+    p = tmp_path / name
+    p.write_text(HEADER + "".join(line + "\n" for line in lines))
+    return str(p)
+
+def _import(path):
+    return core.import_bank_csv(path, MAPPING, default_category="Other Expenses")
+
+def test_reimport_skips_everything(ledger, tmp_path):
+    path = _csv(tmp_path, "oct.csv", ["2026-10-01,-4.50,Coffee,Cafe", "2026-10-02,-60,Fuel,Shell",
+                                      "2026-10-03,1200,Invoice 7,Acme"])
+    assert _import(path)[0] == 3
+    n, skipped = _import(path)
+    assert n == 0 and len(skipped) == 3
+    assert len(core.read_sheet("Transactions")) == 3
+
+def test_repeated_rows_in_one_statement_are_kept(ledger, tmp_path):
+    same = "2026-10-01,-4.50,Coffee,Cafe"
+    assert _import(_csv(tmp_path, "a.csv", [same, same]))[0] == 2
+    # the ledger has two; a statement with three adds only the third
+    n, skipped = _import(_csv(tmp_path, "b.csv", [same, same, same]))
+    assert (n, len(skipped)) == (1, 2)
+    assert len(core.read_sheet("Transactions")) == 3
+
+def test_split_duplicates_consumes_seen(ledger):
+    nd = core._transaction_rows("2026-10-01", "expense", "Meals (50%)", 4.5, "Coffee", "Cafe")
+    nd = pd.concat([nd, nd], ignore_index=True)
+    fp = int(core.tx_fingerprints(nd)[0])
+    seen = Counter({fp: 1})
+    new, dup = core.split_duplicates(nd, seen)
+    assert (len(new), len(dup)) == (1, 1)
+    assert seen[fp] == 0
+
+def test_fingerprint_ignores_case_spacing_and_sign(ledger):
+    a = core._transaction_rows("2026-10-01", "expense", "Supplies", 4.5, "Coffee  Beans", "Cafe")
+    b = core._transaction_rows("2026-10-01 00:00", "expense", "Other Expenses", 4.50, " coffee beans", "CAFE ")
+    assert core.tx_fingerprints(a)[0] == core.tx_fingerprints(b)[0]
+    c = core._transaction_rows("2026-10-02", "expense", "Supplies", 4.5, "Coffee Beans", "Cafe")
+    assert core.tx_fingerprints(a)[0] != core.tx_fingerprints(c)[0]
+
+def test_blank_party_is_blank_not_nan(ledger, tmp_path):
+    path = _csv(tmp_path, "blank.csv", ["2026-10-01,-4.50,Coffee,", "2026-10-02,-7,,Bob"])
+    _import(path)
+    tx = core.read_sheet("Transactions")
+    assert "nan" not in set(tx["CustomerOrVendor"].astype(str)) | set(tx["Description"].astype(str))
+    _, skipped = _import(path)
+    assert list(skipped["CustomerOrVendor"]) == ["", "Bob"]
+    assert list(skipped["Description"]) == ["Coffee", ""]
+    # blank and missing are the same party to the fingerprint
+    unmapped = core.normalize_bank_rows(pd.read_csv(path), {k: v for k, v in MAPPING.items() if k != "Party"})
+    assert core.tx_fingerprints(unmapped)[0] == core.tx_fingerprints(skipped)[0]
+
+def test_earlier_months_count(ledger, tmp_path):
+    row = "2026-09-30,-60,Fuel,Shell"
+    core.bootstrap_month_rotation(switch_to="2026-09")
+    _import(_csv(tmp_path, "sep.csv", [row]))
+    core.bootstrap_month_rotation(switch_to="2026-10")
+    n, skipped = _import(_csv(tmp_path, "late.csv", [row, "2026-10-01,-4.50,Coffee,Cafe"]))
+    assert (n, len(skipped)) == (1, 1)
@@ -0,0 +1,107 @@
+import os
+
+import pandas as pd
+import pytest
+
+import ledger_core as core
+
+class Crash(BaseException):
+    """Stands in for the process dying; `except Exception` does not see it."""
+
+def _tx(desc, amount=10.0):
+    return core._transaction_rows("2026-10-03", "expense", "Supplies", amount, desc, "Acme")
+
+def _crash(*args, **kwargs):
+    raise Crash()
+
+def _on_disk(sheet="Transactions"):
+    # what the workbook itself holds, journal ignored
+    return pd.read_excel(core.EXCEL_PATH, sheet_name=sheet)
+
+def test_write_goes_to_journal_not_workbook(ledger):
+    core.append_rows(_tx("paper"), "Transactions")
+    assert core.journal_pending()
+    assert _on_disk().empty
+    assert list(core.read_sheet("Transactions")["Description"]) == ["paper"]
+
+def test_recover_after_crash_without_flush(ledger):
+    core.append_rows(_tx("paper", 12.5), "Transactions")
+    core.append_rows(_tx("toner", 80.0), "Transactions")
+    core.reset_caches()  # the process died; only the files are left
+
+    assert core.recover_journal(core.EXCEL_PATH)
+    assert not core.journal_pending()
+    core.reset_caches()
+    for df in (core.read_sheet("Transactions"), _on_disk()):
+        assert list(df["Description"]) == ["paper", "toner"]
+        assert list(df["Amount"]) == [12.5, 80.0]
+        assert pd.api.types.is_datetime64_any_dtype(df["Date"])
+        assert pd.api.types.is_float_dtype(df["Amount"])
+
+def test_replace_and_multi_sheet_batch_survive_a_crash(ledger):
+    with core.SheetTransaction() as uow:
+        uow.append(_tx("paper"), "Transactions")
+        uow.write(pd.DataFrame([{"Key": "CompanyName", "Value": "Journal Co"}]), "Settings")
+    core.reset_caches()
+    core.recover_journal(core.EXCEL_PATH)
+    assert list(_on_disk()["Description"]) == ["paper"]
+    assert core.get_company_name() == "Journal Co"
+
+def test_torn_last_line_is_dropped(ledger):
+    core.append_rows(_tx("paper"), "Transactions")
+    with open(core.journal_path_for(core.EXCEL_PATH), "a", encoding="utf-8") as f:
+        f.write('{"op": "append", "sheet": "Transactions", "fra')
+    core.reset_caches()
+    core.recover_journal(core.EXCEL_PATH)
+    assert list(_on_disk()["Description"]) == ["paper"]
+
+def test_crash_before_the_rewrite_lands(ledger, monkeypatch):
+    core.append_rows(_tx("paper"), "Transactions")
+    with monkeypatch.context() as m:
+        m.setattr(core, "_write_sheets", _crash)
+        with pytest.raises(Crash):
+            core.flush_journal()
+    flushing = core.journal_path_for(core.EXCEL_PATH) + ".flushing"
+    assert os.path.exists(flushing) and not core.journal_pending()
+    # the next process journals a new edit before anyone recovers
+    core.reset_caches()
+    core.append_rows(_tx("toner"), "Transactions")
+
+    core.reset_caches()
+    assert core.recover_journal(core.EXCEL_PATH)
+    assert not os.path.exists(flushing) and not core.journal_pending()
+    assert list(_on_disk()["Description"]) == ["paper", "toner"]
+
+def test_crash_after_the_rewrite_lands(ledger, monkeypatch):
+    core.append_rows(_tx("paper"), "Transactions")
+    with monkeypatch.context() as m:
+        m.setattr(core, "_sidecar_store", _crash)  # runs right after the rename
+        with pytest.raises(Crash):
+            core.flush_journal()
+    flushing = core.journal_path_for(core.EXCEL_PATH) + ".flushing"
+    assert os.path.exists(flushing)
+    assert list(_on_disk()["Description"]) == ["paper"]
+
+    core.reset_caches()
+    assert not core.recover_journal(core.EXCEL_PATH)  # nothing left to fold in
+    assert not os.path.exists(flushing)
+    assert list(_on_disk()["Description"]) == ["paper"]
+
+def test_flush_is_idempotent(ledger):
+    core.append_rows(_tx("paper"), "Transactions")
+    assert core.flush_journal()
+    stamp = core._file_stamp(core.EXCEL_PATH)
+    assert not core.flush_journal()
+    assert not core.recover_journal(core.EXCEL_PATH)
+    assert core._file_stamp(core.EXCEL_PATH) == stamp
+    core.reset_caches()
+    assert list(core.read_sheet("Transactions")["Description"]) == ["paper"]
+
+def test_workbook_changed_since_base_is_not_lost(ledger):
+    # reports or an Excel save rewrite the file while edits sit in the journal
+    core.append_rows(_tx("paper"), "Transactions")
+    core._write_sheets_atomic(core.EXCEL_PATH, {"Vendors": pd.DataFrame([{"VendorName": "Acme"}])})
+    core.reset_caches()
+    core.recover_journal(core.EXCEL_PATH)
+    assert list(_on_disk()["Description"]) == ["paper"]
+    assert list(_on_disk("Vendors")["VendorName"]) == ["Acme"]
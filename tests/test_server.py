@@ -0,0 +1,164 @@
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+import ledger_core as core
+import ledger_server
+
+TX = {"Date": "2026-10-03", "Type": "income", "Category": "Sales", "Amount": 12.5, "party": "Walk-in"}
+
+@pytest.fixture
+def server(ledger, monkeypatch):
+    httpd = ledger_server.make_server("127.0.0.1", 0, follow_month=False)
+    batches = []
+    commit = httpd.writer._commit
+    def spy(jobs):
+        batches.append(len(jobs))
+        return commit(jobs)
+    httpd.writer._commit = spy
+    httpd.batches = batches
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+    httpd.writer.close()
+
+def _conn(httpd):
+    return http.client.HTTPConnection(*httpd.server_address, timeout=10)
+
+def _post(httpd, path, body):
+    conn = _conn(httpd)
+    conn.request("POST", path, json.dumps(body), {"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    out = resp.status, json.loads(resp.read())
+    conn.close()
+    return out
+
+def _post_raw(httpd, path, length, data=b""):
+    conn = _conn(httpd)
+    conn.putrequest("POST", path)
+    conn.putheader("Content-Length", length)
+    conn.endheaders(data)
+    resp = conn.getresponse()
+    out = resp.status, json.loads(resp.read()), resp.getheader("Connection")
+    conn.close()
+    return out
+
+def _wait_for(cond):
+    deadline = time.time() + 5
+    while not cond():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+def _start(fn, *args):
+    out = {}
+    thread = threading.Thread(target=lambda: out.setdefault("result", fn(*args)))
+    thread.start()
+    return thread, out
+
+def _post_as_one_batch(httpd, posts):
+    # park the writer on a first post, queue `posts` behind it, then let go:
+    # everything queued by then goes into the next batch
+    with core.STORAGE_LOCK:
+        first = _start(_post, httpd, "/transactions", [TX])
+        _wait_for(lambda: httpd.writer.in_flight == 1)
+        started = [_start(_post, httpd, path, body) for path, body in posts]
+        _wait_for(lambda: httpd.writer._jobs.qsize() == len(posts))
+    for thread, _ in [first] + started:
+        thread.join()
+    assert first[1]["result"][0] == 200
+    return [out["result"] for _, out in started]
+
+def test_posts_commit_and_show_in_status(server):
+    assert _post(server, "/transactions", {"transactions": [TX, dict(TX, Amount=7)]}) == (200, {"added": 2})
+    tx = core.read_sheet("Transactions")
+    assert list(tx["Amount"]) == [12.5, 7.0]
+    assert list(tx["CustomerOrVendor"]) == ["Walk-in", "Walk-in"]
+    conn = _conn(server)
+    conn.request("GET", "/status")
+    status = json.loads(conn.getresponse().read())
+    conn.close()
+    assert (status["requests"], status["rows"], status["failed"]) == (1, 2, 0)
+
+def test_concurrent_posts_share_one_commit(server):
+    results = _post_as_one_batch(server, [("/transactions", [dict(TX, Amount=i)]) for i in range(5)])
+    assert results == [(200, {"added": 1})] * 5
+    assert server.batches == [1, 5]
+    assert sorted(core.read_sheet("Transactions")["Amount"]) == [0, 1, 2, 3, 4, 12.5]
+
+def test_bad_request_in_a_batch_fails_alone(server):
+    core.add_employee("Ann", "hourly", hourly_rate=20)
+    results = _post_as_one_batch(server, [
+        ("/transactions", [TX]),
+        ("/payroll/hours", {"date": "2026-10-03", "hours": [{"EmployeeName": "Nobody", "Hours": 8}]}),
+        ("/payroll/hours", {"date": "2026-10-03", "hours": [{"EmployeeName": "Ann", "Hours": 8}]}),
+    ])
+    assert results[0] == (200, {"added": 1})
+    assert results[1][0] == 422 and "Nobody" in results[1][1]["error"]
+    assert results[2][0] == 200 and results[2][1]["payslips"][0]["Gross"] == 160.0
+    # the batch failed as a whole, then each request was committed on its own
+    assert server.batches == [1, 3, 1, 1, 1]
+    assert sorted(core.read_sheet("Transactions")["Category"]) == ["Sales", "Sales", "Taxes and Licenses", "Wages"]
+    # the failed batch did not use up a payslip number
+    assert list(core.read_sheet("Payslips")["PayslipID"]) == ["PAY0001"]
+    assert server.writer.status()["failed"] == 1
+
+@pytest.mark.parametrize("body, message", [
+    ({"transactions": [dict(TX, Type="gift")]}, "invalid Type in item 0"),
+    ({"transactions": [dict(TX, Amount="lots")]}, "invalid Amount in item 0"),
+    ({"transactions": []}, "no transactions"),
+    ({"rows": [TX]}, "expected a list of objects"),
+])
+def test_invalid_body_is_400_and_not_queued(server, body, message):
+    status, reply = _post(server, "/transactions", body)
+    assert status == 400 and message in reply["error"]
+    assert server.writer.status()["requests"] == 0
+
+def test_invalid_json_is_400(server):
+    status, reply, _ = _post_raw(server, "/transactions", "5", b"{nope")
+    assert status == 400 and reply["error"].startswith("invalid JSON")
+
+def test_unknown_endpoint_is_404(server):
+    assert _post(server, "/refunds", [TX])[0] == 404
+
+@pytest.mark.parametrize("length", ["abc", "-1"])
+def test_bad_content_length_is_400(server, length):
+    status, reply, connection = _post_raw(server, "/transactions", length)
+    assert status == 400 and "Content-Length" in reply["error"]
+    assert connection == "close"
+
+def test_oversize_body_is_413_unread(server):
+    status, reply, connection = _post_raw(server, "/transactions", str(ledger_server.SERVER_MAX_BODY + 1))
+    assert status == 413
+    assert connection == "close"
+
+def test_full_queue_is_503(ledger, monkeypatch):
+    monkeypatch.setattr(ledger_server, "SERVER_MAX_QUEUE", 1)
+    httpd = ledger_server.make_server("127.0.0.1", 0, follow_month=False)
+    threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True).start()
+    try:
+        with core.STORAGE_LOCK:  # the writer blocks on its first batch
+            first = _start(_post, httpd, "/transactions", [TX])
+            _wait_for(lambda: httpd.writer.in_flight == 1)
+            second = _start(_post, httpd, "/transactions", [TX])
+            _wait_for(lambda: httpd.writer._jobs.qsize() == 1)
+            status, reply = _post(httpd, "/transactions", [TX])
+            assert status == 503 and "queue is full" in reply["error"]
+        for thread, out in (first, second):
+            thread.join()
+            assert out["result"][0] == 200
+        assert len(core.read_sheet("Transactions")) == 2  # the 503 was never queued
+    finally:
+        httpd.shutdown(); httpd.server_close(); httpd.writer.close()
+
+def test_slow_commit_is_504_and_still_committed(server, monkeypatch):
+    monkeypatch.setattr(ledger_server, "SERVER_REPLY_TIMEOUT", 0.2)
+    with core.STORAGE_LOCK:
+        status, reply = _post(server, "/transactions", [TX])
+    assert status == 504 and reply["queued"] is True
+    _wait_for(lambda: server.writer.status()["requests"] == 1)
+    assert len(core.read_sheet("Transactions")) == 1
@@ -0,0 +1,78 @@
+import json
+
+import pandas as pd
+import pytest
+
+import ledger_core as core
+
+def _settings_value(df, key):
+    return df.loc[df["Key"] == key, "Value"].iloc[0]
+
+def _snapshot():
+    entry = core._cache_entry(core.EXCEL_PATH)
+    return (core._file_stamp(core.EXCEL_PATH), core.journal_pending(),
+            {s: df.copy() for s, df in entry["sheets"].items()}, dict(entry["versions"]))
+
+@pytest.fixture(params=[True, False], ids=["write-behind", "write-through"])
+def mode(request, ledger, monkeypatch):
+    monkeypatch.setattr(core, "WRITE_BEHIND", request.param)
+    return request.param
+
+def test_exception_in_block_leaves_workbook_and_cache(mode):
+    for sheet in ("Transactions", "Settings"):
+        core.read_sheet(sheet)
+        core.sheet_version(sheet)
+    stamp, pending, sheets, versions = _snapshot()
+    with pytest.raises(RuntimeError):
+        with core.SheetTransaction() as uow:
+            uow.append(core._transaction_rows("2026-10-03", "expense", "Supplies", 5), "Transactions")
+            uow.write(pd.DataFrame([{"Key": "CompanyName", "Value": "Nope"}]), "Settings")
+            raise RuntimeError("user cancelled")
+    after = _snapshot()
+    assert after[:2] == (stamp, pending)
+    assert after[2].keys() == sheets.keys()
+    for sheet, df in sheets.items():
+        pd.testing.assert_frame_equal(after[2][sheet], df)
+    assert after[3] == versions
+    assert core.read_sheet("Transactions").empty
+    assert core.get_company_name() == "My Company"
+
+def test_reads_inside_block_see_staged_rows(ledger):
+    with core.SheetTransaction() as uow:
+        uow.append(core._transaction_rows("2026-10-03", "expense", "Supplies", 5), "Transactions")
+        assert len(uow.read("Transactions")) == 1
+        assert core.read_sheet("Transactions").empty
+
+def test_invoice_and_counter_are_one_journal_record(ledger):
+    inv_id, _ = core.create_invoice("2026-10-03", "2026-10-17", "Acme", "Design", 2, 150)
+    with open(core.journal_path_for(core.EXCEL_PATH), encoding="utf-8") as f:
+        recs = [json.loads(line) for line in f]
+    assert [r["op"] for r in recs] == ["base", "batch"]
+    assert sorted(r["sheet"] for r in recs[1]["ops"]) == ["Invoices", "Settings", "Transactions"]
+    assert inv_id == "INV0001"
+    assert _settings_value(core.read_sheet("Settings"), "NextInvoiceNo") == 2
+
+def test_invoice_and_counter_land_together(mode):
+    core.create_invoice("2026-10-03", "2026-10-17", "Acme", "Design", 2, 150)
+    core.sync_workbook()
+    core.reset_caches()
+    assert list(core.read_sheet("Invoices")["InvoiceID"]) == ["INV0001"]
+    assert list(core.read_sheet("Transactions")["Reference"]) == ["INV0001"]
+    assert int(_settings_value(core.read_sheet("Settings"), "NextInvoiceNo")) == 2
+
+def test_failed_commit_writes_neither_sheet(mode, monkeypatch):
+    core.read_sheet("Invoices")
+    stamp, pending, sheets, versions = _snapshot()
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    with monkeypatch.context() as m:
+        m.setattr(core, "_journal_write" if mode else "_write_sheets", fail)
+        with pytest.raises(OSError):
+            core.create_invoice("2026-10-03", "2026-10-17", "Acme", "Design", 2, 150)
+    assert _snapshot()[:2] == (stamp, pending)
+    assert _snapshot()[3] == versions
+    core.reset_caches()
+    assert core.read_sheet("Invoices").empty
+    assert "NextInvoiceNo" not in set(core.read_sheet("Settings")["Key"])
+    # the number was not used up
+    assert core.create_invoice("2026-10-03", "2026-10-17", "Acme", "Design", 1, 10)[0] == "INV0001"